@@ -23,6 +23,9 @@ def create_app(config_class=Config):
     # Database is initialized via Supabase migration scripts
     # No local initialization needed
     
+    from .routes import with_event, precomputed_response
+    from .pages import voting_page as rendered_voting_page
+    
     # Frontend routes (define these first)
     @app.route('/')
     def index():
@@ -40,9 +43,16 @@ def create_app(config_class=Config):
         return send_from_directory(str(frontend_dir), 'admin-login.html')
     
     @app.route('/voting')
-    def voting_page():
-        print(f"Frontend route /voting accessed, serving from {frontend_dir}")  # Debug print
-        return send_from_directory(str(frontend_dir), 'voting.html')
+    @with_event
+    def voting_page(event_id):
+        # Contestants embedded in the page (app/pages.py); if rendering
+        # fails the static page loads them from /api/contestants
+        try:
+            page = rendered_voting_page(event_id)
+        except Exception as e:
+            print(f"Could not render /voting, serving the static page: {e}")
+            return send_from_directory(str(frontend_dir), 'voting.html')
+        return precomputed_response(page, 'no-cache', mimetype='text/html')
     
     @app.route('/styles.css')
     def styles():
@@ -64,6 +74,15 @@ def create_app(config_class=Config):
     from .routes import api_bp
     app.register_blueprint(api_bp)
     
+    # Background admin jobs (app/jobs.py)
+    if config_class.JOB_RUNNER == 'thread':
+        from .jobs import runner
+        runner.start()
+    
+    # Replays votes spooled during database outages (app/spool.py)
+    from .spool import vote_spool
+    vote_spool.start()
+    
     print("✅ Flask app created with routes:")
     print("   - / (frontend)")
     print("   - /admin (frontend)")
@@ -0,0 +1,49 @@
+"""
+In-process caches keyed by event
+
+Entries live in one bucket per event, so invalidating an event (closing
+its voting, resetting it) drops only that bucket and a busy event never
+evicts or invalidates another event's entries.
+"""
+import threading
+import time
+from .config import Config
+
+
+class EventCache:
+    """TTL cache of small per-event values (flags, lookups)"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def get(self, event_id, key, loader):
+        """Cached value for (event_id, key), calling loader() on a miss or expiry"""
+        now = time.monotonic()
+        bucket = self._buckets.get(event_id)
+        if bucket is not None:
+            entry = bucket.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+        value = loader()
+        with self._lock:
+            self._buckets.setdefault(event_id, {})[key] = (now + self.ttl, value)
+        return value
+
+    def invalidate(self, event_id, key=None):
+        """Drop one key, or everything cached for the event"""
+        with self._lock:
+            if key is None:
+                self._buckets.pop(event_id, None)
+            else:
+                self._buckets.get(event_id, {}).pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+event_cache = EventCache(Config.EVENT_CACHE_TTL)
+# Admin dashboard snapshots, shared by every admin polling the same event
+dashboard_cache = EventCache(Config.DASHBOARD_CACHE_TTL)
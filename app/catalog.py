@@ -0,0 +1,68 @@
+"""
+In-process contestant catalogue (migration 020)
+
+Each worker keeps the active contestants of every event it serves, with
+an id index and the ready-made /api/contestants body. Instead of reading
+contestants on every request it checks the event's contestant_versions
+counter (at most every EVENT_CACHE_TTL) and reloads the catalogue when a
+trigger moved it. /api/contestants, /api/health, the voting page and the
+contestant check in /api/vote all read from here.
+"""
+import json
+import threading
+from .cache import event_cache
+from .database import db_adapter
+from .models import Contestant
+
+
+class Catalog:
+    """Active contestants of one event at one version"""
+
+    def __init__(self, version, contestants):
+        self.version = version
+        self.contestants = contestants
+        self.by_id = {contestant.id: contestant for contestant in contestants}
+        self.json = json.dumps([contestant.to_dict() for contestant in contestants], separators=(',', ':'))
+
+    def get(self, contestant_id):
+        """The contestant with this id (int or numeric string), None if not in the catalogue"""
+        try:
+            return self.by_id.get(int(contestant_id))
+        except (TypeError, ValueError):
+            return None
+
+
+class ContestantCatalog:
+    def __init__(self):
+        self._catalogs = {}
+        self._lock = threading.Lock()
+
+    def version(self, event_id):
+        """The event's contestant version (cached); 0 before its contestants were first changed"""
+        def load():
+            row = db_adapter.execute_query(
+                'SELECT version FROM contestant_versions WHERE event_id = %s', (event_id,), fetch_one=True,
+                coalesce=True)
+            return row['version'] if row else 0
+        return event_cache.get(event_id, 'contestants_version', load)
+
+    def get(self, event_id):
+        """The event's current Catalog, reloaded if its version moved"""
+        # The version is read before the contestants: a change committing in
+        # between is loaded under the older version and simply loaded again.
+        # The contestants read is never coalesced, as a shared read started
+        # before the change would be kept under the newer version.
+        version = self.version(event_id)
+        catalog = self._catalogs.get(event_id)
+        if catalog is None or catalog.version != version:
+            catalog = Catalog(version, Contestant.get_all(event_id))
+            with self._lock:
+                self._catalogs[event_id] = catalog
+        return catalog
+
+    def clear(self):
+        with self._lock:
+            self._catalogs.clear()
+
+
+contestant_catalog = ContestantCatalog()
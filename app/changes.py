@@ -0,0 +1,111 @@
+"""
+Change feed of votes (migration 018) behind GET /api/votes/changes
+
+Cursors are opaque to clients: a base64 "txid.id" position in the feed's
+(txid, id) order. Only changes of transactions below the reading
+snapshot's xmin are served, so a transaction that commits late can never
+land behind a cursor already handed out (see the migration for why).
+"""
+import base64
+import binascii
+import sys
+import time
+from .config import Config
+from .database import db_adapter
+
+CHANGES_QUERY = """
+    SELECT id, txid::TEXT AS txid, op, round_id, contestant_id, vote_id, delta, created_at
+    FROM vote_changes
+    WHERE event_id = %s AND (txid, id) > (%s::XID8, %s)
+      AND txid < pg_snapshot_xmin(pg_current_snapshot())
+    ORDER BY txid, id
+    LIMIT %s
+"""
+
+
+class CursorExpired(Exception):
+    """Changes after the cursor were pruned; the consumer has to resync"""
+
+
+def max_wait(environ):
+    """Longest ?wait= this request may long-poll for, 0 when long-polling is off
+
+    A waiting request holds its worker, which with gunicorn's sync worker
+    blocks voting for everyone; long-polling therefore needs a threaded or
+    green worker and is never open to anonymous clients.
+    """
+    if Config.CHANGES_MAX_WAIT <= 0 or not Config.CHANGES_API_TOKEN:
+        return 0
+    green = 'gevent' in sys.modules or 'eventlet' in sys.modules
+    if not (environ.get('wsgi.multithread') or green):
+        return 0
+    return Config.CHANGES_MAX_WAIT
+
+
+def encode_cursor(txid, change_id):
+    return base64.urlsafe_b64encode(f"{txid}.{change_id}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(txid, id) of a cursor; raises ValueError if it is not one of ours"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        txid, change_id = raw.split('.')
+        return int(txid), int(change_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+def latest_cursor():
+    """Cursor after everything committed so far"""
+    row = db_adapter.execute_query(
+        'SELECT pg_snapshot_xmin(pg_current_snapshot())::TEXT AS xmin', fetch_one=True)
+    return encode_cursor(int(row['xmin']), 0)
+
+
+def _check_pruned(position):
+    row = db_adapter.execute_query(
+        "SELECT value FROM app_settings WHERE key = 'vote_changes_pruned_to'", fetch_one=True)
+    if row and position < tuple(int(part) for part in row['value'].split('.')):
+        raise CursorExpired()
+
+
+def get_changes(event_id, cursor=None, limit=None, wait=0):
+    """Changes after cursor, waiting up to `wait` seconds for the first one
+
+    Returns (changes, next_cursor, has_more); changes are compact
+    [op, round_id, contestant_id, vote_id, delta, created_at] lists.
+    """
+    position = decode_cursor(cursor) if cursor else (0, 0)
+    limit = limit or Config.CHANGES_PAGE_SIZE
+    _check_pruned(position)
+
+    deadline = time.monotonic() + wait
+    while True:
+        rows = db_adapter.execute_query(
+            CHANGES_QUERY, (event_id, position[0], position[1], limit), fetch_all=True)
+        if rows or time.monotonic() >= deadline:
+            break
+        time.sleep(min(Config.CHANGES_POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+
+    changes = [[r['op'], r['round_id'], r['contestant_id'], r['vote_id'], r['delta'],
+                r['created_at'].isoformat()] for r in rows]
+    if rows:
+        position = (int(rows[-1]['txid']), rows[-1]['id'])
+    return changes, encode_cursor(*position), len(rows) == limit
+
+
+def tally_deltas(changes):
+    """Net vote change per round and contestant, {round_id: {contestant_id: delta}}
+
+    Returns (tallies, reset). After a truncate the consumer has to drop
+    its state first (reset is True), so only later changes are summed.
+    """
+    tallies, reset = {}, False
+    for op, round_id, contestant_id, _, delta, _ in changes:
+        if op == 'truncate':
+            tallies, reset = {}, True
+            continue
+        by_contestant = tallies.setdefault(round_id, {})
+        by_contestant[contestant_id] = by_contestant.get(contestant_id, 0) + delta
+    return tallies, reset
@@ -33,6 +33,84 @@ class Config:
     # Rate limiting
     RATE_LIMIT_PER_HOUR = int(os.getenv('RATE_LIMIT_PER_HOUR', '10'))
     
+    # Events: requests without ?event= / X-Event use this one
+    DEFAULT_EVENT_ID = int(os.getenv('DEFAULT_EVENT_ID', '1'))
+    # Seconds per-event settings (voting_open, slug lookups) are cached in-process
+    EVENT_CACHE_TTL = float(os.getenv('EVENT_CACHE_TTL', '2'))
+    # Seconds an admin dashboard snapshot is shared before it is recomputed
+    DASHBOARD_CACHE_TTL = float(os.getenv('DASHBOARD_CACHE_TTL', '2'))
+
+    # Per-worker LRU of user agent -> user_agents.id
+    USER_AGENT_CACHE_SIZE = int(os.getenv('USER_AGENT_CACHE_SIZE', '1024'))
+    
+    # Admin exports: rows per keyset page
+    EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '5000'))
+    
+    # Admin timeline: most buckets returned per series
+    TIMELINE_MAX_POINTS = int(os.getenv('TIMELINE_MAX_POINTS', '360'))
+    
+    # Fraud detector: comma-separated networks (venue Wi-Fi NAT) exempt from IP/subnet rules
+    FRAUD_IP_ALLOWLIST = os.getenv('FRAUD_IP_ALLOWLIST', '')
+    
+    # Background admin jobs: 'thread' runs them in each web process,
+    # 'external' leaves them to scripts/run_jobs.py
+    JOB_RUNNER = os.getenv('JOB_RUNNER', 'thread')
+    JOB_MAX_RUNNING = int(os.getenv('JOB_MAX_RUNNING', '1'))
+    JOB_BATCH_SIZE = int(os.getenv('JOB_BATCH_SIZE', '2000'))
+    # Seconds a job sleeps between batches to leave the database to votes
+    JOB_BATCH_PAUSE = float(os.getenv('JOB_BATCH_PAUSE', '0.05'))
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '2'))
+    # Most tickets one generate-tickets job may create
+    JOB_MAX_TICKETS = int(os.getenv('JOB_MAX_TICKETS', '100000'))
+    # Running jobs without progress for this many seconds are failed
+    JOB_STALE_AFTER = int(os.getenv('JOB_STALE_AFTER', '300'))
+    
+    # Vote spool: SQLite file votes are written to while the database is
+    # unreachable (empty disables it)
+    VOTE_SPOOL_PATH = os.getenv('VOTE_SPOOL_PATH', 'data/vote_spool.sqlite3')
+    # Seconds votes skip the database after a connection failure
+    VOTE_SPOOL_RETRY_AFTER = float(os.getenv('VOTE_SPOOL_RETRY_AFTER', '5'))
+    VOTE_SPOOL_BATCH_SIZE = int(os.getenv('VOTE_SPOOL_BATCH_SIZE', '500'))
+    VOTE_SPOOL_POLL_INTERVAL = float(os.getenv('VOTE_SPOOL_POLL_INTERVAL', '2'))
+    # Seconds between reloads of the cached ticket index used while spooling
+    VOTE_SPOOL_INDEX_REFRESH = float(os.getenv('VOTE_SPOOL_INDEX_REFRESH', '120'))
+    # Seconds to wait for a database connection before treating it as down
+    DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', '5'))
+    
+    # Idempotency-Key on POST /api/vote: seconds and number of responses
+    # each worker keeps for replaying retries
+    IDEMPOTENCY_TTL = float(os.getenv('IDEMPOTENCY_TTL', '600'))
+    IDEMPOTENCY_MAX_ENTRIES = int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', '10000'))
+    # Seconds a duplicate vote waits for the in-flight one for the same ticket
+    VOTE_INFLIGHT_TIMEOUT = float(os.getenv('VOTE_INFLIGHT_TIMEOUT', '10'))
+    
+    # Most ballots accepted by one POST /api/admin/votes/batch
+    VOTE_BATCH_MAX_BALLOTS = int(os.getenv('VOTE_BATCH_MAX_BALLOTS', '20000'))
+    
+    # Key signing scripts/recount_votes.py summaries (falls back to SECRET_KEY)
+    RECOUNT_SIGNING_KEY = os.getenv('RECOUNT_SIGNING_KEY', '')
+    
+    # Vote change feed (GET /api/votes/changes)
+    CHANGES_PAGE_SIZE = int(os.getenv('CHANGES_PAGE_SIZE', '1000'))
+    # Longest long-poll (?wait=) and how often it re-checks. 0 disables
+    # long-polling; it also stays off without CHANGES_API_TOKEN and under
+    # gunicorn's sync worker, where a waiting request blocks the worker
+    CHANGES_MAX_WAIT = float(os.getenv('CHANGES_MAX_WAIT', '0'))
+    CHANGES_POLL_INTERVAL = float(os.getenv('CHANGES_POLL_INTERVAL', '1'))
+    # Bearer token required by the feed (admins always have access); empty keeps it public
+    CHANGES_API_TOKEN = os.getenv('CHANGES_API_TOKEN', '')
+    # Changes older than this are pruned by scripts/maintain_partitions.py
+    VOTE_CHANGES_RETENTION = os.getenv('VOTE_CHANGES_RETENTION', '7 days')
+    
+    # Frozen final results: where the JSON/.json.gz artifacts are written
+    # (empty: database only) and how long clients may cache /api/results
+    FROZEN_RESULTS_DIR = os.getenv('FROZEN_RESULTS_DIR', 'data/results')
+    FROZEN_RESULTS_MAX_AGE = int(os.getenv('FROZEN_RESULTS_MAX_AGE', '30'))
+    
+    # Seconds a coalesced read's result is reused after it returned
+    # (0: only calls already in flight share it)
+    DB_COALESCE_TTL = float(os.getenv('DB_COALESCE_TTL', '0'))
+    
     # Security
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
     
@@ -2,6 +2,9 @@
 Database adapter for Supabase PostgreSQL
 """
 import os
+import threading
+import time
+import uuid
 import psycopg2
 import psycopg2.extras
 from contextlib import contextmanager
@@ -10,25 +13,134 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Errors meaning "the database is unreachable", as opposed to a rejected statement
+OUTAGE_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error', 'expires')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.expires = None
+
+
+class SingleFlight:
+    """Identical calls in flight at the same time share one execution
+
+    Every caller gets the leader's result, or its exception raised again.
+    With ttl > 0 a successful result is also handed to calls arriving up to
+    ttl seconds after it returned. Results are shared objects: callers must
+    not modify them.
+    """
+
+    SWEEP_AT = 256
+
+    def __init__(self, ttl=0):
+        self.ttl = ttl
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+        self.cached = 0
+        self.failed = 0
+
+    def run(self, key, func):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and flight.expires is not None:
+                if flight.expires > time.monotonic():
+                    self.cached += 1
+                    return flight.result
+                flight = None
+            if flight is None:
+                if len(self._flights) >= self.SWEEP_AT:
+                    self._sweep()
+                flight = self._flights[key] = _Flight()
+                self.executed += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = func()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                if self.ttl > 0 and flight.error is None:
+                    flight.expires = time.monotonic() + self.ttl
+                elif self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+
+    def _sweep(self):
+        now = time.monotonic()
+        for key in [k for k, f in self._flights.items() if f.expires is not None and f.expires <= now]:
+            del self._flights[key]
+
+    def stats(self):
+        calls = self.executed + self.coalesced + self.cached
+        return {
+            'calls': calls,
+            'executed': self.executed,
+            'coalesced': self.coalesced,
+            'cached': self.cached,
+            'failed': self.failed,
+            'in_flight': sum(1 for f in list(self._flights.values()) if not f.done.is_set()),
+            'saved_ratio': round((self.coalesced + self.cached) / calls, 4) if calls else 0.0,
+            'ttl': self.ttl,
+        }
+
+
 class DatabaseAdapter:
     """Database adapter for Supabase PostgreSQL"""
     
     def __init__(self):
         self.db_type = Config.DATABASE_TYPE
         self.db_url = Config.DATABASE_URL
+        # Reads opted in with execute_query(..., coalesce=True)
+        self.single_flight = SingleFlight(Config.DB_COALESCE_TTL)
         
     @contextmanager
     def get_connection(self):
         """Get database connection for Supabase"""
-        conn = psycopg2.connect(self.db_url)
+        conn = psycopg2.connect(self.db_url, connect_timeout=Config.DB_CONNECT_TIMEOUT)
         conn.set_session(autocommit=False)
         try:
             yield conn
         finally:
             conn.close()
     
-    def execute_query(self, query, params=None, fetch_one=False, fetch_all=False):
-        """Execute a query and return results"""
+    def execute_query(self, query, params=None, fetch_one=False, fetch_all=False, coalesce=False):
+        """Execute a query and return results
+        
+        coalesce=True is for hot reads only: identical (query, params)
+        calls in flight at the same time in this process share one
+        execution and its (unmodifiable) result; see SingleFlight.
+        """
+        if coalesce:
+            try:
+                key = (query, tuple(params or ()), fetch_one, fetch_all)
+                hash(key)
+            except TypeError:
+                pass
+            else:
+                return self.single_flight.run(
+                    key, lambda: self._execute(query, params, fetch_one, fetch_all))
+        return self._execute(query, params, fetch_one, fetch_all)
+    
+    def _execute(self, query, params, fetch_one, fetch_all):
         with self.get_connection() as conn:
             cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
             
@@ -51,6 +163,59 @@ class DatabaseAdapter:
             finally:
                 cursor.close()
     
+    def iter_query(self, query, params=None, itersize=2000, as_dict=True):
+        """Stream rows through a named server-side cursor
+
+        Only `itersize` rows are held in memory at a time, so large reads can
+        feed a Flask streaming response in constant memory. Rows are
+        RealDictRows by default, plain tuples with as_dict=False. The cursor
+        and connection are released when the generator is exhausted, closed
+        or garbage collected.
+        """
+        cursor_factory = psycopg2.extras.RealDictCursor if as_dict else None
+        with self.get_connection() as conn:
+            # Named cursors live inside a transaction; keep it read-only
+            conn.set_session(readonly=True)
+            cursor = conn.cursor(name=f"iter_{uuid.uuid4().hex}", cursor_factory=cursor_factory)
+            cursor.itersize = itersize
+
+            try:
+                cursor.execute(query, params or ())
+                for row in cursor:
+                    yield row
+            except Exception as e:
+                logger.error(f"Database error: {e}")
+                raise
+            finally:
+                try:
+                    cursor.close()
+                finally:
+                    conn.rollback()
+
+    def copy_and_query(self, setup, copy_sql, data, query, params=None):
+        """Bulk-load data and query it in one transaction
+
+        Runs the setup statement (e.g. CREATE TEMP TABLE ... ON COMMIT DROP),
+        feeds the file-like `data` to `copy_sql` (COPY ... FROM STDIN), then
+        returns all rows of `query`.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+
+            try:
+                cursor.execute(setup)
+                cursor.copy_expert(copy_sql, data)
+                cursor.execute(query, params or ())
+                result = cursor.fetchall()
+                conn.commit()
+                return result
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Database error: {e}")
+                raise
+            finally:
+                cursor.close()
+
     def execute_function(self, func_name, params=None):
         """Execute a PostgreSQL function (for Supabase)"""
         param_placeholders = ', '.join(['%s'] * len(params)) if params else ''
@@ -0,0 +1,148 @@
+"""
+Streaming exports of votes, tickets and audit_log
+
+Rows are read with keyset pagination on id: every page is its own short
+query, so no transaction is held open on the primary for the length of
+the download and server memory stays bounded by one page. An export can
+be resumed after a disconnect by passing the last id received as
+after_id. Given an event_id, only that event's rows are exported.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, date
+from .config import Config
+from .database import db_adapter
+
+EXPORT_TABLES = {
+    'votes': ['id', 'event_id', 'contestant_id', 'ticket_id', 'ip_address', 'user_agent', 'created_at', 'round_id'],
+    'tickets': ['id', 'event_id', 'ticket_code', 'is_used', 'created_at', 'used_at', 'used_round_id'],
+    'audit_log': ['id', 'event_type', 'table_name', 'record_id', 'old_values', 'new_values',
+                  'ip_address', 'user_agent', 'created_at'],
+}
+
+# Relation read for a table; votes carry only user_agent_id since migration 012
+EXPORT_SOURCES = {
+    'votes': 'votes_detail',
+}
+
+# Condition restricting a table to one event (the event id is its parameter).
+# audit_log has no event column: INSERT and DELETE rows carry event_id in
+# their row image, UPDATE rows only the changed columns, so those are
+# attributed through the audited row (updates of rows deleted since are
+# left out).
+EXPORT_EVENT_FILTERS = {
+    'votes': 'event_id = %s',
+    'tickets': 'event_id = %s',
+    'audit_log': """COALESCE(
+        (new_values->>'event_id')::INTEGER,
+        (old_values->>'event_id')::INTEGER,
+        CASE table_name
+            WHEN 'tickets' THEN (SELECT t.event_id FROM tickets t WHERE t.id = record_id)
+            WHEN 'contestants' THEN (SELECT c.event_id FROM contestants c WHERE c.id = record_id)
+            WHEN 'votes' THEN (SELECT v.event_id FROM votes v WHERE v.id = record_id)
+        END) = %s""",
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _to_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(',', ':'))
+    return str(value)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def get_export_bounds(table):
+    """Highest id at export start; rows inserted afterwards are left for the next export"""
+    row = db_adapter.execute_query(f'SELECT MAX(id) AS max_id FROM {table}', fetch_one=True)
+    return row['max_id'] if row and row['max_id'] is not None else 0
+
+
+def iter_pages(table, after_id=0, until_id=None, since=None, chunk_size=None, event_id=None):
+    """Yield lists of rows in id order, one short keyset query per page"""
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown export table: {table}")
+
+    chunk_size = chunk_size or Config.EXPORT_CHUNK_SIZE
+    if until_id is None:
+        until_id = get_export_bounds(table)
+
+    columns = ', '.join(EXPORT_TABLES[table])
+    query = f'SELECT {columns} FROM {EXPORT_SOURCES.get(table, table)} WHERE id > %s AND id <= %s'
+    filters = []
+    if since is not None:
+        query += ' AND created_at >= %s'
+        filters.append(since)
+    if event_id is not None:
+        query += f' AND {EXPORT_EVENT_FILTERS[table]}'
+        filters.append(event_id)
+    query += ' ORDER BY id LIMIT %s'
+
+    last_id = after_id or 0
+    while last_id < until_id:
+        params = [last_id, until_id] + filters + [chunk_size]
+        rows = db_adapter.execute_query(query, tuple(params), fetch_all=True)
+        if not rows:
+            break
+        yield rows
+        last_id = rows[-1]['id']
+
+
+def iter_export(table, fmt='csv', after_id=0, until_id=None, since=None,
+                chunk_size=None, compress=False, event_id=None):
+    """Yield encoded export chunks (bytes), optionally gzip-compressed on the fly"""
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown export table: {table}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    columns = EXPORT_TABLES[table]
+    pages = iter_pages(table, after_id=after_id, until_id=until_id, since=since, chunk_size=chunk_size,
+                       event_id=event_id)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def emit(text):
+        data = text.encode('utf-8')
+        return compressor.compress(data) if compressor else data
+
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator='\n')
+
+    # A resumed export continues an existing file, so only the first part has a header
+    if fmt == 'csv' and not after_id:
+        writer.writerow(columns)
+
+    for rows in pages:
+        if fmt == 'csv':
+            for row in rows:
+                writer.writerow([_to_text(row[c]) for c in columns])
+        else:
+            for row in rows:
+                buf.write(json.dumps(row, default=_json_default, separators=(',', ':')))
+                buf.write('\n')
+        chunk = emit(buf.getvalue())
+        buf.seek(0)
+        buf.truncate()
+        if chunk:
+            yield chunk
+
+    tail = emit(buf.getvalue())
+    if compressor:
+        tail += compressor.flush()
+    if tail:
+        yield tail
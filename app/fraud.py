@@ -0,0 +1,375 @@
+"""
+Vote-fraud detection over ip_address / user_agent / seat bursts
+
+FraudDetector consumes votes in created_at order and keeps sliding-window
+counters per IP, per /24 subnet (/64 for IPv6), per user-agent
+fingerprint and per (seat section, contestant). A rule fires when a window
+holds too many votes, or when consecutive seats of one section vote for
+the same contestant in lockstep; flagged votes are merged into clusters
+that keep growing while the burst lasts.
+
+It runs off the request path (scripts/detect_fraud.py) and stores
+clusters in vote_flags (migration 011). rescore() recomputes the same
+window features for a batch of votes with NumPy, for backfills and for
+tuning thresholds against past events.
+"""
+import hashlib
+import ipaddress
+import json
+import logging
+from collections import deque, defaultdict
+from datetime import datetime, timezone
+from .config import Config
+from .database import db_adapter
+
+try:
+    import numpy as np
+except ImportError:  # only needed for batch rescoring
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# kind -> window (seconds) and how many votes inside it trigger a flag.
+# Venue Wi-Fi puts many honest voters behind one NAT address; list those
+# networks in FRAUD_IP_ALLOWLIST rather than raising the thresholds.
+DEFAULT_RULES = {
+    'ip_burst': {'window': 30.0, 'threshold': 8},
+    'subnet_burst': {'window': 30.0, 'threshold': 25},
+    'ua_burst': {'window': 10.0, 'threshold': 40},
+    'seat_lockstep': {'window': 20.0, 'threshold': 4},
+}
+
+# Most vote ids kept per stored cluster (vote_count keeps the full size)
+MAX_CLUSTER_VOTE_IDS = 500
+
+# Votes as read by the detector (created_at order, with the seat code)
+VOTES_SINCE_QUERY = """
+    SELECT v.id, v.event_id, v.contestant_id, v.ticket_id, host(v.ip_address) AS ip_address,
+           u.user_agent, v.created_at, t.ticket_code
+    FROM votes v
+    JOIN tickets t ON t.id = v.ticket_id
+    LEFT JOIN user_agents u ON u.id = v.user_agent_id
+    WHERE v.created_at >= %s
+    ORDER BY v.created_at, v.id
+    LIMIT %s
+"""
+
+VOTES_BETWEEN_QUERY = """
+    SELECT v.id, v.event_id, v.contestant_id, v.ticket_id, host(v.ip_address) AS ip_address,
+           u.user_agent, v.created_at, t.ticket_code
+    FROM votes v
+    JOIN tickets t ON t.id = v.ticket_id
+    LEFT JOIN user_agents u ON u.id = v.user_agent_id
+    WHERE v.created_at >= %s AND v.created_at < %s
+    ORDER BY v.created_at, v.id
+"""
+
+
+def subnet_of(ip):
+    """'/24' network of an IPv4 address ('/64' for IPv6), None if unparsable"""
+    try:
+        addr = ipaddress.ip_address(ip)
+    except (TypeError, ValueError):
+        return None
+    prefix = 24 if addr.version == 4 else 64
+    return str(ipaddress.ip_network(f"{addr}/{prefix}", strict=False))
+
+
+def ua_fingerprint(user_agent):
+    """Short stable hash of a whitespace/case-normalised user agent"""
+    normalised = ' '.join((user_agent or '').lower().split())
+    return hashlib.sha1(normalised.encode('utf-8')).hexdigest()[:12]
+
+
+def split_seat(ticket_code):
+    """('D13', 4) for 'D13.4', ('A2.R3', 5) for 'A2.R3.5'; (None, None) for non-seat codes"""
+    section, _, seat = (ticket_code or '').rpartition('.')
+    if not section or not seat.isdigit():
+        return None, None
+    return section, int(seat)
+
+
+def _epoch(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return float(value)
+
+
+class _Cluster:
+    """Votes flagged by one rule on one key during one burst"""
+
+    def __init__(self, event_id, kind, key, first_ts):
+        self.event_id = event_id
+        self.kind = kind
+        self.key = key
+        self.first_ts = first_ts
+        self.last_ts = first_ts
+        self.vote_ids = set()
+        self.contestants = defaultdict(int)
+        self.peak = 0
+
+    def add(self, votes, window_count):
+        for vote in votes:
+            if vote['id'] not in self.vote_ids:
+                self.vote_ids.add(vote['id'])
+                self.contestants[vote['contestant_id']] += 1
+            self.first_ts = min(self.first_ts, vote['ts'])
+            self.last_ts = max(self.last_ts, vote['ts'])
+        self.peak = max(self.peak, window_count)
+
+    def to_row(self, threshold):
+        return {
+            'event_id': self.event_id,
+            'kind': self.kind,
+            'cluster_key': self.key,
+            'first_vote_at': datetime.fromtimestamp(self.first_ts, timezone.utc),
+            'last_vote_at': datetime.fromtimestamp(self.last_ts, timezone.utc),
+            'vote_count': len(self.vote_ids),
+            'score': round(self.peak / threshold, 2),
+            'vote_ids': sorted(self.vote_ids)[:MAX_CLUSTER_VOTE_IDS],
+            'details': {'peak_in_window': self.peak,
+                        'contestants': {str(k): v for k, v in self.contestants.items()}},
+        }
+
+
+class FraudDetector:
+    """Incremental detector; feed votes in created_at order with process()"""
+
+    def __init__(self, rules=None, allowlist=None):
+        self.rules = {kind: dict(rule) for kind, rule in DEFAULT_RULES.items()}
+        for kind, rule in (rules or {}).items():
+            self.rules[kind].update(rule)
+        if allowlist is None:
+            allowlist = [n.strip() for n in Config.FRAUD_IP_ALLOWLIST.split(',') if n.strip()]
+        self.allowlist = [ipaddress.ip_network(n, strict=False) for n in allowlist]
+        # (kind, event_id, key) -> deque of votes inside the rule's window
+        self.windows = defaultdict(deque)
+        # (kind, event_id, key) -> cluster still within its window
+        self.open_clusters = {}
+        self.seen = {}
+        self.last_ts = 0.0
+
+    def _allowlisted(self, ip):
+        try:
+            addr = ipaddress.ip_address(ip)
+        except (TypeError, ValueError):
+            return False
+        return any(addr in network for network in self.allowlist)
+
+    def _keys(self, vote):
+        """(kind, key) pairs a vote is counted under"""
+        keys = []
+        ip = vote.get('ip_address')
+        if ip and not self._allowlisted(ip):
+            keys.append(('ip_burst', ip))
+            subnet = subnet_of(ip)
+            if subnet:
+                keys.append(('subnet_burst', subnet))
+        if vote.get('user_agent'):
+            keys.append(('ua_burst', ua_fingerprint(vote['user_agent'])))
+        section, seat = split_seat(vote.get('ticket_code'))
+        if section is not None:
+            vote['seat'] = seat
+            keys.append(('seat_lockstep', f"{section}:{vote['contestant_id']}"))
+        return keys
+
+    def _window(self, kind, event_id, key, ts):
+        window = self.windows[(kind, event_id, key)]
+        horizon = ts - self.rules[kind]['window']
+        while window and window[0]['ts'] < horizon:
+            window.popleft()
+        return window
+
+    @staticmethod
+    def _lockstep_run(window, seat):
+        """Votes forming the run of consecutive seats around seat"""
+        by_seat = {v['seat']: v for v in window}
+        low = high = seat
+        while low - 1 in by_seat:
+            low -= 1
+        while high + 1 in by_seat:
+            high += 1
+        return [by_seat[s] for s in range(low, high + 1)]
+
+    def process(self, votes):
+        """Add votes (dicts with id, event_id, contestant_id, ip_address,
+        user_agent, created_at, ticket_code); returns the clusters they
+        created or grew, as vote_flags rows"""
+        touched = {}
+        for raw in votes:
+            if raw['id'] in self.seen:
+                continue
+            vote = dict(raw, ts=_epoch(raw['created_at']))
+            self.seen[vote['id']] = vote['ts']
+            self.last_ts = max(self.last_ts, vote['ts'])
+
+            for kind, key in self._keys(vote):
+                rule = self.rules[kind]
+                window = self._window(kind, vote['event_id'], key, vote['ts'])
+                window.append(vote)
+                if kind == 'seat_lockstep':
+                    hits = self._lockstep_run(window, vote['seat'])
+                else:
+                    hits = window
+                if len(hits) < rule['threshold']:
+                    continue
+
+                cluster_id = (kind, vote['event_id'], key)
+                cluster = self.open_clusters.get(cluster_id)
+                if cluster is None or vote['ts'] - cluster.last_ts > rule['window']:
+                    cluster = _Cluster(vote['event_id'], kind, key, vote['ts'])
+                    self.open_clusters[cluster_id] = cluster
+                cluster.add(hits, len(hits))
+                touched[(cluster_id, cluster.first_ts)] = cluster
+
+        self._expire()
+        return [c.to_row(self.rules[c.kind]['threshold']) for c in touched.values()]
+
+    def _expire(self):
+        """Forget windows, clusters and seen ids older than every rule's window"""
+        horizon = self.last_ts - max(rule['window'] for rule in self.rules.values()) * 2
+        for window_key in [k for k, w in self.windows.items() if not w or w[-1]['ts'] < horizon]:
+            del self.windows[window_key]
+        for cluster_id in [k for k, c in self.open_clusters.items() if c.last_ts < horizon]:
+            del self.open_clusters[cluster_id]
+        for vote_id in [k for k, ts in self.seen.items() if ts < horizon]:
+            del self.seen[vote_id]
+
+
+def rescore(votes, rules=None):
+    """Window features for a batch of votes, vectorised with NumPy
+
+    Returns {kind: array of votes-in-window per vote} for the counting
+    rules plus 'seat_lockstep' (length of the consecutive-seat run each
+    vote belongs to) and 'flagged' (bool per vote, any rule at threshold).
+    Allowlisted addresses are not counted for the IP/subnet rules.
+    """
+    if np is None:
+        raise RuntimeError('numpy is required for batch rescoring: pip install numpy')
+    rules = {kind: dict(rule, **(rules or {}).get(kind, {})) for kind, rule in DEFAULT_RULES.items()}
+    detector = FraudDetector(rules=rules)
+    n = len(votes)
+    if n == 0:
+        return {kind: np.zeros(0, dtype=np.int64) for kind in list(rules) + ['flagged']}
+
+    ts = np.array([_epoch(v['created_at']) for v in votes], dtype=np.float64)
+    events = np.array([v['event_id'] for v in votes], dtype=np.int64)
+    allowed = np.array([bool(v.get('ip_address')) and not detector._allowlisted(v['ip_address'])
+                        for v in votes])
+    keys = {
+        'ip_burst': [v.get('ip_address') or '' for v in votes],
+        'subnet_burst': [subnet_of(v.get('ip_address')) or '' for v in votes],
+        'ua_burst': [ua_fingerprint(v['user_agent']) if v.get('user_agent') else '' for v in votes],
+    }
+    valid = {
+        'ip_burst': allowed,
+        'subnet_burst': allowed & np.array([k != '' for k in keys['subnet_burst']]),
+        'ua_burst': np.array([k != '' for k in keys['ua_burst']]),
+    }
+
+    features = {}
+    for kind, key_values in keys.items():
+        features[kind] = _window_counts(events, key_values, ts, rules[kind]['window'], valid[kind])
+
+    seats = [split_seat(v.get('ticket_code')) for v in votes]
+    lock_keys = [f"{section}:{v['contestant_id']}" if section is not None else ''
+                 for (section, _), v in zip(seats, votes)]
+    seat_no = np.array([seat if seat is not None else -1 for _, seat in seats], dtype=np.int64)
+    features['seat_lockstep'] = _lockstep_runs(events, lock_keys, seat_no, ts,
+                                               rules['seat_lockstep']['window'], seat_no >= 0)
+
+    flagged = np.zeros(n, dtype=bool)
+    for kind, rule in rules.items():
+        flagged |= features[kind] >= rule['threshold']
+    features['flagged'] = flagged
+    return features
+
+
+def _group_codes(events, key_values):
+    """Dense integer id per (event, key)"""
+    _, key_codes = np.unique(np.array(key_values, dtype=object).astype(str), return_inverse=True)
+    _, codes = np.unique(np.stack([events, key_codes]), axis=1, return_inverse=True)
+    return codes.ravel()
+
+
+def _window_counts(events, key_values, ts, window, valid):
+    """Votes with the same (event, key) in [ts - window, ts], per vote"""
+    codes = _group_codes(events, key_values)
+    order = np.lexsort((ts, codes))
+    # Groups are laid end to end on one time axis, far enough apart that a
+    # window can never reach into the previous group
+    span = ts.max() - ts.min() + window + 1.0
+    axis = codes[order] * span + (ts[order] - ts.min())
+    left = np.searchsorted(axis, axis - window, side='left')
+    counts = np.empty(len(ts), dtype=np.int64)
+    counts[order] = np.arange(len(ts)) - left + 1
+    return np.where(valid, counts, 0)
+
+
+def _lockstep_runs(events, key_values, seat_no, ts, window, valid):
+    """Length of the run of consecutive seats (same event/section/contestant,
+    each vote within window of the previous) every vote belongs to"""
+    codes = _group_codes(events, key_values)
+    order = np.lexsort((ts, seat_no, codes))
+    c, s, t = codes[order], seat_no[order], ts[order]
+    linked = np.zeros(len(ts), dtype=bool)
+    linked[1:] = (c[1:] == c[:-1]) & (s[1:] == s[:-1] + 1) & (np.abs(t[1:] - t[:-1]) <= window)
+    run_id = np.cumsum(~linked)
+    run_len = np.bincount(run_id)[run_id]
+    runs = np.empty(len(ts), dtype=np.int64)
+    runs[order] = run_len
+    return np.where(valid, runs, 0)
+
+
+def save_clusters(rows):
+    """Upsert cluster rows into vote_flags; a growing cluster replaces its earlier snapshot"""
+    query = """
+        INSERT INTO vote_flags (event_id, kind, cluster_key, first_vote_at, last_vote_at,
+                                vote_count, score, vote_ids, details)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (event_id, kind, cluster_key, first_vote_at) DO UPDATE
+        SET last_vote_at = GREATEST(vote_flags.last_vote_at, EXCLUDED.last_vote_at),
+            vote_count = GREATEST(vote_flags.vote_count, EXCLUDED.vote_count),
+            score = GREATEST(vote_flags.score, EXCLUDED.score),
+            vote_ids = EXCLUDED.vote_ids,
+            details = EXCLUDED.details,
+            updated_at = NOW()
+    """
+    for row in rows:
+        db_adapter.execute_query(query, (
+            row['event_id'], row['kind'], row['cluster_key'], row['first_vote_at'],
+            row['last_vote_at'], row['vote_count'], row['score'], row['vote_ids'],
+            json.dumps(row['details'])))
+    return len(rows)
+
+
+def get_flagged_clusters(event_id, since=None, kind=None, status=None, limit=100):
+    """Most recently active clusters of an event"""
+    query = """
+        SELECT id, kind, cluster_key, first_vote_at, last_vote_at, vote_count, score,
+               vote_ids, details, status
+        FROM vote_flags WHERE event_id = %s
+    """
+    params = [event_id]
+    if since is not None:
+        query += ' AND last_vote_at >= %s'
+        params.append(since)
+    if kind is not None:
+        query += ' AND kind = %s'
+        params.append(kind)
+    if status is not None:
+        query += ' AND status = %s'
+        params.append(status)
+    query += ' ORDER BY last_vote_at DESC LIMIT %s'
+    params.append(limit)
+
+    rows = db_adapter.execute_query(query, tuple(params), fetch_all=True)
+    return [
+        dict(row,
+             score=float(row['score']),
+             first_vote_at=row['first_vote_at'].isoformat(),
+             last_vote_at=row['last_vote_at'].isoformat())
+        for row in rows
+    ]
@@ -0,0 +1,178 @@
+"""
+Frozen final results (migration 019)
+
+Freezing computes an event's results once, after voting closed, and stores
+the exact /api/results body as a numbered artifact. It is also written to
+FROZEN_RESULTS_DIR as results-event<id>-v<version>.json plus a .json.gz
+for static hosting. While an event is frozen every worker serves the
+artifact from memory, with a precomputed gzip body and ETag; the only
+database access left is the EVENT_CACHE_TTL check of which version is
+current, so unfreezing (or opening voting again) takes effect everywhere
+within seconds.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from .cache import event_cache
+from .config import Config
+from .database import db_adapter
+from .models import get_voting_results
+
+logger = logging.getLogger(__name__)
+
+# The artifact is only inserted once the closed event row is locked, so a
+# freeze racing a reopen leaves no orphan version behind
+FREEZE_QUERY = """
+    WITH closed_event AS (
+        SELECT id FROM events WHERE id = %s AND NOT voting_open FOR UPDATE
+    ),
+    artifact AS (
+        INSERT INTO results_artifacts (event_id, version, round_id, body, sha256)
+        SELECT id, %s, %s::INTEGER, %s, %s FROM closed_event
+        RETURNING event_id, version
+    )
+    UPDATE events e SET frozen_results_version = a.version
+    FROM artifact a
+    WHERE e.id = a.event_id
+    RETURNING e.frozen_results_version AS version
+"""
+
+
+class FreezeError(Exception):
+    """Results cannot be frozen right now (voting open or just closed)"""
+
+
+class Artifact:
+    """One frozen results body, ready to send"""
+
+    def __init__(self, event_id, version, body):
+        self.event_id = event_id
+        self.version = version
+        self.body = body.encode() if isinstance(body, str) else body
+        self.sha256 = hashlib.sha256(self.body).hexdigest()
+        # mtime=0 keeps the compressed bytes identical on every worker
+        self.gzipped = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.etag = f'"r{event_id}-v{version}-{self.sha256[:16]}"'
+
+
+_artifacts = {}
+_lock = threading.Lock()
+
+
+def artifact_path(event_id, version, compressed=False):
+    name = f"results-event{event_id}-v{version}.json" + ('.gz' if compressed else '')
+    return os.path.join(Config.FROZEN_RESULTS_DIR, name)
+
+
+def _write_files(artifact):
+    """Write the JSON and .json.gz next to each other (atomically, best effort)"""
+    if not Config.FROZEN_RESULTS_DIR:
+        return
+    try:
+        os.makedirs(Config.FROZEN_RESULTS_DIR, exist_ok=True)
+        for compressed, data in ((False, artifact.body), (True, artifact.gzipped)):
+            path = artifact_path(artifact.event_id, artifact.version, compressed)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(path + '.tmp', path)
+    except OSError as e:
+        logger.warning(f"Could not write frozen results files: {e}")
+
+
+def frozen_version(event_id):
+    """Version of the event's frozen results, None when live (cached)"""
+    def load():
+        row = db_adapter.execute_query(
+            'SELECT frozen_results_version FROM events WHERE id = %s', (event_id,), fetch_one=True,
+            coalesce=True)
+        return row['frozen_results_version'] if row else None
+    return event_cache.get(event_id, 'frozen_version', load)
+
+
+def load_artifact(event_id, version):
+    """Artifact of a version from memory, then disk, then the database; None if unknown"""
+    artifact = _artifacts.get(event_id)
+    if artifact is not None and artifact.version == version:
+        return artifact
+    body = None
+    try:
+        with open(artifact_path(event_id, version), 'rb') as f:
+            body = f.read()
+    except (OSError, TypeError):
+        pass
+    if body is None:
+        row = db_adapter.execute_query(
+            'SELECT body FROM results_artifacts WHERE event_id = %s AND version = %s',
+            (event_id, version), fetch_one=True)
+        if row is None:
+            return None
+        body = row['body']
+    artifact = Artifact(event_id, version, body)
+    with _lock:
+        current = _artifacts.get(event_id)
+        if current is None or current.version <= version:
+            _artifacts[event_id] = artifact
+    return artifact
+
+
+def get_frozen_results(event_id):
+    """The artifact to serve for /api/results, or None while results are live"""
+    version = frozen_version(event_id)
+    if version is None:
+        return None
+    return load_artifact(event_id, version)
+
+
+def freeze_results(event_id):
+    """Compute the final results once and switch the event to them; returns the Artifact"""
+    state = db_adapter.execute_query(
+        'SELECT voting_open, EXTRACT(EPOCH FROM NOW() - updated_at) AS closed_for, '
+        '(SELECT COALESCE(MAX(version), 0) + 1 FROM results_artifacts WHERE event_id = %s) AS next_version, '
+        'current_round_id(%s) AS round_id '
+        'FROM events WHERE id = %s',
+        (event_id, event_id, event_id), fetch_one=True)
+    if state is None:
+        raise FreezeError('Unknown event')
+    if state['voting_open']:
+        raise FreezeError('Close voting before freezing the results')
+    # Workers accept votes for up to EVENT_CACHE_TTL after closing
+    settle = Config.EVENT_CACHE_TTL + 1
+    if state['closed_for'] is not None and float(state['closed_for']) < settle:
+        raise FreezeError(f'Voting closed moments ago; freeze again in {settle:.0f} seconds')
+
+    results, total_votes = get_voting_results(event_id)
+    version = state['next_version']
+    frozen_at = Config.get_current_time().isoformat()
+    body = json.dumps({
+        'results': results,
+        'total_votes': total_votes,
+        'voting_open': False,
+        'current_time': frozen_at,
+        'frozen': True,
+        'frozen_at': frozen_at,
+        'version': version,
+        'round_id': state['round_id'],
+    }, separators=(',', ':'))
+    artifact = Artifact(event_id, version, body)
+
+    row = db_adapter.execute_query(
+        FREEZE_QUERY, (event_id, version, state['round_id'], body, artifact.sha256), fetch_one=True)
+    if row is None:
+        raise FreezeError('Voting was opened again while freezing')
+    with _lock:
+        _artifacts[event_id] = artifact
+    event_cache.invalidate(event_id, 'frozen_version')
+    _write_files(artifact)
+    logger.info(f"Results of event {event_id} frozen as version {version} ({total_votes} votes)")
+    return artifact
+
+
+def unfreeze_results(event_id):
+    """Serve live results again"""
+    db_adapter.execute_query('UPDATE events SET frozen_results_version = NULL WHERE id = %s', (event_id,))
+    event_cache.invalidate(event_id, 'frozen_version')
+    with _lock:
+        _artifacts.pop(event_id, None)
@@ -0,0 +1,108 @@
+"""
+Safe retries for POST /api/vote
+
+Phones on flaky Wi-Fi resend a vote whose answer they never received, and
+users double-tap. Two per-worker structures keep those from turning into
+a second submit_vote call answered with "Ticket already used":
+
+- vote_responses remembers the response sent for each Idempotency-Key
+  (IDEMPOTENCY_TTL seconds, at most IDEMPOTENCY_MAX_ENTRIES keys) so a
+  retry gets the original answer back;
+- vote_inflight lets concurrent requests for the same ticket wait for
+  the first one instead of racing it to the database.
+"""
+import threading
+import time
+from collections import OrderedDict
+from .config import Config
+
+
+class ResponseCache:
+    """Responses by key, dropped after ttl seconds or when max_entries is exceeded"""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """(fingerprint, status, body) stored for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            return entry[1:]
+
+    def put(self, key, fingerprint, status, body):
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, fingerprint, status, body)
+            self._entries.move_to_end(key)
+            # Oldest first: trim expired entries and anything over the cap
+            while self._entries:
+                oldest = next(iter(self._entries.values()))
+                if len(self._entries) <= self.max_entries and oldest[0] > now:
+                    break
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class _Call:
+    def __init__(self, tag):
+        self.tag = tag
+        self.done = threading.Event()
+        self.ok = False
+        self.result = None
+
+
+class InFlight:
+    """Concurrent calls for the same key share the first call's result
+
+    Only callers passing the same tag share it (the same vote, not just the
+    same ticket); others wait for the first call to finish and then run
+    their own. A waiter also runs its own call when the first one raised or
+    took longer than timeout seconds.
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, tag, func):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call(tag)
+                leader = True
+            else:
+                leader = False
+        if not leader:
+            if call.done.wait(self.timeout) and call.ok and call.tag == tag:
+                return call.result
+            return func()
+        try:
+            call.result = func()
+            call.ok = True
+            return call.result
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def __len__(self):
+        return len(self._calls)
+
+
+vote_responses = ResponseCache(Config.IDEMPOTENCY_TTL, Config.IDEMPOTENCY_MAX_ENTRIES)
+vote_inflight = InFlight(Config.VOTE_INFLIGHT_TIMEOUT)
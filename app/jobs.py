@@ -0,0 +1,241 @@
+"""
+Background jobs for heavy admin operations
+
+Generating, clearing and resetting an event's tickets can take long on
+big datasets; admin endpoints enqueue them in admin_jobs (migration 015)
+and return the job id instead of holding a web worker. A JobRunner
+thread in each web process, or scripts/run_jobs.py when JOB_RUNNER is
+'external', claims queued jobs through claim_admin_job() (at most
+JOB_MAX_RUNNING at once across all runners) and runs them in batches of
+JOB_BATCH_SIZE rows, pausing JOB_BATCH_PAUSE seconds between batches so
+votes keep their share of the database.
+
+Handlers report progress through ctx.checkpoint(), which also raises
+JobCancelled once an admin cancelled the job; batches already committed
+stay done.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from .config import Config
+from .database import db_adapter
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {}
+
+JOB_COLUMNS = ('id', 'event_id', 'kind', 'params', 'status', 'cancel_requested', 'progress', 'total',
+               'message', 'result', 'created_at', 'started_at', 'finished_at')
+
+
+class JobCancelled(Exception):
+    """Raised by JobContext.checkpoint() when the job was cancelled"""
+
+
+class JobBusy(Exception):
+    """The event already has an unfinished job"""
+
+    def __init__(self, job):
+        super().__init__(f"Job {job['id']} ({job['kind']}) is still {job['status']}")
+        self.job = job
+
+
+def job_handler(kind):
+    """Register a function(ctx, event_id, **params) as the handler for kind"""
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+
+def job_to_dict(row):
+    """JSON-ready job row"""
+    job = {c: row.get(c) for c in JOB_COLUMNS}
+    for c in ('created_at', 'started_at', 'finished_at'):
+        if job[c] is not None:
+            job[c] = job[c].isoformat()
+    return job
+
+
+def enqueue(kind, event_id, params=None):
+    """Queue a job and wake the local runner; raises JobBusy if the event has one unfinished"""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    row = db_adapter.execute_query(
+        "INSERT INTO admin_jobs (event_id, kind, params) VALUES (%s, %s, %s) "
+        "ON CONFLICT (event_id) WHERE status IN ('queued', 'running') DO NOTHING RETURNING *",
+        (event_id, kind, json.dumps(params or {})), fetch_one=True)
+    if row is None:
+        active = db_adapter.execute_query(
+            "SELECT * FROM admin_jobs WHERE event_id = %s AND status IN ('queued', 'running')",
+            (event_id,), fetch_one=True)
+        if active is None:
+            # Finished in between; try once more
+            return enqueue(kind, event_id, params)
+        raise JobBusy(job_to_dict(active))
+    runner.wake()
+    return job_to_dict(row)
+
+
+def get_job(job_id):
+    row = db_adapter.execute_query('SELECT * FROM admin_jobs WHERE id = %s', (job_id,), fetch_one=True)
+    return job_to_dict(row) if row else None
+
+
+def list_jobs(event_id, limit=20):
+    rows = db_adapter.execute_query(
+        'SELECT * FROM admin_jobs WHERE event_id = %s ORDER BY created_at DESC LIMIT %s',
+        (event_id, limit), fetch_all=True)
+    return [job_to_dict(r) for r in rows]
+
+
+def cancel_job(job_id):
+    """Cancel a queued job now, or ask a running one to stop at its next batch"""
+    row = db_adapter.execute_query("""
+        UPDATE admin_jobs
+        SET cancel_requested = TRUE,
+            status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END,
+            finished_at = CASE WHEN status = 'queued' THEN NOW() ELSE finished_at END
+        WHERE id = %s AND status IN ('queued', 'running')
+        RETURNING *
+    """, (job_id,), fetch_one=True)
+    return job_to_dict(row) if row else get_job(job_id)
+
+
+class JobContext:
+    """Progress reporting and cancellation for one running job"""
+
+    def __init__(self, row):
+        self.id = row['id']
+        self.event_id = row['event_id']
+        self.batch_size = Config.JOB_BATCH_SIZE
+
+    def checkpoint(self, done, total=None, message=None):
+        """Record progress, raise JobCancelled if cancelled, then yield to the vote path
+
+        Also raises JobCancelled once the job is no longer running, e.g.
+        after claim_admin_job() marked it failed for a stale heartbeat, so
+        a reaped job stops instead of running next to its successor.
+        """
+        row = db_adapter.execute_query(
+            'UPDATE admin_jobs SET progress = %s, total = COALESCE(%s, total), '
+            'message = COALESCE(%s, message), heartbeat_at = NOW() '
+            "WHERE id = %s AND status = 'running' RETURNING cancel_requested",
+            (done, total, message, self.id), fetch_one=True)
+        if row is None or row['cancel_requested']:
+            raise JobCancelled()
+        if Config.JOB_BATCH_PAUSE > 0:
+            time.sleep(Config.JOB_BATCH_PAUSE)
+
+
+def run_job(row):
+    """Run one claimed job to completion and record the outcome"""
+    ctx = JobContext(row)
+    handler = JOB_HANDLERS.get(row['kind'])
+    status, result, message = 'failed', None, None
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job kind: {row['kind']}")
+        result = handler(ctx, row['event_id'], **(row['params'] or {}))
+        status, message = 'succeeded', 'Done'
+    except JobCancelled:
+        status, message = 'cancelled', 'Cancelled'
+    except Exception as e:
+        logger.error(f"Job {row['id']} ({row['kind']}) failed: {e}")
+        message = str(e)
+    # A job reaped meanwhile keeps the status claim_admin_job() gave it
+    updated = db_adapter.execute_query(
+        'UPDATE admin_jobs SET status = %s, result = %s, message = %s, finished_at = NOW() '
+        "WHERE id = %s AND status = 'running'",
+        (status, json.dumps(result) if result is not None else None, message, row['id']))
+    if not updated:
+        logger.warning(f"Job {row['id']} ({row['kind']}) was no longer running; {status} not recorded")
+        return None
+    logger.info(f"Job {row['id']} ({row['kind']}) {status}")
+    return status
+
+
+class JobRunner:
+    """Claims and runs queued jobs on a daemon thread (or in the foreground)"""
+
+    def __init__(self, poll_interval=None):
+        self.poll_interval = Config.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+        self._wake = threading.Event()
+        self._pid = None
+
+    def start(self):
+        """Start the thread once per process (again in a forked child)"""
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        threading.Thread(target=self.run_forever, name='admin-jobs', daemon=True).start()
+
+    def wake(self):
+        self._wake.set()
+
+    def run_pending(self):
+        """Run claimable jobs until none is left; returns how many ran"""
+        ran = 0
+        while True:
+            row = db_adapter.execute_query(
+                'SELECT * FROM claim_admin_job(%s, %s)',
+                (Config.JOB_MAX_RUNNING, f"{Config.JOB_STALE_AFTER} seconds"), fetch_one=True)
+            if not row:
+                return ran
+            run_job(row)
+            ran += 1
+
+    def run_forever(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.run_pending()
+            except Exception as e:
+                logger.error(f"Job runner error: {e}")
+
+
+runner = JobRunner()
+
+
+# ---------------------------------------------------------------------
+# Handlers
+# ---------------------------------------------------------------------
+
+@job_handler('generate_tickets')
+def _generate_tickets(ctx, event_id, count=100):
+    from .services import VotingService
+    result = VotingService.generate_tickets(count, event_id=event_id, progress=ctx.checkpoint)
+    if not result.get('success'):
+        raise RuntimeError(result.get('error', 'Failed to generate tickets'))
+    return {'inserted': result['inserted']}
+
+
+@job_handler('clear_tickets')
+def _clear_tickets(ctx, event_id):
+    from .services import VotingService
+    result = VotingService.clear_all_tickets(event_id=event_id, progress=ctx.checkpoint)
+    if not result.get('success'):
+        raise RuntimeError(result.get('error', 'Failed to clear tickets'))
+    return {'deleted': result['deleted']}
+
+
+@job_handler('reset_voting')
+def _reset_voting(ctx, event_id, purge_previous=True):
+    from .services import VotingService
+    result = VotingService.reset_voting(purge_previous=purge_previous, event_id=event_id)
+    if not result.get('success'):
+        raise RuntimeError(result.get('error', 'Failed to reset voting'))
+    ctx.checkpoint(0, message=f"Round {result['round_id']} started")
+    purged = 0
+    if purge_previous:
+        # The old round's votes go now, throttled, instead of waiting for purge_rounds.py
+        while True:
+            deleted = VotingService.purge_old_rounds(ctx.batch_size, max_batches=1)
+            purged += deleted
+            ctx.checkpoint(purged, message='Purging previous round')
+            if deleted < ctx.batch_size:
+                break
+    return {'round_id': result['round_id'], 'purged_votes': purged}
@@ -1,28 +1,112 @@
 from datetime import datetime
+from functools import lru_cache
 from .config import Config
-from .database import db_adapter
+from .database import db_adapter, OUTAGE_ERRORS
+from .cache import event_cache, dashboard_cache
+
+def _event(event_id):
+    return Config.DEFAULT_EVENT_ID if event_id is None else event_id
+
+# Last event id each ref resolved to, kept for database outages
+_resolved_refs = {}
+
+class Event:
+    def __init__(self, id, slug, name, voting_open, created_at, updated_at=None):
+        self.id = id
+        self.slug = slug
+        self.name = name
+        self.voting_open = voting_open
+        self.created_at = created_at
+        self.updated_at = updated_at
+    
+    @staticmethod
+    def get_all():
+        """Get all events"""
+        events = db_adapter.execute_query('SELECT * FROM events ORDER BY id', fetch_all=True)
+        return [Event(**dict(e)) for e in events]
+    
+    @staticmethod
+    def resolve(ref):
+        """Event id for an id or slug, None if there is no such event (cached)
+        
+        While the database is unreachable a ref resolved before keeps its
+        last id, so votes for that event can still be spooled.
+        """
+        ref = str(ref).strip().lower()
+        def load():
+            if ref.isdigit():
+                row = db_adapter.execute_query('SELECT id FROM events WHERE id = %s', (int(ref),), fetch_one=True)
+            else:
+                row = db_adapter.execute_query('SELECT id FROM events WHERE slug = %s', (ref,), fetch_one=True)
+            return row['id'] if row else None
+        try:
+            event_id = event_cache.get(('ref', ref), 'id', load)
+        except OUTAGE_ERRORS:
+            if ref in _resolved_refs:
+                return _resolved_refs[ref]
+            raise
+        if event_id is None:
+            # Do not let arbitrary unknown refs pile up in the cache
+            event_cache.invalidate(('ref', ref))
+            _resolved_refs.pop(ref, None)
+        elif _resolved_refs.get(ref) != event_id:
+            _resolved_refs[ref] = event_id
+        return event_id
+    
+    @staticmethod
+    def is_voting_open(event_id=None):
+        """Per-event voting flag (cached; open if it cannot be read)"""
+        event_id = _event(event_id)
+        def load():
+            try:
+                row = db_adapter.execute_query('SELECT get_voting_open(%s) AS open', (event_id,), fetch_one=True,
+                                               coalesce=True)
+                return bool(row['open']) if row and 'open' in row else True
+            except Exception:
+                return True
+        return event_cache.get(event_id, 'voting_open', load)
+    
+    @staticmethod
+    def set_voting_open(is_open, event_id=None):
+        """Open or close voting for one event"""
+        event_id = _event(event_id)
+        db_adapter.execute_query('SELECT set_voting_open(%s, %s)', (is_open, event_id))
+        event_cache.invalidate(event_id, 'voting_open')
+        # Opening voting also unfreezes the results (migration 019)
+        event_cache.invalidate(event_id, 'frozen_version')
+        dashboard_cache.invalidate(event_id)
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'id': self.id,
+            'slug': self.slug,
+            'name': self.name,
+            'voting_open': self.voting_open
+        }
 
 class Contestant:
-    def __init__(self, id, name, description, image_url, is_active, created_at):
+    def __init__(self, id, name, description, image_url, is_active, created_at, event_id=None):
         self.id = id
         self.name = name
         self.description = description
         self.image_url = image_url
         self.is_active = is_active
         self.created_at = created_at
+        self.event_id = event_id
     
     @staticmethod
-    def get_all():
-        """Get all active contestants"""
-        query = 'SELECT * FROM contestants WHERE is_active = true ORDER BY name'
-        contestants = db_adapter.execute_query(query, fetch_all=True)
+    def get_all(event_id=None):
+        """Get all active contestants of an event"""
+        query = 'SELECT * FROM contestants WHERE event_id = %s AND is_active = true ORDER BY name'
+        contestants = db_adapter.execute_query(query, (_event(event_id),), fetch_all=True)
         return [Contestant(**dict(c)) for c in contestants]
     
     @staticmethod
-    def get_by_id(contestant_id):
-        """Get contestant by ID"""
-        query = 'SELECT * FROM contestants WHERE id = %s AND is_active = true'
-        contestant = db_adapter.execute_query(query, (contestant_id,), fetch_one=True)
+    def get_by_id(contestant_id, event_id=None):
+        """Get contestant by ID within an event"""
+        query = 'SELECT * FROM contestants WHERE id = %s AND event_id = %s AND is_active = true'
+        contestant = db_adapter.execute_query(query, (contestant_id, _event(event_id)), fetch_one=True)
         return Contestant(**dict(contestant)) if contestant else None
     
     def to_dict(self):
@@ -36,8 +120,10 @@ class Contestant:
         }
 
 class Ticket:
-    def __init__(self, id, ticket_code, is_used, created_at, used_at, seat_id=None, seat_code=None, section_code=None, **kwargs):
+    def __init__(self, id, ticket_code, is_used, created_at, used_at, seat_id=None, seat_code=None, section_code=None,
+                 event_id=None, **kwargs):
         self.id = id
+        self.event_id = event_id
         self.ticket_code = ticket_code
         self.is_used = is_used
         self.created_at = created_at
@@ -47,14 +133,22 @@ class Ticket:
         self.section_code = section_code
     
     @staticmethod
-    def get_by_code(ticket_code):
-        """Get ticket by code - checks only database"""
+    def get_by_code(ticket_code, event_id=None):
+        """Get ticket by code within an event - checks only database"""
         if not ticket_code or not ticket_code.strip():
             return None
         
-        # Check if ticket exists in database and get its usage status
-        query = 'SELECT * FROM tickets WHERE ticket_code = %s'
-        ticket = db_adapter.execute_query(query, (ticket_code.strip(),), fetch_one=True)
+        # Check if ticket exists in database and get its usage status;
+        # a ticket only counts as used if it was used in its event's active round
+        query = """
+            SELECT t.id, t.event_id, t.ticket_code, t.section_code, t.created_at, t.used_round_id,
+                   COALESCE(t.used_round_id = r.id, FALSE) AS is_used,
+                   CASE WHEN t.used_round_id = r.id THEN t.used_at END AS used_at
+            FROM tickets t
+            LEFT JOIN voting_rounds r ON r.event_id = t.event_id AND r.status = 'active'
+            WHERE t.event_id = %s AND t.ticket_code = %s
+        """
+        ticket = db_adapter.execute_query(query, (_event(event_id), ticket_code.strip()), fetch_one=True)
         
         if ticket:
             return Ticket(**dict(ticket))
@@ -63,7 +157,7 @@ class Ticket:
     
     def mark_as_used(self):
         """Mark ticket as used"""
-        query = 'UPDATE tickets SET is_used = true, used_at = NOW() WHERE id = %s'
+        query = 'UPDATE tickets SET is_used = true, used_at = NOW(), used_round_id = current_round_id(event_id) WHERE id = %s'
         params = (self.id,)
         
         db_adapter.execute_query(query, params)
@@ -74,6 +168,7 @@ class Ticket:
         """Convert to dictionary"""
         return {
             'id': self.id,
+            'event_id': self.event_id,
             'ticket_code': self.ticket_code,
             'is_used': self.is_used,
             'created_at': self.created_at,
@@ -83,6 +178,26 @@ class Ticket:
             'section_code': self.section_code
         }
 
+class UserAgent:
+    """Interned user-agent strings (votes store user_agent_id)"""
+    
+    @staticmethod
+    def get_id(user_agent):
+        """Id for a user agent, from this worker's LRU when possible"""
+        if not user_agent:
+            return None
+        # Same cap as intern_user_agent() so the LRU key matches the stored string
+        return _user_agent_id(user_agent[:512])
+    
+    @staticmethod
+    def cache_info():
+        return _user_agent_id.cache_info()
+
+@lru_cache(maxsize=Config.USER_AGENT_CACHE_SIZE)
+def _user_agent_id(user_agent):
+    row = db_adapter.execute_query('SELECT intern_user_agent(%s) AS id', (user_agent,), fetch_one=True)
+    return row['id'] if row else None
+
 class Vote:
     def __init__(self, id, contestant_id, ticket_id, ip_address, user_agent, created_at):
         self.id = id
@@ -104,18 +219,32 @@ class Vote:
             raise Exception(result[0]['message'] if result else 'Failed to create vote')
     
     @staticmethod
-    def get_count_by_contestant(contestant_id):
-        """Get vote count for a contestant"""
-        query = 'SELECT COUNT(*) FROM votes WHERE contestant_id = %s'
-        result = db_adapter.execute_query(query, (contestant_id,), fetch_one=True)
-        return result[0] if result else 0
+    def get_count_by_contestant(contestant_id, since=None, until=None):
+        """Get vote count for a contestant, optionally within a created_at range"""
+        query = 'SELECT COUNT(*) AS count FROM votes WHERE contestant_id = %s'
+        where, params = Vote._time_range(since, until)
+        result = db_adapter.execute_query(query + where, (contestant_id,) + params, fetch_one=True)
+        return result['count'] if result else 0
     
     @staticmethod
-    def get_total_count():
-        """Get total vote count"""
-        query = 'SELECT COUNT(*) FROM votes'
-        result = db_adapter.execute_query(query, fetch_one=True)
-        return result[0] if result else 0
+    def get_total_count(since=None, until=None, event_id=None):
+        """Get total vote count of an event, optionally within a created_at range"""
+        query = 'SELECT COUNT(*) AS count FROM votes WHERE event_id = %s'
+        where, params = Vote._time_range(since, until)
+        result = db_adapter.execute_query(query + where, (_event(event_id),) + params, fetch_one=True)
+        return result['count'] if result else 0
+    
+    @staticmethod
+    def _time_range(since, until):
+        """created_at bounds as SQL; votes is partitioned by created_at so these prune partitions"""
+        where, params = '', ()
+        if since is not None:
+            where += ' AND created_at >= %s'
+            params += (since,)
+        if until is not None:
+            where += ' AND created_at < %s'
+            params += (until,)
+        return where, params
     
     def to_dict(self):
         """Convert to dictionary"""
@@ -129,11 +258,11 @@ class Vote:
         }
 
 # Database utility functions
-def get_voting_results():
-    """Get voting results with percentages"""
+def get_voting_results(event_id=None):
+    """Get voting results with percentages for one event"""
     # Use the voting_results view
-    query = 'SELECT * FROM voting_results'
-    results = db_adapter.execute_query(query, fetch_all=True)
+    query = 'SELECT * FROM voting_results WHERE event_id = %s'
+    results = db_adapter.execute_query(query, (_event(event_id),), fetch_all=True, coalesce=True)
     total_votes = sum(r['vote_count'] for r in results)
     
     formatted_results = []
@@ -149,44 +278,92 @@ def get_voting_results():
     
     return formatted_results, total_votes
 
-def get_ticket_stats():
-    """Get ticket statistics from database only"""
-    try:
-        # Try to use the ticket_stats view first
-        query = 'SELECT * FROM ticket_stats'
-        result = db_adapter.execute_query(query, fetch_one=True)
-        if result:
-            db_used = result['used_tickets']
-            db_total = result['total_tickets']
-        else:
-            # Fallback to direct query
-            db_stats = db_adapter.execute_query("""
-                SELECT 
-                    COUNT(*) as total_in_db,
-                    SUM(CASE WHEN is_used THEN 1 ELSE 0 END) as used_tickets
-                FROM tickets
-            """, fetch_one=True)
-            db_used = db_stats['used_tickets'] or 0
-            db_total = db_stats['total_in_db'] or 0
-    except:
-        # Fallback to direct query if view doesn't exist
-        db_stats = db_adapter.execute_query("""
-            SELECT 
-                COUNT(*) as total_in_db,
-                SUM(CASE WHEN is_used THEN 1 ELSE 0 END) as used_tickets
-            FROM tickets
-        """, fetch_one=True)
-        db_used = db_stats['used_tickets'] or 0
-        db_total = db_stats['total_in_db'] or 0
-    
-    used_tickets = db_used
+def get_ticket_stats(event_id=None, include_sections=False):
+    """Get ticket statistics for one event from the ticket counters
+    
+    ticket_stats and ticket_section_stats read the counters kept by the
+    triggers of migration 014, so this never scans tickets.
+    """
+    event_id = _event(event_id)
+    result = db_adapter.execute_query(
+        'SELECT * FROM ticket_stats WHERE event_id = %s', (event_id,), fetch_one=True)
+    # No row: the event has no tickets yet
+    db_total = result['total_tickets'] if result else 0
+    used_tickets = result['used_tickets'] if result else 0
     unused_tickets = db_total - used_tickets
     usage_percentage = (used_tickets / db_total * 100) if db_total > 0 else 0
     
-    return {
+    stats = {
         'total_tickets': db_total,
         'used_tickets': used_tickets,
         'unused_tickets': unused_tickets,
         'usage_percentage': round(usage_percentage, 2),
         'synced_to_db': db_total
     }
+    if include_sections:
+        # Seat sections only; random codes have no section
+        stats['sections'] = db_adapter.execute_query(
+            'SELECT section_code, total_tickets, used_tickets, unused_tickets FROM ticket_section_stats '
+            'WHERE event_id = %s AND section_code IS NOT NULL ORDER BY section_code',
+            (event_id,), fetch_all=True) or []
+    return stats
+
+# Everything the admin dashboard shows, as one statement so the numbers
+# come from the same snapshot (and one round trip)
+DASHBOARD_QUERY = """
+    SELECT
+        e.id AS event_id,
+        e.voting_open,
+        r.id AS round_id,
+        r.started_at AS round_started_at,
+        NOW() AS snapshot_at,
+        (SELECT COALESCE(json_agg(json_build_object(
+                    'id', vr.id, 'name', vr.name, 'description', vr.description,
+                    'image_url', vr.image_url, 'vote_count', vr.vote_count,
+                    'percentage', vr.percentage)
+                ORDER BY vr.vote_count DESC, vr.name), '[]'::json)
+         FROM voting_results vr WHERE vr.event_id = e.id) AS results,
+        (SELECT row_to_json(ts) FROM ticket_stats ts WHERE ts.event_id = e.id) AS tickets,
+        (SELECT COALESCE(json_agg(json_build_object(
+                    'section_code', ss.section_code, 'total_tickets', ss.total_tickets,
+                    'used_tickets', ss.used_tickets, 'unused_tickets', ss.unused_tickets)
+                ORDER BY ss.section_code), '[]'::json)
+         FROM ticket_section_stats ss
+         WHERE ss.event_id = e.id AND ss.section_code IS NOT NULL) AS sections
+    FROM events e
+    LEFT JOIN voting_rounds r ON r.event_id = e.id AND r.status = 'active'
+    WHERE e.id = %s
+"""
+
+def get_dashboard_snapshot(event_id=None):
+    """Results, ticket stats and the voting flag of one event in one snapshot
+    
+    Cached for DASHBOARD_CACHE_TTL seconds so admins refreshing at the
+    same time share one query; None if the event does not exist.
+    """
+    event_id = _event(event_id)
+    def load():
+        row = db_adapter.execute_query(DASHBOARD_QUERY, (event_id,), fetch_one=True, coalesce=True)
+        if not row:
+            return None
+        results = [dict(r, percentage=float(r['percentage'])) for r in row['results']]
+        tickets = row['tickets'] or {}
+        total = tickets.get('total_tickets') or 0
+        used = tickets.get('used_tickets') or 0
+        return {
+            'event_id': row['event_id'],
+            'voting_open': bool(row['voting_open']),
+            'round_id': row['round_id'],
+            'round_started_at': row['round_started_at'].isoformat() if row['round_started_at'] else None,
+            'results': results,
+            'total_votes': sum(r['vote_count'] for r in results),
+            'tickets': {
+                'total_tickets': total,
+                'used_tickets': used,
+                'unused_tickets': total - used,
+                'usage_percentage': round(used / total * 100, 2) if total > 0 else 0,
+                'sections': row['sections'],
+            },
+            'snapshot_at': row['snapshot_at'].isoformat(),
+        }
+    return dashboard_cache.get(event_id, 'snapshot', load)
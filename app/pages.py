@@ -0,0 +1,67 @@
+"""
+Server-rendered voting page
+
+/voting serves frontend/voting.html with the event's contestants embedded
+as JSON in its #contestantsData script, so the page paints the cards from
+a single request instead of loading and then calling /api/contestants.
+Rendered pages are kept per event with a precomputed gzip body and ETag
+and rendered again only when the contestant catalogue (app/catalog.py)
+or the template differs from what was embedded.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from .catalog import contestant_catalog
+
+PLACEHOLDER = '<script id="contestantsData" type="application/json">null</script>'
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend', 'voting.html')
+
+# JSON inside <script> must not close the tag or open a comment
+_SCRIPT_ESCAPES = {ord('<'): '\\u003c', ord('>'): '\\u003e', ord('&'): '\\u0026'}
+
+
+class RenderedPage:
+    """One rendered page, ready to send"""
+
+    def __init__(self, event_id, body, source):
+        self.source = source
+        self.body = body.encode()
+        self.gzipped = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.etag = f'"p{event_id}-{hashlib.sha256(self.body).hexdigest()[:16]}"'
+
+
+_template = (None, None)
+_pages = {}
+_lock = threading.Lock()
+
+
+def _load_template():
+    """voting.html as (mtime, text), read again when the file changes"""
+    global _template
+    mtime = os.stat(TEMPLATE_PATH).st_mtime_ns
+    if _template[0] != mtime:
+        with open(TEMPLATE_PATH, encoding='utf-8') as f:
+            text = f.read()
+        if PLACEHOLDER not in text:
+            raise ValueError(f'{TEMPLATE_PATH} has no contestantsData placeholder')
+        _template = (mtime, text)
+    return _template
+
+
+def render_voting_page(event_id, data):
+    mtime, template = _load_template()
+    script = PLACEHOLDER.replace('null', data.translate(_SCRIPT_ESCAPES))
+    return RenderedPage(event_id, template.replace(PLACEHOLDER, script, 1), (mtime, data))
+
+
+def voting_page(event_id):
+    """The event's rendered voting page, rendered again only when its inputs changed"""
+    source = (_load_template()[0], contestant_catalog.get(event_id).json)
+    page = _pages.get(event_id)
+    if page is None or page.source != source:
+        page = render_voting_page(event_id, source[1])
+        with _lock:
+            _pages[event_id] = page
+    return page
+
@@ -1,9 +1,15 @@
-from flask import Blueprint, request, jsonify, session
-from .models import Contestant, get_voting_results, get_ticket_stats
-from .services import VotingService
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context
+from .models import Event, get_voting_results, get_ticket_stats, get_dashboard_snapshot
+from .services import VotingService, ballots_from_csv
 from .utils import rate_limit_key, get_client_ip
 from .config import Config
+from .spool import vote_spool, OUTAGE_ERRORS
+from .idempotency import vote_responses, vote_inflight
+from .freeze import get_frozen_results, load_artifact, freeze_results, unfreeze_results, FreezeError
+from .catalog import contestant_catalog
 import hashlib
+import io
+import math
 from functools import wraps
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
@@ -18,6 +24,29 @@ def require_admin(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def with_event(f):
+    """Decorator passing the request's event as event_id
+    
+    The event comes from ?event=, the X-Event header or "event" in the JSON
+    body, as an id or slug; without one the default event is used.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        ref = request.args.get('event') or request.headers.get('X-Event')
+        if not ref and request.is_json:
+            ref = (request.get_json(silent=True) or {}).get('event')
+        if ref:
+            try:
+                event_id = Event.resolve(ref)
+            except Exception:
+                return jsonify({'error': 'Internal server error'}), 500
+            if event_id is None:
+                return jsonify({'error': 'Unknown event'}), 404
+        else:
+            event_id = Config.DEFAULT_EVENT_ID
+        return f(*args, event_id=event_id, **kwargs)
+    return decorated_function
+
 def hash_password(password):
     """Hash password using SHA-256"""
     return hashlib.sha256(password.encode()).hexdigest()
@@ -56,105 +85,355 @@ def admin_logout():
     return jsonify({'success': True, 'message': 'Logged out successfully'}), 200
 @api_bp.route('/admin/voting-status', methods=['GET'])
 @require_admin
-def get_voting_status():
+@with_event
+def get_voting_status(event_id):
     """Get current voting open/closed status"""
-    try:
-        from .database import db_adapter
-        row = db_adapter.execute_query("SELECT get_voting_open() AS open", fetch_one=True)
-        return jsonify({'voting_open': bool(row['open']) if row and 'open' in row else True}), 200
-    except Exception:
-        return jsonify({'voting_open': True}), 200
+    return jsonify({'voting_open': Event.is_voting_open(event_id), 'event_id': event_id}), 200
 
 @api_bp.route('/admin/voting-open', methods=['POST'])
 @require_admin
-def open_voting():
+@with_event
+def open_voting(event_id):
     """Open voting (set flag true)"""
     try:
-        from .database import db_adapter
-        db_adapter.execute_query("SELECT set_voting_open(TRUE)")
+        Event.set_voting_open(True, event_id)
         return jsonify({'success': True, 'message': 'Voting opened'}), 200
     except Exception:
         return jsonify({'error': 'Failed to open voting'}), 500
 
 @api_bp.route('/admin/voting-close', methods=['POST'])
 @require_admin
-def close_voting():
+@with_event
+def close_voting(event_id):
     """Close voting (set flag false)"""
     try:
-        from .database import db_adapter
-        db_adapter.execute_query("SELECT set_voting_open(FALSE)")
+        Event.set_voting_open(False, event_id)
         return jsonify({'success': True, 'message': 'Voting closed'}), 200
     except Exception:
         return jsonify({'error': 'Failed to close voting'}), 500
 
-@api_bp.route('/admin/status', methods=['GET'])
-def admin_status():
-    """Check admin authentication status"""
+@api_bp.route('/admin/results/freeze', methods=['POST'])
+@require_admin
+@with_event
+def freeze_results_route(event_id):
+    """Compute the final results once and serve them from memory"""
+    try:
+        artifact = freeze_results(event_id)
+        return jsonify({'success': True, 'message': 'Results frozen', 'version': artifact.version,
+                        'etag': artifact.etag, 'sha256': artifact.sha256}), 200
+    except FreezeError as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception:
+        return jsonify({'error': 'Failed to freeze results'}), 500
+
+@api_bp.route('/admin/results/unfreeze', methods=['POST'])
+@require_admin
+@with_event
+def unfreeze_results_route(event_id):
+    """Go back to live results"""
     try:
-        from .database import db_adapter
-        row = db_adapter.execute_query("SELECT get_voting_open() AS open", fetch_one=True)
-        voting_open = bool(row['open']) if row and 'open' in row else True
+        unfreeze_results(event_id)
+        return jsonify({'success': True, 'message': 'Results are live again'}), 200
     except Exception:
-        voting_open = True
+        return jsonify({'error': 'Failed to unfreeze results'}), 500
+
+@api_bp.route('/admin/status', methods=['GET'])
+@with_event
+def admin_status(event_id):
+    """Check admin authentication status"""
+    voting_open = Event.is_voting_open(event_id)
     return jsonify({
         'authenticated': session.get('admin_authenticated', False),
         'username': session.get('admin_username', None),
         'voting_open': voting_open
     }), 200
 
+@api_bp.route('/admin/dashboard', methods=['GET'])
+@require_admin
+@with_event
+def admin_dashboard(event_id):
+    """Results, ticket stats and voting flag as one snapshot (briefly cached)"""
+    try:
+        snapshot = get_dashboard_snapshot(event_id)
+        if snapshot is None:
+            return jsonify({'error': 'Unknown event'}), 404
+        return jsonify(dict(snapshot, current_time=Config.get_current_time().isoformat())), 200
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
+def enqueue_job(kind, event_id, params=None):
+    """202 with the queued job, or 409 if the event already has one unfinished"""
+    from .jobs import enqueue, JobBusy
+    try:
+        job = enqueue(kind, event_id, params)
+    except JobBusy as e:
+        return jsonify({'error': 'Another job is still running for this event', 'job': e.job}), 409
+    return jsonify({'success': True, 'message': 'Job queued', 'job_id': job['id'], 'job': job}), 202
+
 @api_bp.route('/admin/reset-voting', methods=['POST'])
 @require_admin
-def reset_voting():
-    """Reset all voting data"""
+@with_event
+def reset_voting(event_id):
+    """Queue a voting reset (new round, then purge of the previous one)"""
     try:
-        from .services import VotingService
-        VotingService.reset_voting()
-        return jsonify({'success': True, 'message': 'Voting has been reset successfully'}), 200
+        data = request.get_json(silent=True) or {}
+        purge_previous = not data.get('archive', False)
+        return enqueue_job('reset_voting', event_id, {'purge_previous': purge_previous})
     except Exception as e:
         return jsonify({'error': 'Failed to reset voting'}), 500
 
 @api_bp.route('/admin/generate-tickets', methods=['POST'])
 @require_admin
-def generate_tickets():
-    """Generate new tickets in database"""
+@with_event
+def generate_tickets(event_id):
+    """Queue generation of new tickets in database"""
     try:
         data = request.get_json() or {}
-        count = int(data.get('count', 100))
-        
-        from .services import VotingService
-        result = VotingService.generate_tickets(count)
-        
-        if result.get('success'):
-            return jsonify({
-                'success': True, 
-                'message': f'Generated {result.get("inserted", 0)} new tickets',
-                'count': result.get('inserted', 0)
-            }), 200
-        else:
-            return jsonify({'error': result.get('error', 'Failed to generate tickets')}), 500
-        
+        try:
+            count = int(data.get('count', 100))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'count must be a number'}), 400
+        if count < 1:
+            return jsonify({'error': 'count must be positive'}), 400
+        if count > Config.JOB_MAX_TICKETS:
+            return jsonify({'error': f'At most {Config.JOB_MAX_TICKETS} tickets per job'}), 400
+        return enqueue_job('generate_tickets', event_id, {'count': count})
     except Exception as e:
         return jsonify({'error': 'Failed to generate tickets'}), 500
 
 @api_bp.route('/admin/clear-tickets', methods=['POST'])
 @require_admin
-def clear_tickets():
-    """Dangerous: delete all records in tickets and votes"""
+@with_event
+def clear_tickets(event_id):
+    """Dangerous: queue deletion of all tickets and votes of the event"""
     try:
-        from .services import VotingService
-        result = VotingService.clear_all_tickets()
-        if result.get('success'):
-            return jsonify({'success': True, 'message': 'All tickets (and votes) deleted'}), 200
-        else:
-            return jsonify({'error': result.get('error', 'Unknown error')}), 500
+        return enqueue_job('clear_tickets', event_id)
     except Exception:
         return jsonify({'error': 'Failed to clear tickets'}), 500
 
+@api_bp.route('/admin/votes/batch', methods=['POST'])
+@require_admin
+@with_event
+def submit_vote_batch(event_id):
+    """Apply many ballots at once (kiosks, keyed-in paper ballots)
+    
+    Takes JSON {"ballots": [{"ticket_code", "contestant_id"}, ...]} (or
+    [ticket_code, contestant_id] pairs), a CSV upload in the "file" field or
+    a text/csv body. Answers with counts and one compact
+    [line, ticket_code, "ok" or error, vote_id] entry per ballot, only the
+    rejected ones with ?errors_only=1. Voting must be open unless
+    allow_closed is set (paper ballots keyed in after closing).
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if 'file' in request.files:
+            ballots = ballots_from_csv(io.TextIOWrapper(request.files['file'].stream, encoding='utf-8-sig'))
+        elif request.mimetype == 'text/csv':
+            ballots = ballots_from_csv(request.get_data(as_text=True).splitlines())
+        elif isinstance(data.get('ballots'), list):
+            ballots = []
+            for b in data['ballots']:
+                if isinstance(b, dict):
+                    ballots.append((b.get('ticket_code'), b.get('contestant_id')))
+                elif isinstance(b, list) and len(b) >= 2:
+                    ballots.append((b[0], b[1]))
+                else:
+                    # Kept so line numbers match the request; rejected as invalid
+                    ballots.append((None, None))
+        else:
+            return jsonify({'error': 'No ballots provided'}), 400
+        
+        if not ballots:
+            return jsonify({'error': 'No ballots provided'}), 400
+        if len(ballots) > Config.VOTE_BATCH_MAX_BALLOTS:
+            return jsonify({'error': f'At most {Config.VOTE_BATCH_MAX_BALLOTS} ballots per batch'}), 413
+        
+        allow_closed = request.args.get('allow_closed') in ('1', 'true') or data.get('allow_closed') is True
+        if not allow_closed and not Event.is_voting_open(event_id):
+            return jsonify({'error': 'Voting is currently closed'}), 403
+        
+        result = VotingService.submit_vote_batch(
+            ballots,
+            ip_address=get_client_ip(request),
+            user_agent=request.headers.get('User-Agent'),
+            event_id=event_id
+        )
+        if not result['success']:
+            return jsonify({'error': result['error']}), 500
+        
+        errors_only = request.args.get('errors_only') in ('1', 'true')
+        return jsonify({
+            'total': result['total'],
+            'accepted': result['accepted'],
+            'rejected': result['total'] - result['accepted'],
+            'results': [[line, code, 'ok' if vote_id is not None else message, vote_id]
+                        for line, code, message, vote_id in result['results']
+                        if not (errors_only and vote_id is not None)]
+        }), 200
+    except Exception:
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api_bp.route('/admin/spool', methods=['GET'])
+@require_admin
+def admin_spool():
+    """Vote spool depth and replay lag of this host"""
+    if not vote_spool.enabled:
+        return jsonify({'enabled': False}), 200
+    try:
+        return jsonify(vote_spool.stats()), 200
+    except Exception:
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api_bp.route('/admin/db/coalescing', methods=['GET'])
+@require_admin
+def admin_db_coalescing():
+    """Coalesced reads of this worker: executed, shared with callers in flight, served from the micro-cache"""
+    from .database import db_adapter
+    return jsonify(db_adapter.single_flight.stats()), 200
+
+@api_bp.route('/admin/jobs', methods=['GET'])
+@require_admin
+@with_event
+def admin_jobs(event_id):
+    """Recent jobs of the event, newest first"""
+    from .jobs import list_jobs
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    try:
+        return jsonify({'jobs': list_jobs(event_id, limit)}), 200
+    except Exception:
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api_bp.route('/admin/jobs/<int:job_id>', methods=['GET'])
+@require_admin
+def admin_job(job_id):
+    """Status and progress of one job (poll this)"""
+    from .jobs import get_job
+    try:
+        job = get_job(job_id)
+    except Exception:
+        return jsonify({'error': 'Internal server error'}), 500
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job), 200
+
+@api_bp.route('/admin/jobs/<int:job_id>/cancel', methods=['POST'])
+@require_admin
+def cancel_admin_job(job_id):
+    """Cancel a queued job, or stop a running one after its current batch"""
+    from .jobs import cancel_job
+    try:
+        job = cancel_job(job_id)
+    except Exception:
+        return jsonify({'error': 'Internal server error'}), 500
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job), 200
+
+@api_bp.route('/admin/export/<table>', methods=['GET'])
+@require_admin
+@with_event
+def export_table(table, event_id):
+    """Stream the event's votes, tickets or audit_log as CSV or NDJSON (optionally gzipped)"""
+    from .exports import EXPORT_TABLES, EXPORT_FORMATS, iter_export
+    
+    fmt = request.args.get('format', 'csv')
+    if table not in EXPORT_TABLES:
+        return jsonify({'error': f'Unknown table, expected one of: {", ".join(EXPORT_TABLES)}'}), 400
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unknown format, expected one of: {", ".join(EXPORT_FORMATS)}'}), 400
+    
+    try:
+        after_id = int(request.args.get('after_id', 0))
+        until_id = request.args.get('until_id', type=int)
+    except ValueError:
+        return jsonify({'error': 'after_id and until_id must be integers'}), 400
+    since = request.args.get('since')
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    
+    filename = f"{table}-event{event_id}.{fmt}" + ('.gz' if compress else '')
+    mimetype = 'application/gzip' if compress else EXPORT_FORMATS[fmt]
+    return Response(
+        stream_with_context(iter_export(table, fmt, after_id=after_id, until_id=until_id,
+                                        since=since, compress=compress, event_id=event_id)),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'Cache-Control': 'no-store',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+@api_bp.route('/admin/timeline', methods=['GET'])
+@require_admin
+@with_event
+def get_timeline(event_id):
+    """Votes per time bucket (by contestant, section or total) from the rollup tables"""
+    from .timeline import TIMELINE_DIMENSIONS, to_epoch_ms, get_timeline as build_timeline
+    
+    by = request.args.get('by', 'contestant')
+    if by not in TIMELINE_DIMENSIONS:
+        return jsonify({'error': f'Unknown dimension, expected one of: {", ".join(TIMELINE_DIMENSIONS)}'}), 400
+    
+    try:
+        now_ms = int(Config.get_current_time().timestamp() * 1000)
+        end_ms = to_epoch_ms(request.args['to']) if request.args.get('to') else now_ms
+        start_ms = to_epoch_ms(request.args['from']) if request.args.get('from') else end_ms - 3600 * 1000
+        step_ms = request.args.get('step_ms', type=int)
+        contestant_id = request.args.get('contestant_id', type=int)
+    except ValueError:
+        return jsonify({'error': 'from/to must be epoch milliseconds or ISO-8601, step_ms an integer'}), 400
+    if end_ms <= start_ms:
+        return jsonify({'error': 'to must be after from'}), 400
+    
+    try:
+        timeline = build_timeline(event_id, start_ms, end_ms, step_ms=step_ms, by=by,
+                                  contestant_id=contestant_id,
+                                  section_code=request.args.get('section'))
+        return jsonify(timeline), 200
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api_bp.route('/admin/fraud/clusters', methods=['GET'])
+@require_admin
+@with_event
+def get_fraud_clusters(event_id):
+    """Flagged vote clusters written by the fraud detector, most recent first"""
+    from .fraud import DEFAULT_RULES, get_flagged_clusters
+    
+    kind = request.args.get('kind')
+    if kind is not None and kind not in DEFAULT_RULES:
+        return jsonify({'error': f'Unknown kind, expected one of: {", ".join(DEFAULT_RULES)}'}), 400
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    
+    try:
+        clusters = get_flagged_clusters(event_id, since=request.args.get('since'), kind=kind,
+                                        status=request.args.get('status'), limit=limit)
+        return jsonify({'clusters': clusters, 'count': len(clusters)}), 200
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api_bp.route('/events', methods=['GET'])
+def get_events():
+    """List events (id, slug, name, voting_open)"""
+    try:
+        return jsonify([event.to_dict() for event in Event.get_all()]), 200
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
 # Removed seating system endpoints - tickets are now based on pre-defined seat codes
 
 @api_bp.route('/vote', methods=['POST'])
-def submit_vote():
-    """Submit a vote for a contestant"""
+@with_event
+def submit_vote(event_id):
+    """Submit a vote for a contestant
+    
+    With an Idempotency-Key header a retry of the same vote gets the first
+    response back (Idempotent-Replayed: true) instead of "Ticket already
+    used"; reusing the key for a different vote is a 422.
+    """
     try:
         data = request.get_json()
         
@@ -167,51 +446,142 @@ def submit_vote():
         if not ticket_code or not contestant_id:
             return jsonify({'error': 'Missing ticket_code or contestant_id'}), 400
         
-        # Check if voting is currently allowed
-        # Check global voting flag
-        try:
-            from .database import db_adapter
-            row = db_adapter.execute_query("SELECT get_voting_open() AS open", fetch_one=True)
-            voting_open = bool(row['open']) if row and 'open' in row else True
-        except Exception:
-            voting_open = True
+        idempotency_key = request.headers.get('Idempotency-Key')
+        fingerprint = (str(ticket_code).strip(), str(contestant_id))
+        if idempotency_key:
+            if len(idempotency_key) > 255:
+                return jsonify({'error': 'Idempotency-Key is too long'}), 400
+            cached = vote_responses.get((event_id, idempotency_key))
+            if cached is not None:
+                if cached[0] != fingerprint:
+                    return jsonify({'error': 'Idempotency-Key was used for a different vote'}), 422
+                return jsonify(cached[2]), cached[1], {'Idempotent-Replayed': 'true'}
+        
+        # Check if voting is currently allowed for this event (last known
+        # flag while the database is down)
+        voting_open = (vote_spool.voting_open(event_id) if vote_spool.database_down()
+                       else Event.is_voting_open(event_id))
         if not voting_open:
             return jsonify({'error': 'Voting is currently closed'}), 403
         
-        # Submit vote using service
-        result = VotingService.submit_vote(
+        # Unknown contestants are turned away from the in-memory catalogue;
+        # while the database is down the spool checks them instead
+        if not vote_spool.database_down():
+            try:
+                known = contestant_catalog.get(event_id).get(contestant_id) is not None
+            except Exception:
+                # submit_vote validates it as well
+                known = True
+            if not known:
+                return jsonify({'error': 'Invalid contestant'}), 400
+        
+        # Submit vote using service; a duplicate arriving while the same
+        # vote is still in flight shares its result
+        result = vote_inflight.run((event_id, fingerprint[0]), fingerprint[1], lambda: VotingService.submit_vote(
             ticket_code=ticket_code,
             contestant_id=contestant_id,
             ip_address=get_client_ip(request),
-            user_agent=request.headers.get('User-Agent')
-        )
+            user_agent=request.headers.get('User-Agent'),
+            event_id=event_id
+        ))
         
-        if result['success']:
-            return jsonify({
+        if result.get('spooled'):
+            # Stored locally; counted once the database is reachable again
+            body, status = {
+                'message': 'Vote received',
+                'contestant_name': result['contestant_name'],
+                'queued': True
+            }, 202
+        elif result['success']:
+            body, status = {
                 'message': 'Vote submitted successfully',
                 'contestant_name': result['contestant_name']
-            }), 200
+            }, 200
         else:
-            return jsonify({'error': result['error']}), 400
+            body, status = {'error': result['error']}, 400
+        
+        if idempotency_key and not result.get('retry'):
+            vote_responses.put((event_id, idempotency_key), fingerprint, status, body)
+        return jsonify(body), status
             
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
+@api_bp.route('/votes/changes', methods=['GET'])
+@with_event
+def vote_changes(event_id):
+    """Votes and tally deltas after ?since=<cursor>, oldest first
+    
+    ?since=latest starts at the current end of the feed, no since at its
+    beginning. ?wait=<seconds> long-polls until a change arrives, capped at
+    max_wait in the response (0 when long-polling is off); ?limit caps the
+    page. Consumers store the returned cursor and pass it back.
+    """
+    from .changes import get_changes, tally_deltas, latest_cursor, max_wait, CursorExpired
+    if Config.CHANGES_API_TOKEN and not session.get('admin_authenticated') and \
+            request.headers.get('Authorization') != f'Bearer {Config.CHANGES_API_TOKEN}':
+        return jsonify({'error': 'Invalid or missing token'}), 401
+    try:
+        limit = min(int(request.args.get('limit', Config.CHANGES_PAGE_SIZE)), 5 * Config.CHANGES_PAGE_SIZE)
+        wait_limit = max_wait(request.environ)
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        return jsonify({'error': 'limit and wait must be numbers'}), 400
+    # nan passes every comparison, so check finiteness before capping (int()
+    # already refuses nan and inf for limit)
+    if not math.isfinite(wait):
+        return jsonify({'error': 'limit and wait must be numbers'}), 400
+    wait = min(wait, wait_limit)
+    if limit < 1 or wait < 0:
+        return jsonify({'error': 'limit must be positive and wait not negative'}), 400
+    
+    try:
+        since = request.args.get('since')
+        if since == 'latest':
+            since = latest_cursor()
+        changes, cursor, has_more = get_changes(event_id, since, limit, wait)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    except CursorExpired:
+        return jsonify({'error': 'Cursor expired, changes were pruned; resync from /api/results'}), 410
+    except Exception:
+        return jsonify({'error': 'Internal server error'}), 500
+    
+    tallies, reset = tally_deltas(changes)
+    return jsonify({
+        'cursor': cursor,
+        'has_more': has_more,
+        'reset': reset,
+        'changes': changes,
+        'tallies': tallies,
+        'max_wait': wait_limit
+    }), 200
+
+def precomputed_response(item, cache_control, mimetype='application/json'):
+    """A precomputed body (gzip when accepted) of a frozen artifact or rendered page, 304 on a matching ETag"""
+    headers = {'ETag': item.etag, 'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+    # Werkzeug parses both headers: the ETag list (or *), and codings with q-values
+    if request.if_none_match.contains_weak(item.etag.strip('"')):
+        return Response(status=304, headers=headers)
+    body = item.body
+    if request.accept_encodings['gzip'] > 0:
+        body = item.gzipped
+        headers['Content-Encoding'] = 'gzip'
+    return Response(body, status=200, mimetype=mimetype, headers=headers)
+
 @api_bp.route('/results', methods=['GET'])
-def get_results():
-    """Get current voting results"""
+@with_event
+def get_results(event_id):
+    """Get current voting results (the frozen artifact once results are frozen)"""
     try:
-        results, total_votes = get_voting_results()
+        artifact = get_frozen_results(event_id)
+        if artifact is not None:
+            response = precomputed_response(artifact, f'public, max-age={Config.FROZEN_RESULTS_MAX_AGE}')
+            response.headers['Content-Location'] = f'/api/results/frozen/{artifact.version}?event={event_id}'
+            return response
         
-        # Read voting_open from DB settings
-        from .database import db_adapter
-        voting_open = True
-        try:
-            row = db_adapter.execute_query("SELECT get_voting_open() AS open", fetch_one=True)
-            if row and 'open' in row:
-                voting_open = bool(row['open'])
-        except Exception:
-            voting_open = True
+        results, total_votes = get_voting_results(event_id)
+        voting_open = Event.is_voting_open(event_id)
         
         return jsonify({
             'results': results,
@@ -223,17 +593,41 @@ def get_results():
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
+@api_bp.route('/results/frozen/<int:version>', methods=['GET'])
+@with_event
+def get_frozen_results_version(event_id, version):
+    """One frozen results version; it never changes, so it is cached for good"""
+    try:
+        artifact = load_artifact(event_id, version)
+        if artifact is None:
+            return jsonify({'error': 'No such results version'}), 404
+        return precomputed_response(artifact, 'public, max-age=31536000, immutable')
+    except Exception:
+        return jsonify({'error': 'Internal server error'}), 500
+
 @api_bp.route('/contestants', methods=['GET'])
-def get_contestants():
+@with_event
+def get_contestants(event_id):
     """Get list of active contestants"""
     try:
-        contestants = Contestant.get_all()
-        return jsonify([contestant.to_dict() for contestant in contestants]), 200
+        if not vote_spool.database_down():
+            try:
+                return Response(contestant_catalog.get(event_id).json, status=200, mimetype='application/json')
+            except OUTAGE_ERRORS:
+                if not vote_spool.enabled:
+                    raise
+                vote_spool.mark_down()
+        # Database unreachable: the vote spool's cached copy
+        contestants = vote_spool.contestants(event_id)
+        if contestants is None:
+            return jsonify({'error': 'Internal server error'}), 500
+        return jsonify(contestants), 200
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
 @api_bp.route('/ticket/validate', methods=['POST'])
-def validate_ticket():
+@with_event
+def validate_ticket(event_id):
     """Validate if a ticket code is valid and unused"""
     try:
         data = request.get_json()
@@ -243,14 +637,26 @@ def validate_ticket():
             return jsonify({'error': 'Missing ticket_code'}), 400
         
         from .models import Ticket
-        ticket = Ticket.get_by_code(ticket_code)
-        
-        if not ticket:
-            return jsonify({'valid': False, 'error': 'Invalid ticket code'})
-        
-        if ticket.is_used:
-            return jsonify({'valid': False, 'error': 'Ticket already used'})
+        if not vote_spool.database_down():
+            try:
+                ticket = Ticket.get_by_code(ticket_code, event_id)
+                
+                if not ticket:
+                    return jsonify({'valid': False, 'error': 'Invalid ticket code'})
+                
+                if ticket.is_used:
+                    return jsonify({'valid': False, 'error': 'Ticket already used'})
+                
+                return jsonify({'valid': True, 'message': 'Ticket is valid'})
+            except OUTAGE_ERRORS:
+                if not vote_spool.enabled:
+                    raise
+                vote_spool.mark_down()
         
+        # Database unreachable: check the vote spool's cached ticket index
+        error = vote_spool.check_ticket(event_id, ticket_code.strip())
+        if error:
+            return jsonify({'valid': False, 'error': error})
         return jsonify({'valid': True, 'message': 'Ticket is valid'})
         
     except Exception as e:
@@ -258,24 +664,21 @@ def validate_ticket():
 
 @api_bp.route('/ticket/stats', methods=['GET'])
 @require_admin
-def get_ticket_statistics():
+@with_event
+def get_ticket_statistics(event_id):
     """Get ticket statistics for admin panel"""
     try:
         from .models import get_ticket_stats
-        stats = get_ticket_stats()
+        stats = get_ticket_stats(event_id, include_sections=True)
         
         # Also include open flag for settings
-        from .database import db_adapter
-        try:
-            row = db_adapter.execute_query("SELECT get_voting_open() AS open", fetch_one=True)
-            voting_open = bool(row['open']) if row and 'open' in row else True
-        except Exception:
-            voting_open = True
+        voting_open = Event.is_voting_open(event_id)
         return jsonify({
             'total_tickets': stats['total_tickets'],
             'used_tickets': stats['used_tickets'],
             'unused_tickets': stats['unused_tickets'],
             'usage_percentage': round((stats['used_tickets'] / stats['total_tickets'] * 100), 2) if stats['total_tickets'] > 0 else 0,
+            'sections': stats['sections'],
             'voting_open': voting_open
         }), 200
         
@@ -305,11 +708,10 @@ def health_check():
             health_status['database'] = f'error: {str(db_error)}'
             health_status['status'] = 'unhealthy'
         
-        # Test contestants loading
+        # Test contestants loading (reloaded when their version moved)
         try:
-            from .models import Contestant
-            contestants = Contestant.get_all()
-            health_status['contestants'] = f'{len(contestants)} loaded'
+            catalog = contestant_catalog.get(Config.DEFAULT_EVENT_ID)
+            health_status['contestants'] = f'{len(catalog.contestants)} loaded'
         except Exception as contestant_error:
             health_status['contestants'] = f'error: {str(contestant_error)}'
             health_status['status'] = 'unhealthy'
@@ -1,22 +1,77 @@
-from .models import Contestant, Ticket, Vote, get_voting_results, get_ticket_stats
+from .models import Contestant, Ticket, Vote, Event, UserAgent, get_voting_results, get_ticket_stats
 from .config import Config
 from .database import db_adapter
+from .cache import dashboard_cache
+from .jobs import JobCancelled
+from .spool import vote_spool, SpoolRejected, OUTAGE_ERRORS
+from .freeze import unfreeze_results
 from datetime import datetime
+import csv
+import io
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Votes are partitioned by created_at, so batches are picked by (id, created_at)
+DELETE_VOTES_BATCH = """
+    WITH doomed AS (
+        SELECT id, created_at FROM votes WHERE event_id = %s LIMIT %s
+    )
+    DELETE FROM votes v USING doomed d
+    WHERE v.id = d.id AND v.created_at = d.created_at
+"""
+DELETE_TICKETS_BATCH = """
+    DELETE FROM tickets
+    WHERE id IN (SELECT id FROM tickets WHERE event_id = %s LIMIT %s)
+"""
+
+VOTE_BATCH_TABLE = """
+    CREATE TEMP TABLE vote_batch (
+        line INTEGER PRIMARY KEY,
+        ticket_code VARCHAR(50) NOT NULL,
+        contestant_id INTEGER NOT NULL
+    ) ON COMMIT DROP
+"""
+# contestants.id is a SERIAL; larger ids would fail the whole COPY
+CONTESTANT_ID_MAX = 2 ** 31 - 1
+
+def ballots_from_csv(lines):
+    """(ticket_code, contestant_id) pairs from CSV lines, skipping a header row"""
+    rows = [row for row in csv.reader(lines) if any(field.strip() for field in row)]
+    if rows and rows[0][0].strip().lower() == 'ticket_code':
+        rows = rows[1:]
+    return [(row[0], row[1] if len(row) > 1 else '') for row in rows]
+
 class VotingService:
     @staticmethod
-    def submit_vote(ticket_code, contestant_id, ip_address, user_agent):
+    def submit_vote(ticket_code, contestant_id, ip_address, user_agent, event_id=None):
         """
         Submit a vote with transaction safety
         Returns: dict with 'success' boolean and additional info
+        
+        If the database is unreachable the vote is written to the local
+        vote spool instead (app/spool.py) and 'spooled' is True. Failures
+        that say nothing about the vote itself carry 'retry': True.
         """
+        if event_id is None:
+            event_id = Config.DEFAULT_EVENT_ID
+        if vote_spool.should_spool(event_id):
+            return VotingService._spool_vote(ticket_code, contestant_id, ip_address, user_agent, event_id)
         try:
+            # Pass the interned user-agent id; the string only goes to the
+            # database when the lookup itself failed
+            try:
+                user_agent_id = UserAgent.get_id(user_agent)
+            except OUTAGE_ERRORS:
+                raise
+            except Exception as e:
+                logger.warning(f"User agent lookup failed: {str(e)}")
+                user_agent_id = None
+            
             # Use the submit_vote function for Supabase
             result = db_adapter.execute_function('submit_vote', 
-                [ticket_code.strip(), contestant_id, ip_address, user_agent])
+                [ticket_code.strip(), contestant_id, ip_address,
+                 None if user_agent_id else user_agent, event_id, user_agent_id])
             
             if result and len(result) > 0:
                 row = result[0]
@@ -31,25 +86,113 @@ class VotingService:
                 else:
                     return {'success': False, 'error': row['message']}
             else:
-                return {'success': False, 'error': 'Failed to submit vote'}
+                return {'success': False, 'error': 'Failed to submit vote', 'retry': True}
                 
+        except OUTAGE_ERRORS as e:
+            if not vote_spool.enabled:
+                logger.error(f"Error submitting vote: {str(e)}")
+                return {'success': False, 'error': 'Failed to submit vote', 'retry': True}
+            logger.warning(f"Database unavailable, spooling votes: {str(e)}")
+            vote_spool.mark_down()
+            return VotingService._spool_vote(ticket_code, contestant_id, ip_address, user_agent, event_id)
         except Exception as e:
             logger.error(f"Error submitting vote: {str(e)}")
-            return {'success': False, 'error': 'Failed to submit vote'}
+            return {'success': False, 'error': 'Failed to submit vote', 'retry': True}
+    
+    @staticmethod
+    def _spool_vote(ticket_code, contestant_id, ip_address, user_agent, event_id):
+        """Degraded mode: append the vote to the local spool for later replay"""
+        try:
+            contestant_name = vote_spool.append(event_id, ticket_code.strip(), contestant_id, ip_address, user_agent)
+        except SpoolRejected as e:
+            return {'success': False, 'error': str(e)}
+        except Exception as e:
+            logger.error(f"Error spooling vote: {str(e)}")
+            return {'success': False, 'error': 'Failed to submit vote', 'retry': True}
+        return {
+            'success': True,
+            'spooled': True,
+            'contestant_name': contestant_name,
+            'ticket_code': ticket_code.strip(),
+            'vote_id': None
+        }
+    
+    @staticmethod
+    def submit_vote_batch(ballots, ip_address, user_agent, event_id=None):
+        """Apply many (ticket_code, contestant_id) ballots in one transaction
+        
+        The ballots are COPYed into a temporary table and applied with
+        apply_vote_batch() (migrations 017, 021), which follows the submit_vote
+        rules as if they arrived one by one in order. Returns 'results' as
+        (line, ticket_code, message, vote_id) per ballot, line counting
+        from 1; vote_id is None for rejected ones.
+        """
+        if event_id is None:
+            event_id = Config.DEFAULT_EVENT_ID
+        outcomes = {}
+        staged = 0
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for line, (ticket_code, contestant_id) in enumerate(ballots, 1):
+            ticket_code = str(ticket_code or '').strip()
+            try:
+                contestant_id = int(contestant_id)
+            except (TypeError, ValueError):
+                contestant_id = None
+            if contestant_id is not None and not 0 < contestant_id <= CONTESTANT_ID_MAX:
+                contestant_id = None
+            # Lines that cannot be staged get submit_vote's answer right away
+            if not ticket_code or len(ticket_code) > 50:
+                outcomes[line] = (line, ticket_code, 'Invalid ticket code', None)
+            elif contestant_id is None:
+                outcomes[line] = (line, ticket_code, 'Invalid contestant', None)
+            else:
+                outcomes[line] = (line, ticket_code, None, None)
+                writer.writerow((line, ticket_code, contestant_id))
+                staged += 1
+        if not staged:
+            results = [outcomes[line] for line in sorted(outcomes)]
+            return {'success': True, 'total': len(results), 'accepted': 0, 'results': results}
+        
+        try:
+            try:
+                user_agent_id = UserAgent.get_id(user_agent)
+            except Exception as e:
+                logger.warning(f"User agent lookup failed: {str(e)}")
+                user_agent_id = None
+            
+            buffer.seek(0)
+            rows = db_adapter.copy_and_query(
+                VOTE_BATCH_TABLE,
+                'COPY vote_batch (line, ticket_code, contestant_id) FROM STDIN WITH (FORMAT csv)',
+                buffer,
+                'SELECT * FROM apply_vote_batch(%s, %s, %s)',
+                (event_id, ip_address, user_agent_id))
+        except Exception as e:
+            logger.error(f"Error submitting vote batch: {str(e)}")
+            return {'success': False, 'error': 'Failed to submit votes'}
+        
+        for row in rows:
+            outcomes[row['line']] = (row['line'], outcomes[row['line']][1], row['message'], row['vote_id'])
+        results = [outcomes[line] for line in sorted(outcomes)]
+        accepted = sum(1 for r in results if r[3] is not None)
+        dashboard_cache.invalidate(event_id)
+        logger.info(f"Vote batch applied: {accepted} of {len(results)} ballots accepted")
+        return {'success': True, 'total': len(results), 'accepted': accepted, 'results': results}
     
     @staticmethod
-    def get_voting_stats():
-        """Get comprehensive voting statistics"""
+    def get_voting_stats(event_id=None):
+        """Get comprehensive voting statistics for one event"""
         try:
-            ticket_stats = get_ticket_stats()
-            results, total_votes = get_voting_results()
+            ticket_stats = get_ticket_stats(event_id)
+            results, total_votes = get_voting_results(event_id)
             
             return {
                 'total_tickets': ticket_stats['total_tickets'],
                 'used_tickets': ticket_stats['used_tickets'],
                 'unused_tickets': ticket_stats['unused_tickets'],
                 'contestant_stats': results,
-                'voting_open': Config.is_voting_time(),
+                'voting_open': Event.is_voting_open(event_id),
                 'current_time': Config.get_current_time().isoformat()
             }
             
@@ -58,62 +201,119 @@ class VotingService:
             return None
     
     @staticmethod
-    def reset_voting():
-        """Reset all votes and tickets (admin function)"""
+    def reset_voting(purge_previous=True, event_id=None):
+        """Reset voting of one event by starting a new round (admin function)
+        
+        Constant time: votes and ticket usage are scoped to the active round,
+        so the previous round's votes are left for purge_old_rounds (or kept
+        when purge_previous is False). Other events are not touched.
+        """
+        if event_id is None:
+            event_id = Config.DEFAULT_EVENT_ID
         try:
-            # Delete all votes
-            db_adapter.execute_query('DELETE FROM votes')
-            
-            # Reset all tickets
-            db_adapter.execute_query('UPDATE tickets SET is_used = FALSE, used_at = NULL')
+            row = db_adapter.execute_query(
+                'SELECT start_new_round(%s, %s) AS round_id', (purge_previous, event_id), fetch_one=True)
+            dashboard_cache.invalidate(event_id)
+            # Frozen results belong to the previous round
+            unfreeze_results(event_id)
             
-            logger.info("Voting reset successfully")
-            return True
+            logger.info(f"Voting reset successfully for event {event_id}, round {row['round_id']} started")
+            return {"success": True, "round_id": row['round_id']}
                 
         except Exception as e:
             logger.error(f"Error resetting voting: {str(e)}")
-            return False
+            return {"success": False, "error": str(e)}
 
     @staticmethod
-    def generate_tickets(count=100):
-        """Generate new tickets directly in database."""
+    def purge_old_rounds(batch_size=5000, max_batches=None):
+        """Delete votes of finished rounds in small batches; returns votes deleted"""
+        deleted = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            row = db_adapter.execute_query(
+                'SELECT purge_round_batch(%s) AS deleted', (batch_size,), fetch_one=True)
+            batches += 1
+            deleted += row['deleted']
+            if row['deleted'] < batch_size:
+                break
+        if deleted:
+            logger.info(f"Purged {deleted} votes from finished rounds")
+        return deleted
+
+    @staticmethod
+    def generate_tickets(count=100, event_id=None, progress=None):
+        """Replace an event's tickets with newly generated ones.
+        
+        Works in batches of JOB_BATCH_SIZE; progress(done, total, message)
+        is called after each one when run as a job (app/jobs.py).
+        """
+        if event_id is None:
+            event_id = Config.DEFAULT_EVENT_ID
         try:
             import string
             import random
             
-            # Start by clearing dependent table
-            db_adapter.execute_query('DELETE FROM votes')
-            # Clear tickets table entirely
-            db_adapter.execute_query('DELETE FROM tickets')
+            # Generate unique random ticket codes (8 characters)
+            codes = set()
+            while len(codes) < count:
+                codes.add(''.join(random.choices(string.ascii_uppercase + string.digits, k=8)))
+            codes = list(codes)
 
+            VotingService._delete_event_tickets(event_id, progress)
             inserted = 0
-            for i in range(count):
-                # Generate a random ticket code (8 characters)
-                ticket_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-                try:
-                    db_adapter.execute_query(
-                        "INSERT INTO tickets (ticket_code, is_used, created_at) VALUES (%s, FALSE, NOW())",
-                        (ticket_code,)
-                    )
-                    inserted += 1
-                except Exception:
-                    # If duplicate, try again with different code
-                    continue
+            for start in range(0, len(codes), Config.JOB_BATCH_SIZE):
+                inserted += db_adapter.execute_query(
+                    "INSERT INTO tickets (event_id, ticket_code, is_used, created_at) "
+                    "SELECT %s, unnest(%s::VARCHAR[]), FALSE, NOW() ON CONFLICT (event_id, ticket_code) DO NOTHING",
+                    (event_id, codes[start:start + Config.JOB_BATCH_SIZE])
+                )
+                if progress:
+                    progress(inserted, count, 'Inserting tickets')
+            dashboard_cache.invalidate(event_id)
                     
             logger.info(f"Generated {inserted} new tickets")
             return {"success": True, "inserted": inserted}
+        except JobCancelled:
+            dashboard_cache.invalidate(event_id)
+            raise
         except Exception as e:
             logger.error(f"Error generating tickets: {str(e)}")
             return {"success": False, "error": str(e)}
 
     @staticmethod
-    def clear_all_tickets():
-        """Delete all records in tickets (and dependent votes)."""
+    def clear_all_tickets(event_id=None, progress=None):
+        """Delete all tickets (and dependent votes) of an event."""
+        if event_id is None:
+            event_id = Config.DEFAULT_EVENT_ID
         try:
-            db_adapter.execute_query('DELETE FROM votes')
-            db_adapter.execute_query('DELETE FROM tickets')
-            logger.info("All tickets cleared")
-            return {"success": True}
+            deleted = VotingService._delete_event_tickets(event_id, progress)
+            dashboard_cache.invalidate(event_id)
+            logger.info(f"All tickets cleared for event {event_id}")
+            return {"success": True, "deleted": deleted}
+        except JobCancelled:
+            dashboard_cache.invalidate(event_id)
+            raise
         except Exception as e:
             logger.error(f"Error clearing tickets: {str(e)}")
             return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def _delete_event_tickets(event_id, progress=None):
+        """Remove one event's votes and tickets; returns tickets deleted
+        
+        DELETE by event_id rather than TRUNCATE: other events sharing the
+        tables keep their rows. Rows go in batches of JOB_BATCH_SIZE so no
+        single statement holds locks (or the audit triggers' transition
+        tables) for the whole event.
+        """
+        batch_size = Config.JOB_BATCH_SIZE
+        for label, query in (('votes', DELETE_VOTES_BATCH), ('tickets', DELETE_TICKETS_BATCH)):
+            deleted = 0
+            while True:
+                n = db_adapter.execute_query(query, (event_id, batch_size))
+                deleted += n
+                if progress:
+                    progress(deleted, None, f"Deleting {label}")
+                if n < batch_size:
+                    break
+        return deleted
@@ -0,0 +1,367 @@
+"""
+Local vote spool for database outages
+
+When a vote cannot reach the database (connection refused, timeout),
+VotingService.submit_vote() hands it to the spool instead of failing:
+the vote is checked against a cached index of the event's tickets and
+contestants and appended to a SQLite file in WAL mode with
+synchronous=FULL, so it is on disk before the voter sees the answer.
+While the database is down (and until the spool has drained) new votes
+go straight to the spool, so the first vote spooled for a ticket is the
+one that counts and votes are replayed in arrival order. Pending votes
+are flagged in a one-byte file next to the spool that every process on
+the host maps, so all of them keep spooling until the replayer has
+drained the votes.
+
+A replayer thread in each web process (only one per host replays at a
+time, via a lock file) or scripts/replay_vote_spool.py feeds pending
+votes to replay_spooled_votes() (migration 016) in batches and records
+each outcome: 'applied', or 'rejected' with the database's reason (for
+example 'Ticket already used'). The same thread refreshes the ticket
+index while the database is up. stats() reports spool depth and replay
+lag for operators (GET /api/admin/spool).
+"""
+import fcntl
+import ipaddress
+import logging
+import mmap
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from .config import Config
+from .database import db_adapter, OUTAGE_ERRORS
+
+logger = logging.getLogger(__name__)
+
+SPOOL_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS spool_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+    CREATE TABLE IF NOT EXISTS spooled_votes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_id INTEGER NOT NULL,
+        ticket_code TEXT NOT NULL,
+        contestant_id INTEGER NOT NULL,
+        ip_address TEXT,
+        user_agent TEXT,
+        spooled_at REAL NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        message TEXT,
+        vote_id INTEGER,
+        replayed_at REAL
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_spooled_votes_pending_ticket
+        ON spooled_votes (event_id, ticket_code) WHERE status = 'pending';
+    CREATE INDEX IF NOT EXISTS idx_spooled_votes_status ON spooled_votes (status, seq);
+"""
+
+TICKET_INDEX_QUERY = """
+    SELECT ticket_code,
+           used_round_id IS NOT NULL AND used_round_id = current_round_id(event_id) AS used
+    FROM tickets WHERE event_id = %s
+"""
+
+REPLAY_QUERY = ('SELECT * FROM replay_spooled_votes(%s::UUID, %s::BIGINT[], %s::VARCHAR[], %s::INTEGER[], '
+                '%s::INET[], %s::TEXT[], %s::INTEGER[], %s::TIMESTAMPTZ[])')
+
+
+class SpoolRejected(Exception):
+    """The vote failed the spool's local checks; str() is the voter-facing reason"""
+
+
+def _clean_ip(ip_address):
+    """The address if Postgres will accept it as INET, else None (a bad one would poison a batch)"""
+    try:
+        return str(ipaddress.ip_address(ip_address)) if ip_address else None
+    except ValueError:
+        return None
+
+
+class TicketIndex:
+    """Snapshot of one event's ticket codes, used codes, contestants and voting flag"""
+
+    def __init__(self, codes, used, contestants, voting_open):
+        self.codes = codes
+        self.used = used
+        self.contestants = contestants
+        self.voting_open = voting_open
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def load(cls, event_id):
+        from .models import Contestant, Event
+        codes, used = set(), set()
+        for code, is_used in db_adapter.iter_query(TICKET_INDEX_QUERY, (event_id,), itersize=10000, as_dict=False):
+            codes.add(code)
+            if is_used:
+                used.add(code)
+        contestants = {c.id: c.to_dict() for c in Contestant.get_all(event_id)}
+        return cls(codes, used, contestants, Event.is_voting_open(event_id))
+
+    def check(self, ticket_code):
+        """Why the ticket cannot vote, or None"""
+        if ticket_code not in self.codes:
+            return 'Invalid ticket code'
+        if ticket_code in self.used:
+            return 'Ticket already used'
+        return None
+
+
+class VoteSpool:
+    def __init__(self, path):
+        self.path = path
+        self.enabled = bool(path)
+        self.spool_id = None
+        self._indexes = {}
+        self._events = set()
+        self._down_until = 0.0
+        self._pending_flag = None
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA synchronous = FULL')
+        return conn
+
+    def _ensure(self):
+        """Create the spool file and its id on first use"""
+        if self.spool_id:
+            return
+        with self._lock:
+            if self.spool_id:
+                return
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+            try:
+                conn.execute('PRAGMA journal_mode = WAL')
+                conn.executescript(SPOOL_SCHEMA)
+                conn.execute("INSERT OR IGNORE INTO spool_meta (key, value) VALUES ('spool_id', ?)",
+                             (str(uuid.uuid4()),))
+                self.spool_id = conn.execute("SELECT value FROM spool_meta WHERE key = 'spool_id'").fetchone()[0]
+            finally:
+                conn.close()
+            if self._has_pending():
+                self._mark_pending()
+
+    # -- vote path -----------------------------------------------------
+
+    def should_spool(self, event_id):
+        """True while the database is marked down or older spooled votes still wait"""
+        if not self.enabled:
+            return False
+        self._events.add(event_id)
+        if self._down_until > 0 and time.monotonic() < self._down_until:
+            return True
+        # Shared with the other processes: votes spooled by any of them wait
+        return (self._pending_flag or self._map_pending_flag())[0] == 1
+
+    def mark_down(self):
+        """Send votes to the spool for VOTE_SPOOL_RETRY_AFTER seconds without trying the database"""
+        self._down_until = time.monotonic() + Config.VOTE_SPOOL_RETRY_AFTER
+
+    def database_down(self):
+        return self.enabled and time.monotonic() < self._down_until
+
+    def voting_open(self, event_id):
+        """Last known voting flag of the event (open if never loaded)"""
+        index = self._indexes.get(event_id)
+        return True if index is None else index.voting_open
+
+    def check_ticket(self, event_id, ticket_code):
+        """Why the ticket cannot vote according to the cached index, or None (also when not indexed)"""
+        index = self._indexes.get(event_id)
+        return index.check(ticket_code) if index is not None else None
+
+    def contestants(self, event_id):
+        """Cached contestant dicts of the event, None if not indexed"""
+        index = self._indexes.get(event_id)
+        return sorted(index.contestants.values(), key=lambda c: c['name']) if index is not None else None
+
+    def append(self, event_id, ticket_code, contestant_id, ip_address, user_agent):
+        """Durably spool a vote; returns the contestant name if known, raises SpoolRejected"""
+        self._ensure()
+        try:
+            contestant_id = int(contestant_id)
+        except (TypeError, ValueError):
+            raise SpoolRejected('Invalid contestant')
+        index = self._indexes.get(event_id)
+        name = None
+        if index is not None:
+            # Without an index the vote is spooled unchecked; the replay decides
+            reason = index.check(ticket_code)
+            if reason:
+                raise SpoolRejected(reason)
+            if contestant_id not in index.contestants:
+                raise SpoolRejected('Invalid contestant')
+            name = index.contestants[contestant_id]['name']
+
+        # Flagged before the insert so other processes stop voting directly
+        # at once, and again after it in case the replayer cleared it between
+        self._mark_pending()
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT INTO spooled_votes (event_id, ticket_code, contestant_id, ip_address, user_agent, spooled_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (event_id, ticket_code, contestant_id, _clean_ip(ip_address),
+                 (user_agent or '')[:512] or None, time.time()))
+        except sqlite3.IntegrityError:
+            raise SpoolRejected('Ticket already used')
+        finally:
+            conn.close()
+        self._mark_pending()
+        if index is not None:
+            index.used.add(ticket_code)
+        return name
+
+    # -- replay --------------------------------------------------------
+
+    def replay(self, batch_size=None):
+        """Feed pending votes to the database until none are left; returns (applied, rejected)
+
+        Returns None if another process holds the replay lock. Database
+        errors propagate and leave the remaining votes pending.
+        """
+        self._ensure()
+        batch_size = batch_size or Config.VOTE_SPOOL_BATCH_SIZE
+        lock_file = open(self.path + '.lock', 'w')
+        try:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another process replays and clears the marker when done
+                return None
+            applied = rejected = 0
+            conn = self._connect()
+            try:
+                while True:
+                    rows = conn.execute(
+                        "SELECT seq, ticket_code, contestant_id, ip_address, user_agent, event_id, spooled_at "
+                        "FROM spooled_votes WHERE status = 'pending' ORDER BY seq LIMIT ?",
+                        (batch_size,)).fetchall()
+                    if not rows:
+                        self._clear_pending()
+                        break
+                    columns = list(zip(*rows))
+                    spooled_ats = [datetime.fromtimestamp(t, timezone.utc) for t in columns[6]]
+                    outcomes = db_adapter.execute_query(
+                        REPLAY_QUERY,
+                        (self.spool_id, list(columns[0]), list(columns[1]), list(columns[2]),
+                         list(columns[3]), list(columns[4]), list(columns[5]), spooled_ats),
+                        fetch_all=True)
+                    now = time.time()
+                    conn.execute('BEGIN IMMEDIATE')
+                    for o in outcomes:
+                        status = 'applied' if o['success'] else 'rejected'
+                        conn.execute(
+                            'UPDATE spooled_votes SET status = ?, message = ?, vote_id = ?, replayed_at = ? '
+                            'WHERE seq = ?', (status, o['message'], o['vote_id'], now, o['seq']))
+                        if o['success']:
+                            applied += 1
+                        else:
+                            rejected += 1
+                    conn.execute('COMMIT')
+                    if len(rows) < batch_size:
+                        self._clear_pending()
+                        break
+            finally:
+                conn.close()
+            if applied or rejected:
+                logger.info(f"Vote spool replayed: {applied} applied, {rejected} rejected")
+            return applied, rejected
+        finally:
+            lock_file.close()
+
+    def _map_pending_flag(self):
+        """Map the pending flag file shared by the processes using this spool"""
+        with self._lock:
+            if self._pending_flag is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path + '.pending', 'a+b') as f:
+                    # Appending never overwrites a flag another process set
+                    if os.fstat(f.fileno()).st_size == 0:
+                        f.write(b'\0')
+                        f.flush()
+                    self._pending_flag = mmap.mmap(f.fileno(), 1)
+        return self._pending_flag
+
+    def _mark_pending(self):
+        (self._pending_flag or self._map_pending_flag())[0] = 1
+
+    def _clear_pending(self):
+        """Clear the flag unless a vote was spooled meanwhile"""
+        (self._pending_flag or self._map_pending_flag())[0] = 0
+        # append() flags after its insert, but may have flagged just before
+        # the clear with the insert committed already
+        if self._has_pending():
+            self._mark_pending()
+
+    def _has_pending(self):
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT EXISTS (SELECT 1 FROM spooled_votes WHERE status = 'pending')").fetchone()[0] == 1
+        finally:
+            conn.close()
+
+    def refresh_indexes(self):
+        """Reload the ticket index of every event this process has seen votes for"""
+        for event_id in list(self._events):
+            index = self._indexes.get(event_id)
+            if index is None or time.monotonic() - index.loaded_at >= Config.VOTE_SPOOL_INDEX_REFRESH:
+                self._indexes[event_id] = TicketIndex.load(event_id)
+
+    def stats(self):
+        """Spool depth and replay lag for operators"""
+        self._ensure()
+        conn = self._connect()
+        try:
+            counts = dict(conn.execute('SELECT status, COUNT(*) FROM spooled_votes GROUP BY status').fetchall())
+            oldest = conn.execute(
+                "SELECT MIN(spooled_at) FROM spooled_votes WHERE status = 'pending'").fetchone()[0]
+            last = conn.execute('SELECT MAX(replayed_at) FROM spooled_votes').fetchone()[0]
+        finally:
+            conn.close()
+        return {
+            'enabled': self.enabled,
+            'spool_id': self.spool_id,
+            'database_down': self.database_down(),
+            'depth': counts.get('pending', 0),
+            'applied': counts.get('applied', 0),
+            'rejected': counts.get('rejected', 0),
+            'replay_lag_seconds': round(time.time() - oldest, 1) if oldest else 0,
+            'last_replayed_at': datetime.fromtimestamp(last, timezone.utc).isoformat() if last else None,
+            'indexed_events': sorted(self._indexes),
+        }
+
+    # -- background thread ---------------------------------------------
+
+    def start(self):
+        """Start the replayer thread once per process (again in a forked child)"""
+        if not self.enabled or self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._ensure()
+        threading.Thread(target=self.run_forever, name='vote-spool', daemon=True).start()
+
+    def run_forever(self):
+        while True:
+            time.sleep(Config.VOTE_SPOOL_POLL_INTERVAL)
+            try:
+                if self.database_down():
+                    db_adapter.execute_query('SELECT 1', fetch_one=True)
+                self.refresh_indexes()
+                self.replay()
+                # Reachable again: let votes go to the database directly
+                self._down_until = 0.0
+            except OUTAGE_ERRORS as e:
+                self.mark_down()
+                logger.warning(f"Vote spool: database unavailable ({e})")
+            except Exception as e:
+                logger.error(f"Vote spool replay error: {e}")
+
+
+vote_spool = VoteSpool(Config.VOTE_SPOOL_PATH)
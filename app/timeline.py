@@ -0,0 +1,116 @@
+"""
+Vote velocity timelines from the rollup tables
+
+vote_rollup_1m and vote_rollup_10m (migration 010) hold vote counts per
+minute / ten minutes, contestant and seat section, so a timeline never
+reads votes. Series are downsampled to at most TIMELINE_MAX_POINTS
+buckets; the coarser table is used whenever the bucket width allows it.
+Timestamps are epoch milliseconds.
+"""
+import math
+from datetime import datetime, timezone
+from .config import Config
+from .database import db_adapter
+
+MINUTE_MS = 60 * 1000
+
+# Bucket width of each rollup table, coarsest first
+ROLLUP_TABLES = [
+    (10 * MINUTE_MS, 'vote_rollup_10m'),
+    (MINUTE_MS, 'vote_rollup_1m'),
+]
+
+# ?by= -> rollup column the series are keyed by
+TIMELINE_DIMENSIONS = {
+    'contestant': 'contestant_id',
+    'section': 'section_code',
+    'total': "'total'",
+}
+
+
+def to_epoch_ms(value):
+    """Epoch milliseconds from an int/str of milliseconds or an ISO-8601 string"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    value = str(value).strip()
+    if value.lstrip('-').isdigit():
+        return int(value)
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+def choose_step(start_ms, end_ms, step_ms=None, max_points=None):
+    """Bucket width: at least step_ms, whole minutes, and no more than max_points buckets"""
+    max_points = max_points or Config.TIMELINE_MAX_POINTS
+    step = max(step_ms or 0, math.ceil((end_ms - start_ms) / max_points), MINUTE_MS)
+    return math.ceil(step / MINUTE_MS) * MINUTE_MS
+
+
+def rollup_table(step_ms):
+    """Coarsest rollup whose buckets divide step_ms evenly"""
+    for width, table in ROLLUP_TABLES:
+        if step_ms % width == 0:
+            return width, table
+    raise ValueError(f"step_ms must be a whole number of minutes: {step_ms}")
+
+
+def get_timeline(event_id, start_ms, end_ms, step_ms=None, by='contestant',
+                 contestant_id=None, section_code=None, max_points=None):
+    """Downsampled vote counts for the event's active round between start_ms and end_ms"""
+    if by not in TIMELINE_DIMENSIONS:
+        raise ValueError(f"Unknown dimension: {by}")
+    if end_ms <= start_ms:
+        raise ValueError("end must be after start")
+
+    step = choose_step(start_ms, end_ms, step_ms, max_points)
+    width, table = rollup_table(step)
+    # Align to the step so every output bucket covers whole rollup buckets
+    start = start_ms // step * step
+    end = -(-end_ms // step) * step
+
+    query = f"""
+        SELECT FLOOR(EXTRACT(EPOCH FROM bucket) * 1000 / %s)::BIGINT * %s AS t,
+               {TIMELINE_DIMENSIONS[by]} AS key,
+               SUM(votes)::BIGINT AS votes
+        FROM {table}
+        WHERE event_id = %s AND round_id = current_round_id(%s)
+          AND bucket >= %s AND bucket < %s
+    """
+    params = [step, step, event_id, event_id,
+              datetime.fromtimestamp(start / 1000, timezone.utc),
+              datetime.fromtimestamp(end / 1000, timezone.utc)]
+    if contestant_id is not None:
+        query += ' AND contestant_id = %s'
+        params.append(contestant_id)
+    if section_code is not None:
+        query += ' AND section_code = %s'
+        params.append(section_code)
+    query += ' GROUP BY 1, 2 ORDER BY 2, 1'
+
+    rows = db_adapter.execute_query(query, tuple(params), fetch_all=True)
+
+    # Dense series: one point per bucket, zero where nobody voted
+    buckets = range(start, end, step)
+    counts = {}
+    for row in rows:
+        counts.setdefault(row['key'], {})[row['t']] = row['votes']
+    series = [
+        {
+            'key': key,
+            'total': sum(points.values()),
+            'points': [[t, points.get(t, 0)] for t in buckets]
+        }
+        for key, points in counts.items()
+    ]
+    series.sort(key=lambda s: s['total'], reverse=True)
+
+    return {
+        'from': start,
+        'to': end,
+        'step_ms': step,
+        'source': table,
+        'by': by,
+        'series': series
+    }
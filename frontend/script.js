@@ -2,6 +2,7 @@
 let selectedContestantId = null;
 let currentTicketCode = null;
 let contestants = [];
+let pendingVote = null;
 
 // API endpoints
 const API_BASE = '/api';
@@ -158,6 +159,16 @@ function updateSubmitButton() {
 }
 
 // Vote submission
+// One Idempotency-Key per distinct vote, reused when that vote is retried
+function voteIdempotencyKey(payload) {
+    if (!pendingVote || pendingVote.payload !== payload) {
+        const key = (window.crypto && crypto.randomUUID) ? crypto.randomUUID()
+            : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+        pendingVote = { payload, key };
+    }
+    return pendingVote.key;
+}
+
 async function submitVote() {
     if (!currentTicketCode || !selectedContestantId) {
         showError('Please select a contestant first');
@@ -165,15 +176,17 @@ async function submitVote() {
     }
     
     try {
+        const body = JSON.stringify({
+            ticket_code: currentTicketCode,
+            contestant_id: selectedContestantId
+        });
         const response = await fetch(ENDPOINTS.VOTE, {
             method: 'POST',
             headers: {
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                'Idempotency-Key': voteIdempotencyKey(body)
             },
-            body: JSON.stringify({
-                ticket_code: currentTicketCode,
-                contestant_id: selectedContestantId
-            })
+            body
         });
         
         const data = await response.json();
@@ -376,30 +389,46 @@ function loadTicketStats() {
     console.log('Loading ticket statistics...');
 }
 
+// Admin jobs run in the background: poll until the queued job finishes
+async function waitForJob(jobId) {
+    while (true) {
+        const response = await fetch(`/api/admin/jobs/${jobId}`, { credentials: 'include' });
+        const job = await response.json();
+        if (!response.ok) throw new Error(job.error || 'Failed to read job');
+        if (!['queued', 'running'].includes(job.status)) return job;
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
+async function runAdminJob(endpoint, body) {
+    const response = await fetch(endpoint, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(body || {}),
+        credentials: 'include'
+    });
+    const data = await response.json();
+    if (!response.ok) throw new Error(data.error || 'Request failed');
+    const job = await waitForJob(data.job_id);
+    if (job.status !== 'succeeded') throw new Error(job.message || `Job ${job.status}`);
+    return job.result || {};
+}
+
 function confirmResetVoting() {
     if (confirm('Are you sure you want to reset all voting? This action cannot be undone.')) {
-        fetch('/api/admin/reset-voting', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            credentials: 'include'
-        })
-        .then(response => response.json())
-        .then(data => {
-            if (data.success) {
-                alert('Voting has been reset successfully!');
-                // Reload the dashboard data
-                if (typeof loadDashboardData === 'function') {
-                    loadDashboardData();
-                }
-            } else {
-                alert('Error: ' + (data.error || 'Failed to reset voting'));
+        runAdminJob('/api/admin/reset-voting')
+        .then(() => {
+            alert('Voting has been reset successfully!');
+            // Reload the dashboard data
+            if (typeof loadDashboardData === 'function') {
+                loadDashboardData();
             }
         })
         .catch(error => {
             console.error('Error:', error);
-            alert('Error: Failed to reset voting');
+            alert('Error: ' + (error.message || 'Failed to reset voting'));
         });
     }
 }
@@ -410,30 +439,18 @@ function generateNewTickets() {
     
     const ticketCount = parseInt(count) || 100;
     
-    if (confirm(`Generate ${ticketCount} new tickets? This will add to existing tickets.`)) {
-        fetch('/api/admin/generate-tickets', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ count: ticketCount }),
-            credentials: 'include'
-        })
-        .then(response => response.json())
-        .then(data => {
-            if (data.success) {
-                alert(`Successfully generated ${data.count} new tickets!`);
-                // Reload the dashboard data
-                if (typeof loadDashboardData === 'function') {
-                    loadDashboardData();
-                }
-            } else {
-                alert('Error: ' + (data.error || 'Failed to generate tickets'));
+    if (confirm(`Generate ${ticketCount} new tickets? This will replace existing tickets.`)) {
+        runAdminJob('/api/admin/generate-tickets', { count: ticketCount })
+        .then(result => {
+            alert(`Successfully generated ${result.inserted} new tickets!`);
+            // Reload the dashboard data
+            if (typeof loadDashboardData === 'function') {
+                loadDashboardData();
             }
         })
         .catch(error => {
             console.error('Error:', error);
-            alert('Error: Failed to generate tickets');
+            alert('Error: ' + (error.message || 'Failed to generate tickets'));
         });
     }
 }
@@ -0,0 +1,178 @@
+-- Migration 006: Statement-level audit triggers with transition tables
+-- Replaces the row-level audit_trigger_function triggers from migration 003.
+--
+-- * One trigger call per statement; rows are written set-based from the
+--   REFERENCING NEW TABLE / OLD TABLE transition tables.
+-- * Compact encoding: INSERT/DELETE store the row without NULL columns,
+--   UPDATE stores only the columns that changed (old and new side).
+-- * audit_mode = 'async' writes into the UNLOGGED audit_log_staging table
+--   instead; drain_audit_staging() moves batches into audit_log
+--   (see scripts/drain_audit_log.py). Staged rows not yet drained are lost
+--   if Postgres crashes - use 'sync' when that matters.
+--
+-- audit_trigger_function() is kept so the old behaviour can be restored
+-- (and benchmarked) without re-running migration 003.
+
+-- Staging table for async mode (no WAL, no indexes besides the PK)
+CREATE UNLOGGED TABLE IF NOT EXISTS audit_log_staging (
+    staging_id BIGSERIAL PRIMARY KEY,
+    event_type VARCHAR(50) NOT NULL,
+    table_name VARCHAR(50),
+    record_id INTEGER,
+    old_values JSONB,
+    new_values JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE audit_log_staging ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Audit staging is admin only"
+ON audit_log_staging FOR ALL
+USING (FALSE);
+
+INSERT INTO app_settings (key, value)
+VALUES ('audit_mode', 'sync')
+ON CONFLICT (key) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION set_audit_mode(mode TEXT)
+RETURNS VOID AS $$
+BEGIN
+  IF mode NOT IN ('sync', 'async') THEN
+    RAISE EXCEPTION 'audit_mode must be sync or async, got %', mode;
+  END IF;
+  INSERT INTO app_settings (key, value, updated_at)
+  VALUES ('audit_mode', mode, NOW())
+  ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = NOW();
+END $$ LANGUAGE plpgsql;
+
+-- Columns whose value differs between two row images, as a JSONB object
+CREATE OR REPLACE FUNCTION audit_changed_columns(from_row JSONB, to_row JSONB)
+RETURNS JSONB
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT COALESCE(jsonb_object_agg(t.key, t.value), '{}'::JSONB)
+    FROM jsonb_each(to_row) AS t
+    WHERE from_row -> t.key IS DISTINCT FROM t.value;
+$$;
+
+CREATE OR REPLACE FUNCTION audit_statement_function()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    async_mode BOOLEAN;
+BEGIN
+    SELECT value = 'async' INTO async_mode FROM app_settings WHERE key = 'audit_mode';
+
+    IF TG_OP = 'INSERT' THEN
+        IF async_mode THEN
+            INSERT INTO audit_log_staging (event_type, table_name, record_id, new_values)
+            SELECT TG_OP, TG_TABLE_NAME, n.id, jsonb_strip_nulls(to_jsonb(n)) FROM new_rows n;
+        ELSE
+            INSERT INTO audit_log (event_type, table_name, record_id, new_values)
+            SELECT TG_OP, TG_TABLE_NAME, n.id, jsonb_strip_nulls(to_jsonb(n)) FROM new_rows n;
+        END IF;
+    ELSIF TG_OP = 'UPDATE' THEN
+        -- Rows are paired on id; ids are never updated in this schema
+        IF async_mode THEN
+            INSERT INTO audit_log_staging (event_type, table_name, record_id, old_values, new_values)
+            SELECT TG_OP, TG_TABLE_NAME, n.id,
+                   audit_changed_columns(to_jsonb(n), to_jsonb(o)),
+                   audit_changed_columns(to_jsonb(o), to_jsonb(n))
+            FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE to_jsonb(n) IS DISTINCT FROM to_jsonb(o);
+        ELSE
+            INSERT INTO audit_log (event_type, table_name, record_id, old_values, new_values)
+            SELECT TG_OP, TG_TABLE_NAME, n.id,
+                   audit_changed_columns(to_jsonb(n), to_jsonb(o)),
+                   audit_changed_columns(to_jsonb(o), to_jsonb(n))
+            FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE to_jsonb(n) IS DISTINCT FROM to_jsonb(o);
+        END IF;
+    ELSIF TG_OP = 'DELETE' THEN
+        IF async_mode THEN
+            INSERT INTO audit_log_staging (event_type, table_name, record_id, old_values)
+            SELECT TG_OP, TG_TABLE_NAME, o.id, jsonb_strip_nulls(to_jsonb(o)) FROM old_rows o;
+        ELSE
+            INSERT INTO audit_log (event_type, table_name, record_id, old_values)
+            SELECT TG_OP, TG_TABLE_NAME, o.id, jsonb_strip_nulls(to_jsonb(o)) FROM old_rows o;
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- Move up to batch_size staged rows into audit_log; returns rows moved.
+-- SKIP LOCKED lets several drainers run without blocking each other.
+CREATE OR REPLACE FUNCTION drain_audit_staging(batch_size INTEGER DEFAULT 5000)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    moved INTEGER;
+BEGIN
+    WITH batch AS (
+        DELETE FROM audit_log_staging
+        WHERE staging_id IN (
+            SELECT staging_id FROM audit_log_staging
+            ORDER BY staging_id
+            LIMIT batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING staging_id, event_type, table_name, record_id, old_values, new_values, created_at
+    )
+    INSERT INTO audit_log (event_type, table_name, record_id, old_values, new_values, created_at)
+    SELECT event_type, table_name, record_id, old_values, new_values, created_at
+    FROM batch
+    ORDER BY staging_id;
+
+    GET DIAGNOSTICS moved = ROW_COUNT;
+    RETURN moved;
+END;
+$$;
+
+-- Swap row-level triggers for statement-level ones (one per event, as
+-- transition tables cannot be shared between events)
+DROP TRIGGER IF EXISTS audit_contestants_trigger ON contestants;
+DROP TRIGGER IF EXISTS audit_tickets_trigger ON tickets;
+DROP TRIGGER IF EXISTS audit_votes_trigger ON votes;
+
+DROP TRIGGER IF EXISTS audit_contestants_insert ON contestants;
+DROP TRIGGER IF EXISTS audit_contestants_update ON contestants;
+DROP TRIGGER IF EXISTS audit_contestants_delete ON contestants;
+CREATE TRIGGER audit_contestants_insert
+    AFTER INSERT ON contestants REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION audit_statement_function();
+CREATE TRIGGER audit_contestants_update
+    AFTER UPDATE ON contestants REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION audit_statement_function();
+CREATE TRIGGER audit_contestants_delete
+    AFTER DELETE ON contestants REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION audit_statement_function();
+
+DROP TRIGGER IF EXISTS audit_tickets_insert ON tickets;
+DROP TRIGGER IF EXISTS audit_tickets_update ON tickets;
+DROP TRIGGER IF EXISTS audit_tickets_delete ON tickets;
+CREATE TRIGGER audit_tickets_insert
+    AFTER INSERT ON tickets REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION audit_statement_function();
+CREATE TRIGGER audit_tickets_update
+    AFTER UPDATE ON tickets REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION audit_statement_function();
+CREATE TRIGGER audit_tickets_delete
+    AFTER DELETE ON tickets REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION audit_statement_function();
+
+DROP TRIGGER IF EXISTS audit_votes_insert ON votes;
+DROP TRIGGER IF EXISTS audit_votes_update ON votes;
+DROP TRIGGER IF EXISTS audit_votes_delete ON votes;
+CREATE TRIGGER audit_votes_insert
+    AFTER INSERT ON votes REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION audit_statement_function();
+CREATE TRIGGER audit_votes_update
+    AFTER UPDATE ON votes REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION audit_statement_function();
+CREATE TRIGGER audit_votes_delete
+    AFTER DELETE ON votes REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION audit_statement_function();
@@ -0,0 +1,332 @@
+-- Migration 007: Range-partition votes and audit_log by created_at
+-- Requires PostgreSQL 13+ (row triggers on partitioned tables) and migration 006.
+--
+-- * Monthly partitions named <table>_pYYYY_MM plus a <table>_default catch-all.
+-- * partition_policies lists how many months to pre-create and, optionally,
+--   how long to keep old partitions; run_partition_maintenance() applies it
+--   (scheduled with pg_cron when available, otherwise run
+--   scripts/maintain_partitions.py from cron).
+-- * votes.ticket_id can no longer be UNIQUE (unique keys must include the
+--   partition key). submit_vote() now claims the ticket with a conditional
+--   UPDATE first, so the ticket row lock is what guarantees one vote per
+--   ticket.
+
+-- ---------------------------------------------------------------------
+-- Partition management
+-- ---------------------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS partition_policies (
+    table_name TEXT PRIMARY KEY,
+    months_ahead INTEGER NOT NULL DEFAULT 3,
+    retention INTERVAL NULL,             -- NULL keeps partitions forever
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+INSERT INTO partition_policies (table_name, months_ahead, retention) VALUES
+    ('votes', 3, NULL),
+    ('audit_log', 3, INTERVAL '180 days')
+ON CONFLICT (table_name) DO NOTHING;
+
+-- Create monthly partitions of parent_table covering [range_start, range_end).
+-- Rows already sitting in the default partition for a new month are moved
+-- into it before it is attached. Returns the partitions created.
+CREATE OR REPLACE FUNCTION ensure_time_partitions(
+    parent_table TEXT,
+    range_start TIMESTAMPTZ,
+    range_end TIMESTAMPTZ
+)
+RETURNS SETOF TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    month_start TIMESTAMPTZ;
+    month_end TIMESTAMPTZ;
+    part_name TEXT;
+    default_name TEXT := parent_table || '_default';
+BEGIN
+    month_start := date_trunc('month', range_start AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+    WHILE month_start < range_end LOOP
+        month_end := month_start + INTERVAL '1 month';
+        part_name := format('%s_p%s', parent_table, to_char(month_start AT TIME ZONE 'UTC', 'YYYY_MM'));
+
+        IF to_regclass(part_name) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                           part_name, parent_table);
+            IF to_regclass(default_name) IS NOT NULL THEN
+                EXECUTE format('INSERT INTO %I SELECT * FROM %I WHERE created_at >= %L AND created_at < %L',
+                               part_name, default_name, month_start, month_end);
+                EXECUTE format('DELETE FROM %I WHERE created_at >= %L AND created_at < %L',
+                               default_name, month_start, month_end);
+            END IF;
+            EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                           parent_table, part_name, month_start, month_end);
+            RETURN NEXT part_name;
+        END IF;
+
+        month_start := month_end;
+    END LOOP;
+END;
+$$;
+
+-- Detach and drop partitions whose whole month is older than the retention
+CREATE OR REPLACE FUNCTION drop_expired_partitions(parent_table TEXT, retention INTERVAL)
+RETURNS SETOF TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    part RECORD;
+    month_start TIMESTAMPTZ;
+BEGIN
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = parent_table::regclass
+          AND c.relname ~ ('^' || parent_table || '_p[0-9]{4}_[0-9]{2}$')
+        ORDER BY c.relname
+    LOOP
+        month_start := to_date(right(part.relname, 7), 'YYYY_MM')::TIMESTAMP AT TIME ZONE 'UTC';
+        IF month_start + INTERVAL '1 month' <= NOW() - retention THEN
+            EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', parent_table, part.relname);
+            EXECUTE format('DROP TABLE %I', part.relname);
+            RETURN NEXT part.relname;
+        END IF;
+    END LOOP;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION run_partition_maintenance()
+RETURNS TABLE(table_name TEXT, action TEXT, partition_name TEXT)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    policy RECORD;
+BEGIN
+    FOR policy IN SELECT * FROM partition_policies ORDER BY partition_policies.table_name LOOP
+        RETURN QUERY
+            SELECT policy.table_name, 'created'::TEXT, p
+            FROM ensure_time_partitions(policy.table_name, NOW(),
+                                        NOW() + make_interval(months => policy.months_ahead + 1)) AS p;
+        IF policy.retention IS NOT NULL THEN
+            RETURN QUERY
+                SELECT policy.table_name, 'dropped'::TEXT, p
+                FROM drop_expired_partitions(policy.table_name, policy.retention) AS p;
+        END IF;
+    END LOOP;
+END;
+$$;
+
+-- ---------------------------------------------------------------------
+-- votes
+-- ---------------------------------------------------------------------
+
+DROP VIEW IF EXISTS voting_results;
+
+ALTER TABLE votes RENAME TO votes_unpartitioned;
+ALTER INDEX votes_pkey RENAME TO votes_unpartitioned_pkey;
+ALTER INDEX votes_ticket_id_key RENAME TO votes_unpartitioned_ticket_id_key;
+DROP INDEX IF EXISTS idx_votes_contestant;
+DROP INDEX IF EXISTS idx_votes_ticket;
+DROP INDEX IF EXISTS idx_votes_created;
+DROP INDEX IF EXISTS idx_votes_ip_created;
+ALTER SEQUENCE votes_id_seq OWNED BY NONE;
+
+CREATE TABLE votes (
+    id INTEGER NOT NULL DEFAULT nextval('votes_id_seq'),
+    contestant_id INTEGER NOT NULL REFERENCES contestants(id) ON DELETE CASCADE,
+    ticket_id INTEGER NOT NULL REFERENCES tickets(id) ON DELETE CASCADE,
+    ip_address INET,
+    user_agent TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    CONSTRAINT votes_pkey PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+ALTER SEQUENCE votes_id_seq OWNED BY votes.id;
+CREATE TABLE votes_default PARTITION OF votes DEFAULT;
+
+SELECT ensure_time_partitions('votes',
+    COALESCE((SELECT MIN(created_at) FROM votes_unpartitioned), NOW()),
+    NOW() + INTERVAL '4 months');
+
+INSERT INTO votes (id, contestant_id, ticket_id, ip_address, user_agent, created_at)
+SELECT id, contestant_id, ticket_id, ip_address, user_agent, COALESCE(created_at, NOW())
+FROM votes_unpartitioned;
+
+DROP TABLE votes_unpartitioned;
+
+CREATE INDEX IF NOT EXISTS idx_votes_contestant ON votes(contestant_id);
+CREATE INDEX IF NOT EXISTS idx_votes_ticket ON votes(ticket_id);
+CREATE INDEX IF NOT EXISTS idx_votes_created ON votes(created_at);
+CREATE INDEX IF NOT EXISTS idx_votes_ip_created ON votes(ip_address, created_at);
+
+ALTER TABLE votes ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Votes are viewable for results"
+ON votes FOR SELECT
+USING (TRUE);
+
+CREATE POLICY "Votes can only be inserted via function"
+ON votes FOR INSERT
+WITH CHECK (FALSE);
+
+CREATE TRIGGER rate_limit_trigger
+    BEFORE INSERT ON votes
+    FOR EACH ROW EXECUTE FUNCTION check_rate_limit();
+
+CREATE TRIGGER audit_votes_insert
+    AFTER INSERT ON votes REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION audit_statement_function();
+CREATE TRIGGER audit_votes_update
+    AFTER UPDATE ON votes REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION audit_statement_function();
+CREATE TRIGGER audit_votes_delete
+    AFTER DELETE ON votes REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION audit_statement_function();
+
+CREATE OR REPLACE VIEW voting_results AS
+SELECT
+    c.id,
+    c.name,
+    c.description,
+    c.image_url,
+    COUNT(v.id) as vote_count,
+    ROUND(
+        CASE
+            WHEN (SELECT COUNT(*) FROM votes) > 0
+            THEN (COUNT(v.id)::DECIMAL / (SELECT COUNT(*) FROM votes) * 100)
+            ELSE 0
+        END, 2
+    ) as percentage
+FROM contestants c
+LEFT JOIN votes v ON c.id = v.contestant_id
+WHERE c.is_active = TRUE
+GROUP BY c.id, c.name, c.description, c.image_url
+ORDER BY vote_count DESC;
+
+-- ---------------------------------------------------------------------
+-- audit_log
+-- ---------------------------------------------------------------------
+
+ALTER TABLE audit_log RENAME TO audit_log_unpartitioned;
+ALTER INDEX audit_log_pkey RENAME TO audit_log_unpartitioned_pkey;
+DROP INDEX IF EXISTS idx_audit_log_created;
+DROP INDEX IF EXISTS idx_audit_log_table_record;
+DROP INDEX IF EXISTS idx_audit_log_event_type;
+ALTER SEQUENCE audit_log_id_seq OWNED BY NONE;
+
+CREATE TABLE audit_log (
+    id INTEGER NOT NULL DEFAULT nextval('audit_log_id_seq'),
+    event_type VARCHAR(50) NOT NULL,
+    table_name VARCHAR(50),
+    record_id INTEGER,
+    old_values JSONB,
+    new_values JSONB,
+    ip_address INET,
+    user_agent TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    CONSTRAINT audit_log_pkey PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+ALTER SEQUENCE audit_log_id_seq OWNED BY audit_log.id;
+CREATE TABLE audit_log_default PARTITION OF audit_log DEFAULT;
+
+SELECT ensure_time_partitions('audit_log',
+    COALESCE((SELECT MIN(created_at) FROM audit_log_unpartitioned), NOW()),
+    NOW() + INTERVAL '4 months');
+
+INSERT INTO audit_log (id, event_type, table_name, record_id, old_values, new_values,
+                       ip_address, user_agent, created_at)
+SELECT id, event_type, table_name, record_id, old_values, new_values,
+       ip_address, user_agent, COALESCE(created_at, NOW())
+FROM audit_log_unpartitioned;
+
+DROP TABLE audit_log_unpartitioned;
+
+CREATE INDEX IF NOT EXISTS idx_audit_log_created ON audit_log(created_at);
+CREATE INDEX IF NOT EXISTS idx_audit_log_table_record ON audit_log(table_name, record_id);
+CREATE INDEX IF NOT EXISTS idx_audit_log_event_type ON audit_log(event_type);
+
+ALTER TABLE audit_log ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Audit log is admin only"
+ON audit_log FOR ALL
+USING (FALSE);
+
+-- ---------------------------------------------------------------------
+-- submit_vote: claim the ticket first; the row lock replaces UNIQUE(ticket_id)
+-- ---------------------------------------------------------------------
+
+CREATE OR REPLACE FUNCTION submit_vote(
+    ticket_code_param VARCHAR,
+    contestant_id_param INTEGER,
+    ip_address_param INET DEFAULT NULL,
+    user_agent_param TEXT DEFAULT NULL
+)
+RETURNS TABLE(
+    success BOOLEAN,
+    message TEXT,
+    contestant_name VARCHAR,
+    vote_id INTEGER
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    ticket_record RECORD;
+    contestant_record RECORD;
+    new_vote_id INTEGER;
+BEGIN
+    -- Validate ticket
+    SELECT * INTO ticket_record FROM tickets WHERE ticket_code = ticket_code_param;
+
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT FALSE, 'Invalid ticket code'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+        RETURN;
+    END IF;
+
+    IF ticket_record.is_used THEN
+        RETURN QUERY SELECT FALSE, 'Ticket already used'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+        RETURN;
+    END IF;
+
+    -- Validate contestant
+    SELECT * INTO contestant_record FROM contestants WHERE id = contestant_id_param AND is_active = TRUE;
+
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT FALSE, 'Invalid contestant'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+        RETURN;
+    END IF;
+
+    BEGIN
+        -- Claim the ticket; a concurrent vote on the same ticket blocks here
+        -- and then finds is_used already TRUE
+        UPDATE tickets
+        SET is_used = TRUE, used_at = NOW()
+        WHERE id = ticket_record.id AND is_used = FALSE;
+
+        IF NOT FOUND THEN
+            RETURN QUERY SELECT FALSE, 'Ticket already used'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+            RETURN;
+        END IF;
+
+        INSERT INTO votes (contestant_id, ticket_id, ip_address, user_agent)
+        VALUES (contestant_id_param, ticket_record.id, ip_address_param, user_agent_param)
+        RETURNING id INTO new_vote_id;
+
+        RETURN QUERY SELECT TRUE, 'Vote submitted successfully'::TEXT, contestant_record.name, new_vote_id;
+    EXCEPTION WHEN OTHERS THEN
+        RETURN QUERY SELECT FALSE, 'Failed to submit vote'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+    END;
+END;
+$$;
+
+-- ---------------------------------------------------------------------
+-- Schedule maintenance with pg_cron when the extension is installed
+-- ---------------------------------------------------------------------
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+        PERFORM cron.schedule('partition-maintenance', '15 3 * * *',
+                              'SELECT * FROM run_partition_maintenance()');
+    END IF;
+END $$;
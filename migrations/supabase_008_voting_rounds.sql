@@ -0,0 +1,264 @@
+-- Migration 008: Election rounds - O(1) voting reset
+-- Requires migration 007.
+--
+-- Votes and ticket usage are scoped to a round. Resetting the vote starts a
+-- new round (one INSERT) instead of DELETE FROM votes + UPDATE tickets:
+--
+-- * votes.round_id records the round a vote was cast in.
+-- * tickets.used_round_id records the round a ticket was used in; a ticket
+--   is used when used_round_id = current_round_id(). tickets.is_used is
+--   still written but only means "used in some round".
+-- * Votes of finished rounds are deleted lazily in batches by
+--   purge_round_batch() (scripts/purge_rounds.py), or kept when the round
+--   is archived.
+
+CREATE TABLE IF NOT EXISTS voting_rounds (
+    id SERIAL PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'active'
+        CHECK (status IN ('active', 'archived', 'purging', 'purged')),
+    started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    ended_at TIMESTAMPTZ NULL
+);
+
+-- At most one active round
+CREATE UNIQUE INDEX IF NOT EXISTS idx_voting_rounds_active
+    ON voting_rounds ((TRUE)) WHERE status = 'active';
+
+INSERT INTO voting_rounds (status)
+SELECT 'active'
+WHERE NOT EXISTS (SELECT 1 FROM voting_rounds WHERE status = 'active');
+
+ALTER TABLE voting_rounds ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Voting rounds are viewable by everyone"
+ON voting_rounds FOR SELECT
+USING (TRUE);
+
+CREATE OR REPLACE FUNCTION current_round_id()
+RETURNS INTEGER
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT id FROM voting_rounds WHERE status = 'active';
+$$;
+
+-- Existing votes and used tickets belong to the first round
+ALTER TABLE votes ADD COLUMN IF NOT EXISTS round_id INTEGER;
+UPDATE votes SET round_id = current_round_id() WHERE round_id IS NULL;
+ALTER TABLE votes ALTER COLUMN round_id SET DEFAULT current_round_id();
+ALTER TABLE votes ALTER COLUMN round_id SET NOT NULL;
+
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS used_round_id INTEGER NULL;
+UPDATE tickets SET used_round_id = current_round_id() WHERE is_used AND used_round_id IS NULL;
+
+-- Results only ever read the active round
+CREATE INDEX IF NOT EXISTS idx_votes_round_contestant ON votes(round_id, contestant_id);
+
+-- Start a new round; the previous one is queued for purging or archived
+CREATE OR REPLACE FUNCTION start_new_round(purge_previous BOOLEAN DEFAULT TRUE)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    new_round_id INTEGER;
+BEGIN
+    -- Serialise concurrent resets
+    LOCK TABLE voting_rounds IN SHARE ROW EXCLUSIVE MODE;
+
+    UPDATE voting_rounds
+    SET status = CASE WHEN purge_previous THEN 'purging' ELSE 'archived' END,
+        ended_at = NOW()
+    WHERE status = 'active';
+
+    INSERT INTO voting_rounds (status) VALUES ('active')
+    RETURNING id INTO new_round_id;
+
+    RETURN new_round_id;
+END;
+$$;
+
+-- Delete up to batch_size votes of rounds queued for purging; rounds with
+-- nothing left are marked purged. Returns the number of votes deleted.
+CREATE OR REPLACE FUNCTION purge_round_batch(batch_size INTEGER DEFAULT 5000)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    deleted INTEGER;
+BEGIN
+    WITH doomed AS (
+        SELECT v.id, v.created_at
+        FROM votes v
+        WHERE v.round_id IN (SELECT id FROM voting_rounds WHERE status = 'purging')
+        LIMIT batch_size
+    )
+    DELETE FROM votes v
+    USING doomed d
+    WHERE v.id = d.id AND v.created_at = d.created_at;
+
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+
+    UPDATE voting_rounds r
+    SET status = 'purged'
+    WHERE r.status = 'purging'
+      AND NOT EXISTS (SELECT 1 FROM votes v WHERE v.round_id = r.id);
+
+    RETURN deleted;
+END;
+$$;
+
+-- ---------------------------------------------------------------------
+-- Views and functions scoped to the active round
+-- ---------------------------------------------------------------------
+
+CREATE OR REPLACE VIEW voting_results AS
+WITH round_votes AS (
+    SELECT contestant_id, COUNT(*) AS vote_count
+    FROM votes
+    WHERE round_id = current_round_id()
+    GROUP BY contestant_id
+),
+round_total AS (
+    SELECT COALESCE(SUM(vote_count), 0) AS total FROM round_votes
+)
+SELECT
+    c.id,
+    c.name,
+    c.description,
+    c.image_url,
+    COALESCE(rv.vote_count, 0) as vote_count,
+    ROUND(
+        CASE
+            WHEN rt.total > 0
+            THEN (COALESCE(rv.vote_count, 0)::DECIMAL / rt.total * 100)
+            ELSE 0
+        END, 2
+    ) as percentage
+FROM contestants c
+CROSS JOIN round_total rt
+LEFT JOIN round_votes rv ON rv.contestant_id = c.id
+WHERE c.is_active = TRUE
+ORDER BY vote_count DESC;
+
+CREATE OR REPLACE VIEW ticket_stats AS
+SELECT
+    COUNT(*) as total_tickets,
+    COUNT(CASE WHEN used_round_id = current_round_id() THEN 1 END) as used_tickets,
+    COUNT(CASE WHEN used_round_id IS DISTINCT FROM current_round_id() THEN 1 END) as unused_tickets,
+    ROUND(
+        CASE
+            WHEN COUNT(*) > 0
+            THEN (COUNT(CASE WHEN used_round_id = current_round_id() THEN 1 END)::DECIMAL / COUNT(*) * 100)
+            ELSE 0
+        END, 2
+    ) as usage_percentage
+FROM tickets;
+
+CREATE OR REPLACE FUNCTION validate_ticket_code(ticket_code_param VARCHAR)
+RETURNS TABLE(
+    is_valid BOOLEAN,
+    message TEXT,
+    ticket_id INTEGER
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    ticket_record RECORD;
+BEGIN
+    SELECT * INTO ticket_record FROM tickets WHERE ticket_code = ticket_code_param;
+
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT FALSE, 'Invalid ticket code'::TEXT, NULL::INTEGER;
+    ELSIF ticket_record.used_round_id = current_round_id() THEN
+        RETURN QUERY SELECT FALSE, 'Ticket already used'::TEXT, ticket_record.id;
+    ELSE
+        RETURN QUERY SELECT TRUE, 'Ticket is valid'::TEXT, ticket_record.id;
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION submit_vote(
+    ticket_code_param VARCHAR,
+    contestant_id_param INTEGER,
+    ip_address_param INET DEFAULT NULL,
+    user_agent_param TEXT DEFAULT NULL
+)
+RETURNS TABLE(
+    success BOOLEAN,
+    message TEXT,
+    contestant_name VARCHAR,
+    vote_id INTEGER
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    ticket_record RECORD;
+    contestant_record RECORD;
+    new_vote_id INTEGER;
+    active_round INTEGER := current_round_id();
+BEGIN
+    -- Validate ticket
+    SELECT * INTO ticket_record FROM tickets WHERE ticket_code = ticket_code_param;
+
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT FALSE, 'Invalid ticket code'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+        RETURN;
+    END IF;
+
+    IF ticket_record.used_round_id = active_round THEN
+        RETURN QUERY SELECT FALSE, 'Ticket already used'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+        RETURN;
+    END IF;
+
+    -- Validate contestant
+    SELECT * INTO contestant_record FROM contestants WHERE id = contestant_id_param AND is_active = TRUE;
+
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT FALSE, 'Invalid contestant'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+        RETURN;
+    END IF;
+
+    BEGIN
+        -- Claim the ticket for this round; a concurrent vote on the same
+        -- ticket blocks here and then finds it already claimed
+        UPDATE tickets
+        SET is_used = TRUE, used_at = NOW(), used_round_id = active_round
+        WHERE id = ticket_record.id AND used_round_id IS DISTINCT FROM active_round;
+
+        IF NOT FOUND THEN
+            RETURN QUERY SELECT FALSE, 'Ticket already used'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+            RETURN;
+        END IF;
+
+        INSERT INTO votes (contestant_id, ticket_id, ip_address, user_agent, round_id)
+        VALUES (contestant_id_param, ticket_record.id, ip_address_param, user_agent_param, active_round)
+        RETURNING id INTO new_vote_id;
+
+        RETURN QUERY SELECT TRUE, 'Vote submitted successfully'::TEXT, contestant_record.name, new_vote_id;
+    EXCEPTION WHEN OTHERS THEN
+        RETURN QUERY SELECT FALSE, 'Failed to submit vote'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+    END;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION get_voting_stats()
+RETURNS TABLE(
+    total_votes BIGINT,
+    total_tickets BIGINT,
+    used_tickets BIGINT,
+    unused_tickets BIGINT,
+    usage_percentage NUMERIC
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        (SELECT COUNT(*) FROM votes WHERE round_id = current_round_id()) as total_votes,
+        ts.total_tickets,
+        ts.used_tickets,
+        ts.unused_tickets,
+        ts.usage_percentage
+    FROM ticket_stats ts;
+END;
+$$;
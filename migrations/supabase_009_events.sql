@@ -0,0 +1,295 @@
+-- Migration 009: Multi-event tenancy
+-- Requires migration 008.
+--
+-- Several shows can run on one deployment. contestants, tickets, votes and
+-- voting_rounds get an event_id (existing rows belong to event 1,
+-- 'default'); every event has its own voting_open flag and its own active
+-- round, so resetting or closing one show never touches another.
+--
+-- Ticket codes are unique per event (seat codes repeat between shows).
+-- Indexes on the hot paths lead with event_id. votes stays range-partitioned
+-- by month: shows are short and time-disjoint, so the time partitions
+-- already separate them, and per-event sub-partitions would only add a
+-- handful of tiny tables every night.
+
+CREATE TABLE IF NOT EXISTS events (
+    id SERIAL PRIMARY KEY,
+    slug VARCHAR(50) UNIQUE NOT NULL CHECK (slug ~ '^[a-z0-9][a-z0-9-]*$'),
+    name VARCHAR(100) NOT NULL,
+    voting_open BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+INSERT INTO events (id, slug, name, voting_open)
+VALUES (1, 'default', 'Default event',
+        COALESCE((SELECT value::BOOLEAN FROM app_settings WHERE key = 'voting_open'), TRUE))
+ON CONFLICT (id) DO NOTHING;
+SELECT setval(pg_get_serial_sequence('events', 'id'), GREATEST((SELECT MAX(id) FROM events), 1));
+
+ALTER TABLE events ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Events are viewable by everyone"
+ON events FOR SELECT
+USING (TRUE);
+
+-- ---------------------------------------------------------------------
+-- event_id columns (DEFAULT 1 keeps single-event scripts working)
+-- ---------------------------------------------------------------------
+
+ALTER TABLE contestants ADD COLUMN IF NOT EXISTS event_id INTEGER NOT NULL DEFAULT 1 REFERENCES events(id);
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS event_id INTEGER NOT NULL DEFAULT 1 REFERENCES events(id);
+ALTER TABLE votes ADD COLUMN IF NOT EXISTS event_id INTEGER NOT NULL DEFAULT 1 REFERENCES events(id);
+ALTER TABLE voting_rounds ADD COLUMN IF NOT EXISTS event_id INTEGER NOT NULL DEFAULT 1 REFERENCES events(id);
+
+-- Ticket codes are unique within an event
+ALTER TABLE tickets DROP CONSTRAINT IF EXISTS tickets_ticket_code_key;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tickets_event_code ON tickets(event_id, ticket_code);
+
+CREATE INDEX IF NOT EXISTS idx_contestants_event ON contestants(event_id) WHERE is_active = TRUE;
+CREATE INDEX IF NOT EXISTS idx_votes_event_created ON votes(event_id, created_at);
+
+-- One active round per event
+DROP INDEX IF EXISTS idx_voting_rounds_active;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_voting_rounds_event_active
+    ON voting_rounds(event_id) WHERE status = 'active';
+
+-- ---------------------------------------------------------------------
+-- Round and flag helpers, now per event
+-- ---------------------------------------------------------------------
+
+ALTER TABLE votes ALTER COLUMN round_id DROP DEFAULT;
+DROP VIEW IF EXISTS voting_results;
+DROP VIEW IF EXISTS ticket_stats;
+DROP FUNCTION IF EXISTS current_round_id();
+DROP FUNCTION IF EXISTS start_new_round(BOOLEAN);
+DROP FUNCTION IF EXISTS get_voting_open();
+DROP FUNCTION IF EXISTS set_voting_open(BOOLEAN);
+DROP FUNCTION IF EXISTS submit_vote(VARCHAR, INTEGER, INET, TEXT);
+DROP FUNCTION IF EXISTS validate_ticket_code(VARCHAR);
+DROP FUNCTION IF EXISTS get_voting_stats();
+
+CREATE OR REPLACE FUNCTION current_round_id(p_event_id INTEGER DEFAULT 1)
+RETURNS INTEGER
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT id FROM voting_rounds WHERE event_id = p_event_id AND status = 'active';
+$$;
+
+CREATE OR REPLACE FUNCTION start_new_round(purge_previous BOOLEAN DEFAULT TRUE, p_event_id INTEGER DEFAULT 1)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    new_round_id INTEGER;
+BEGIN
+    -- Serialise concurrent resets of the same event only
+    PERFORM pg_advisory_xact_lock(hashtext('voting_rounds'), p_event_id);
+
+    UPDATE voting_rounds
+    SET status = CASE WHEN purge_previous THEN 'purging' ELSE 'archived' END,
+        ended_at = NOW()
+    WHERE event_id = p_event_id AND status = 'active';
+
+    INSERT INTO voting_rounds (event_id, status) VALUES (p_event_id, 'active')
+    RETURNING id INTO new_round_id;
+
+    RETURN new_round_id;
+END;
+$$;
+
+-- Every event starts with an active round
+CREATE OR REPLACE FUNCTION events_start_first_round()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO voting_rounds (event_id, status) VALUES (NEW.id, 'active');
+    RETURN NEW;
+END;
+$$;
+
+CREATE TRIGGER events_first_round_trigger
+    AFTER INSERT ON events
+    FOR EACH ROW EXECUTE FUNCTION events_start_first_round();
+
+CREATE OR REPLACE FUNCTION get_voting_open(p_event_id INTEGER DEFAULT 1)
+RETURNS BOOLEAN AS $$
+DECLARE v BOOLEAN; BEGIN
+  SELECT voting_open INTO v FROM events WHERE id = p_event_id;
+  RETURN COALESCE(v, FALSE);
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION set_voting_open(is_open BOOLEAN, p_event_id INTEGER DEFAULT 1)
+RETURNS VOID AS $$
+BEGIN
+  UPDATE events SET voting_open = is_open, updated_at = NOW() WHERE id = p_event_id;
+END $$ LANGUAGE plpgsql;
+
+-- ---------------------------------------------------------------------
+-- Views: one row set per event, filter with WHERE event_id = ...
+-- (the filter is pushed down through the window/grouping on event_id)
+-- ---------------------------------------------------------------------
+
+CREATE OR REPLACE VIEW voting_results AS
+SELECT
+    c.event_id,
+    c.id,
+    c.name,
+    c.description,
+    c.image_url,
+    rv.vote_count,
+    ROUND(
+        CASE
+            WHEN SUM(rv.vote_count) OVER (PARTITION BY c.event_id) > 0
+            THEN (rv.vote_count::DECIMAL / SUM(rv.vote_count) OVER (PARTITION BY c.event_id) * 100)
+            ELSE 0
+        END, 2
+    ) as percentage
+FROM contestants c
+CROSS JOIN LATERAL (
+    SELECT COUNT(*) AS vote_count
+    FROM votes v
+    WHERE v.contestant_id = c.id
+      AND v.round_id = (SELECT r.id FROM voting_rounds r
+                        WHERE r.event_id = c.event_id AND r.status = 'active')
+) rv
+WHERE c.is_active = TRUE
+ORDER BY c.event_id, rv.vote_count DESC;
+
+CREATE OR REPLACE VIEW ticket_stats AS
+SELECT
+    t.event_id,
+    COUNT(*) as total_tickets,
+    COUNT(CASE WHEN t.used_round_id = r.id THEN 1 END) as used_tickets,
+    COUNT(CASE WHEN t.used_round_id IS DISTINCT FROM r.id THEN 1 END) as unused_tickets,
+    ROUND(
+        CASE
+            WHEN COUNT(*) > 0
+            THEN (COUNT(CASE WHEN t.used_round_id = r.id THEN 1 END)::DECIMAL / COUNT(*) * 100)
+            ELSE 0
+        END, 2
+    ) as usage_percentage
+FROM tickets t
+LEFT JOIN voting_rounds r ON r.event_id = t.event_id AND r.status = 'active'
+GROUP BY t.event_id;
+
+-- ---------------------------------------------------------------------
+-- Functions
+-- ---------------------------------------------------------------------
+
+CREATE OR REPLACE FUNCTION validate_ticket_code(ticket_code_param VARCHAR, p_event_id INTEGER DEFAULT 1)
+RETURNS TABLE(
+    is_valid BOOLEAN,
+    message TEXT,
+    ticket_id INTEGER
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    ticket_record RECORD;
+BEGIN
+    SELECT * INTO ticket_record FROM tickets
+    WHERE event_id = p_event_id AND ticket_code = ticket_code_param;
+
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT FALSE, 'Invalid ticket code'::TEXT, NULL::INTEGER;
+    ELSIF ticket_record.used_round_id = current_round_id(p_event_id) THEN
+        RETURN QUERY SELECT FALSE, 'Ticket already used'::TEXT, ticket_record.id;
+    ELSE
+        RETURN QUERY SELECT TRUE, 'Ticket is valid'::TEXT, ticket_record.id;
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION submit_vote(
+    ticket_code_param VARCHAR,
+    contestant_id_param INTEGER,
+    ip_address_param INET DEFAULT NULL,
+    user_agent_param TEXT DEFAULT NULL,
+    p_event_id INTEGER DEFAULT 1
+)
+RETURNS TABLE(
+    success BOOLEAN,
+    message TEXT,
+    contestant_name VARCHAR,
+    vote_id INTEGER
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    ticket_record RECORD;
+    contestant_record RECORD;
+    new_vote_id INTEGER;
+    active_round INTEGER := current_round_id(p_event_id);
+BEGIN
+    -- Validate ticket
+    SELECT * INTO ticket_record FROM tickets
+    WHERE event_id = p_event_id AND ticket_code = ticket_code_param;
+
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT FALSE, 'Invalid ticket code'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+        RETURN;
+    END IF;
+
+    IF ticket_record.used_round_id = active_round THEN
+        RETURN QUERY SELECT FALSE, 'Ticket already used'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+        RETURN;
+    END IF;
+
+    -- Validate contestant (must belong to the same event)
+    SELECT * INTO contestant_record FROM contestants
+    WHERE id = contestant_id_param AND event_id = p_event_id AND is_active = TRUE;
+
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT FALSE, 'Invalid contestant'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+        RETURN;
+    END IF;
+
+    BEGIN
+        -- Claim the ticket for this round; a concurrent vote on the same
+        -- ticket blocks here and then finds it already claimed
+        UPDATE tickets
+        SET is_used = TRUE, used_at = NOW(), used_round_id = active_round
+        WHERE id = ticket_record.id AND used_round_id IS DISTINCT FROM active_round;
+
+        IF NOT FOUND THEN
+            RETURN QUERY SELECT FALSE, 'Ticket already used'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+            RETURN;
+        END IF;
+
+        INSERT INTO votes (contestant_id, ticket_id, ip_address, user_agent, round_id, event_id)
+        VALUES (contestant_id_param, ticket_record.id, ip_address_param, user_agent_param,
+                active_round, p_event_id)
+        RETURNING id INTO new_vote_id;
+
+        RETURN QUERY SELECT TRUE, 'Vote submitted successfully'::TEXT, contestant_record.name, new_vote_id;
+    EXCEPTION WHEN OTHERS THEN
+        RETURN QUERY SELECT FALSE, 'Failed to submit vote'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+    END;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION get_voting_stats(p_event_id INTEGER DEFAULT 1)
+RETURNS TABLE(
+    total_votes BIGINT,
+    total_tickets BIGINT,
+    used_tickets BIGINT,
+    unused_tickets BIGINT,
+    usage_percentage NUMERIC
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        (SELECT COUNT(*) FROM votes WHERE round_id = current_round_id(p_event_id)) as total_votes,
+        ts.total_tickets,
+        ts.used_tickets,
+        ts.unused_tickets,
+        ts.usage_percentage
+    FROM ticket_stats ts
+    WHERE ts.event_id = p_event_id;
+END;
+$$;
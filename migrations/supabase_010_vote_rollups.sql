@@ -0,0 +1,180 @@
+-- Migration 010: Time-bucketed vote rollups
+-- Requires migration 009.
+--
+-- Vote velocity per contestant and seat section without scanning votes:
+-- vote_rollup_1m and vote_rollup_10m hold vote counts per
+-- (event, round, bucket, contestant, section). A statement-level trigger
+-- on votes folds every insert into both tables with one grouped upsert
+-- each (and subtracts deleted votes), so rollups are exact and current
+-- as soon as the vote commits.
+--
+-- tickets.section_code is derived from the seat code: everything before
+-- the last '.', e.g. 'D13.4' -> 'D13', 'A2.R3.5' -> 'A2.R3'. Codes without
+-- a '.' (generated random codes) have no section and roll up under ''.
+
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS section_code VARCHAR(20)
+    GENERATED ALWAYS AS (
+        CASE WHEN position('.' IN ticket_code) > 0
+             THEN regexp_replace(ticket_code, '\.[^.]*$', '')
+        END
+    ) STORED;
+
+CREATE TABLE IF NOT EXISTS vote_rollup_1m (
+    event_id INTEGER NOT NULL,
+    round_id INTEGER NOT NULL,
+    bucket TIMESTAMPTZ NOT NULL,
+    contestant_id INTEGER NOT NULL,
+    section_code VARCHAR(20) NOT NULL DEFAULT '',
+    votes BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (event_id, round_id, bucket, contestant_id, section_code)
+);
+
+CREATE TABLE IF NOT EXISTS vote_rollup_10m (
+    LIKE vote_rollup_1m INCLUDING ALL
+);
+
+ALTER TABLE vote_rollup_1m ENABLE ROW LEVEL SECURITY;
+ALTER TABLE vote_rollup_10m ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Vote rollups are viewable by everyone"
+ON vote_rollup_1m FOR SELECT
+USING (TRUE);
+
+CREATE POLICY "Vote rollups are viewable by everyone"
+ON vote_rollup_10m FOR SELECT
+USING (TRUE);
+
+-- 10-minute bucket start for a timestamp
+CREATE OR REPLACE FUNCTION bucket_10m(ts TIMESTAMPTZ)
+RETURNS TIMESTAMPTZ
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT to_timestamp(floor(extract(epoch FROM ts) / 600) * 600);
+$$;
+
+CREATE OR REPLACE FUNCTION vote_rollup_trigger_function()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- Sorted so concurrent statements lock rollup rows in the same order
+    INSERT INTO vote_rollup_1m AS r (event_id, round_id, bucket, contestant_id, section_code, votes)
+    SELECT n.event_id, n.round_id, date_trunc('minute', n.created_at), n.contestant_id,
+           COALESCE(t.section_code, ''), COUNT(*)
+    FROM new_rows n
+    LEFT JOIN tickets t ON t.id = n.ticket_id
+    GROUP BY 1, 2, 3, 4, 5
+    ORDER BY 1, 2, 3, 4, 5
+    ON CONFLICT (event_id, round_id, bucket, contestant_id, section_code)
+    DO UPDATE SET votes = r.votes + EXCLUDED.votes;
+
+    INSERT INTO vote_rollup_10m AS r (event_id, round_id, bucket, contestant_id, section_code, votes)
+    SELECT n.event_id, n.round_id, bucket_10m(n.created_at), n.contestant_id,
+           COALESCE(t.section_code, ''), COUNT(*)
+    FROM new_rows n
+    LEFT JOIN tickets t ON t.id = n.ticket_id
+    GROUP BY 1, 2, 3, 4, 5
+    ORDER BY 1, 2, 3, 4, 5
+    ON CONFLICT (event_id, round_id, bucket, contestant_id, section_code)
+    DO UPDATE SET votes = r.votes + EXCLUDED.votes;
+
+    RETURN NULL;
+END;
+$$;
+
+-- Deleted votes (purged rounds, cleared events) are subtracted again.
+-- Run while their tickets still exist so the section can be looked up.
+CREATE OR REPLACE FUNCTION vote_rollup_delete_function()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    WITH gone AS (
+        SELECT o.event_id, o.round_id, o.created_at, o.contestant_id,
+               COALESCE(t.section_code, '') AS section_code
+        FROM old_rows o
+        LEFT JOIN tickets t ON t.id = o.ticket_id
+    ),
+    minute_counts AS (
+        SELECT event_id, round_id, date_trunc('minute', created_at) AS bucket,
+               contestant_id, section_code, COUNT(*) AS n
+        FROM gone GROUP BY 1, 2, 3, 4, 5
+    ),
+    ten_minute_counts AS (
+        SELECT event_id, round_id, bucket_10m(created_at) AS bucket,
+               contestant_id, section_code, COUNT(*) AS n
+        FROM gone GROUP BY 1, 2, 3, 4, 5
+    ),
+    dec_1m AS (
+        UPDATE vote_rollup_1m r SET votes = r.votes - c.n
+        FROM minute_counts c
+        WHERE (r.event_id, r.round_id, r.bucket, r.contestant_id, r.section_code)
+            = (c.event_id, c.round_id, c.bucket, c.contestant_id, c.section_code)
+    )
+    UPDATE vote_rollup_10m r SET votes = r.votes - c.n
+    FROM ten_minute_counts c
+    WHERE (r.event_id, r.round_id, r.bucket, r.contestant_id, r.section_code)
+        = (c.event_id, c.round_id, c.bucket, c.contestant_id, c.section_code);
+
+    -- Buckets left at zero are harmless to sums; rebuild_vote_rollups() drops them
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION vote_rollup_truncate_function()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    TRUNCATE vote_rollup_1m, vote_rollup_10m;
+    RETURN NULL;
+END;
+$$;
+
+-- Recompute both rollups from votes, e.g. after a bulk load that bypassed
+-- triggers (session_replication_role = replica)
+CREATE OR REPLACE FUNCTION rebuild_vote_rollups()
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    buckets BIGINT;
+BEGIN
+    LOCK TABLE vote_rollup_1m, vote_rollup_10m IN EXCLUSIVE MODE;
+    TRUNCATE vote_rollup_1m, vote_rollup_10m;
+
+    INSERT INTO vote_rollup_1m (event_id, round_id, bucket, contestant_id, section_code, votes)
+    SELECT v.event_id, v.round_id, date_trunc('minute', v.created_at), v.contestant_id,
+           COALESCE(t.section_code, ''), COUNT(*)
+    FROM votes v
+    LEFT JOIN tickets t ON t.id = v.ticket_id
+    GROUP BY 1, 2, 3, 4, 5;
+    GET DIAGNOSTICS buckets = ROW_COUNT;
+
+    INSERT INTO vote_rollup_10m (event_id, round_id, bucket, contestant_id, section_code, votes)
+    SELECT event_id, round_id, bucket_10m(bucket), contestant_id, section_code, SUM(votes)
+    FROM vote_rollup_1m
+    GROUP BY 1, 2, 3, 4, 5;
+
+    RETURN buckets;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS votes_rollup_insert ON votes;
+CREATE TRIGGER votes_rollup_insert
+    AFTER INSERT ON votes REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION vote_rollup_trigger_function();
+
+DROP TRIGGER IF EXISTS votes_rollup_delete ON votes;
+CREATE TRIGGER votes_rollup_delete
+    AFTER DELETE ON votes REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION vote_rollup_delete_function();
+
+DROP TRIGGER IF EXISTS votes_rollup_truncate ON votes;
+CREATE TRIGGER votes_rollup_truncate
+    AFTER TRUNCATE ON votes
+    FOR EACH STATEMENT EXECUTE FUNCTION vote_rollup_truncate_function();
+
+-- Backfill from the votes already cast
+SELECT rebuild_vote_rollups();
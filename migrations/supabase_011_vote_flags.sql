@@ -0,0 +1,30 @@
+-- Migration 011: Flagged vote clusters
+-- Requires migration 009.
+--
+-- Written by the fraud detector (scripts/detect_fraud.py, app/fraud.py),
+-- which runs off the request path. One row per suspicious burst: the rule
+-- that fired (kind), what it fired on (cluster_key: an IP, a /24, a
+-- user-agent fingerprint or a seat section + contestant) and the votes
+-- involved. A cluster keeps growing while the burst continues.
+
+CREATE TABLE IF NOT EXISTS vote_flags (
+    id SERIAL PRIMARY KEY,
+    event_id INTEGER NOT NULL REFERENCES events(id),
+    kind VARCHAR(20) NOT NULL CHECK (kind IN ('ip_burst', 'subnet_burst', 'ua_burst', 'seat_lockstep')),
+    cluster_key TEXT NOT NULL,
+    first_vote_at TIMESTAMPTZ NOT NULL,
+    last_vote_at TIMESTAMPTZ NOT NULL,
+    vote_count INTEGER NOT NULL,
+    score NUMERIC(8, 2) NOT NULL,
+    vote_ids INTEGER[] NOT NULL DEFAULT '{}',
+    details JSONB NOT NULL DEFAULT '{}',
+    status VARCHAR(20) NOT NULL DEFAULT 'open' CHECK (status IN ('open', 'dismissed', 'confirmed')),
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE (event_id, kind, cluster_key, first_vote_at)
+);
+
+CREATE INDEX IF NOT EXISTS idx_vote_flags_event_last ON vote_flags(event_id, last_vote_at DESC);
+
+-- Admin-only: no public policy
+ALTER TABLE vote_flags ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,169 @@
+-- Migration 012: Interned user agents
+-- Requires migration 011.
+--
+-- A show's votes come from a few dozen distinct phone browsers, yet every
+-- vote row (and its audit_log copy) carried the full user-agent string.
+-- User agents now live once in user_agents and votes store a small
+-- user_agent_id. Reads that want the string use the votes_detail view,
+-- which has the old votes columns. The web workers keep a local LRU of
+-- user agent -> id (app/models.py UserAgent), so a vote normally passes
+-- the id and never looks the string up.
+--
+-- DROP COLUMN does not rewrite existing partitions; their user_agent bytes
+-- go away as old monthly partitions are detached or rewritten.
+
+CREATE TABLE IF NOT EXISTS user_agents (
+    id SERIAL PRIMARY KEY,
+    user_agent TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Unique by hash: user agents can exceed the btree entry size limit
+CREATE UNIQUE INDEX IF NOT EXISTS idx_user_agents_hash ON user_agents ((md5(user_agent)::UUID));
+
+ALTER TABLE user_agents ENABLE ROW LEVEL SECURITY;
+
+-- Id for a user agent, inserting it the first time it is seen. Strings are
+-- capped at 512 characters so junk headers cannot grow the table unbounded.
+CREATE OR REPLACE FUNCTION intern_user_agent(ua TEXT)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    capped TEXT := left(ua, 512);
+    ua_id INTEGER;
+BEGIN
+    IF capped IS NULL OR capped = '' THEN
+        RETURN NULL;
+    END IF;
+
+    SELECT id INTO ua_id FROM user_agents WHERE md5(user_agent)::UUID = md5(capped)::UUID;
+    IF FOUND THEN
+        RETURN ua_id;
+    END IF;
+
+    INSERT INTO user_agents (user_agent) VALUES (capped)
+    ON CONFLICT ((md5(user_agent)::UUID)) DO NOTHING
+    RETURNING id INTO ua_id;
+
+    IF ua_id IS NULL THEN
+        -- Inserted concurrently by another session
+        SELECT id INTO ua_id FROM user_agents WHERE md5(user_agent)::UUID = md5(capped)::UUID;
+    END IF;
+    RETURN ua_id;
+END;
+$$;
+
+-- ---------------------------------------------------------------------
+-- votes.user_agent -> votes.user_agent_id
+-- ---------------------------------------------------------------------
+
+ALTER TABLE votes ADD COLUMN IF NOT EXISTS user_agent_id INTEGER REFERENCES user_agents(id);
+
+INSERT INTO user_agents (user_agent)
+SELECT DISTINCT left(user_agent, 512) FROM votes WHERE user_agent IS NOT NULL AND user_agent <> ''
+ON CONFLICT ((md5(user_agent)::UUID)) DO NOTHING;
+
+-- Backfill without firing the audit trigger for every historical vote.
+-- Only that trigger is paused: session_replication_role needs a superuser,
+-- which Supabase projects do not have, while the table owner may do this.
+ALTER TABLE votes DISABLE TRIGGER audit_votes_update;
+UPDATE votes v
+SET user_agent_id = u.id
+FROM user_agents u
+WHERE v.user_agent IS NOT NULL AND v.user_agent <> ''
+  AND md5(u.user_agent)::UUID = md5(left(v.user_agent, 512))::UUID;
+ALTER TABLE votes ENABLE TRIGGER audit_votes_update;
+
+ALTER TABLE votes DROP COLUMN IF EXISTS user_agent;
+
+-- The old shape of votes, for exports, reports and ad-hoc queries
+CREATE OR REPLACE VIEW votes_detail AS
+SELECT
+    v.id,
+    v.event_id,
+    v.contestant_id,
+    v.ticket_id,
+    v.ip_address,
+    u.user_agent,
+    v.created_at,
+    v.round_id,
+    v.user_agent_id
+FROM votes v
+LEFT JOIN user_agents u ON u.id = v.user_agent_id;
+
+-- ---------------------------------------------------------------------
+-- submit_vote takes the interned id (or still the string)
+-- ---------------------------------------------------------------------
+
+DROP FUNCTION IF EXISTS submit_vote(VARCHAR, INTEGER, INET, TEXT, INTEGER);
+
+CREATE OR REPLACE FUNCTION submit_vote(
+    ticket_code_param VARCHAR,
+    contestant_id_param INTEGER,
+    ip_address_param INET DEFAULT NULL,
+    user_agent_param TEXT DEFAULT NULL,
+    p_event_id INTEGER DEFAULT 1,
+    user_agent_id_param INTEGER DEFAULT NULL
+)
+RETURNS TABLE(
+    success BOOLEAN,
+    message TEXT,
+    contestant_name VARCHAR,
+    vote_id INTEGER
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    ticket_record RECORD;
+    contestant_record RECORD;
+    new_vote_id INTEGER;
+    active_round INTEGER := current_round_id(p_event_id);
+BEGIN
+    -- Validate ticket
+    SELECT * INTO ticket_record FROM tickets
+    WHERE event_id = p_event_id AND ticket_code = ticket_code_param;
+
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT FALSE, 'Invalid ticket code'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+        RETURN;
+    END IF;
+
+    IF ticket_record.used_round_id = active_round THEN
+        RETURN QUERY SELECT FALSE, 'Ticket already used'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+        RETURN;
+    END IF;
+
+    -- Validate contestant (must belong to the same event)
+    SELECT * INTO contestant_record FROM contestants
+    WHERE id = contestant_id_param AND event_id = p_event_id AND is_active = TRUE;
+
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT FALSE, 'Invalid contestant'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+        RETURN;
+    END IF;
+
+    BEGIN
+        -- Claim the ticket for this round; a concurrent vote on the same
+        -- ticket blocks here and then finds it already claimed
+        UPDATE tickets
+        SET is_used = TRUE, used_at = NOW(), used_round_id = active_round
+        WHERE id = ticket_record.id AND used_round_id IS DISTINCT FROM active_round;
+
+        IF NOT FOUND THEN
+            RETURN QUERY SELECT FALSE, 'Ticket already used'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+            RETURN;
+        END IF;
+
+        INSERT INTO votes (contestant_id, ticket_id, ip_address, user_agent_id, round_id, event_id)
+        VALUES (contestant_id_param, ticket_record.id, ip_address_param,
+                COALESCE(user_agent_id_param, intern_user_agent(user_agent_param)),
+                active_round, p_event_id)
+        RETURNING id INTO new_vote_id;
+
+        RETURN QUERY SELECT TRUE, 'Vote submitted successfully'::TEXT, contestant_record.name, new_vote_id;
+    EXCEPTION WHEN OTHERS THEN
+        RETURN QUERY SELECT FALSE, 'Failed to submit vote'::TEXT, NULL::VARCHAR, NULL::INTEGER;
+    END;
+END;
+$$;
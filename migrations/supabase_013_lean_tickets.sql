@@ -0,0 +1,32 @@
+-- Migration 013: Lean tickets indexes and HOT ticket claims
+-- Requires migration 009.
+--
+-- Claiming a ticket (submit_vote, Ticket.mark_as_used) updates is_used,
+-- used_at and used_round_id. Because is_used was indexed, none of these
+-- updates could be HOT: each one wrote a new heap tuple on another page
+-- plus a new entry in every index on tickets. After this migration no
+-- index covers a column the claim changes, and pages keep free space, so
+-- the new version stays on the same page and no index is touched.
+--
+--   idx_tickets_code  (ticket_code)  every lookup filters on event_id too
+--                                    and uses idx_tickets_event_code
+--   idx_tickets_used  (is_used)      no query filters on it; usage is
+--                                    by used_round_id since migration 008
+--
+-- idx_votes_ticket stays: since migration 007 it is the only index on
+-- votes.ticket_id and backs the foreign key checks when tickets are
+-- deleted.
+--
+-- Measure before/after with scripts/benchmark_ticket_updates.py.
+
+DROP INDEX IF EXISTS idx_tickets_code;
+DROP INDEX IF EXISTS idx_tickets_used;
+
+-- Every ticket is claimed once per round; leave room on each page for the
+-- new row versions until pruning reclaims the old ones
+ALTER TABLE tickets SET (fillfactor = 70);
+
+-- fillfactor only applies to pages written from now on; rewrite the table
+-- so existing tickets get the free space too (brief exclusive lock)
+CLUSTER tickets USING tickets_pkey;
+ANALYZE tickets;
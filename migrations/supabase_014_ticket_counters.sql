@@ -0,0 +1,281 @@
+-- Migration 014: Ticket usage counters
+-- Requires migrations 010 and 013.
+--
+-- ticket_stats counted the whole tickets table on every admin refresh.
+-- Counts are now kept in two small tables, updated by statement-level
+-- triggers on tickets in the same transaction as the insert, claim or
+-- delete, so they are exact as soon as it commits:
+--
+--   ticket_counters        tickets per (event, section)
+--   ticket_usage_counters  tickets whose used_round_id is a round, per
+--                          (round, section); split over a few shards so
+--                          concurrent claims in one section rarely wait
+--                          on the same row
+--
+-- A new round starts with no usage rows, so resetting stays O(1).
+-- ticket_stats keeps its columns and now reads the counters;
+-- ticket_section_stats has the same numbers per seat section.
+-- check_ticket_counters() compares them with tickets and
+-- rebuild_ticket_counters() recomputes them (scripts/check_ticket_counters.py).
+
+CREATE TABLE IF NOT EXISTS ticket_counters (
+    event_id INTEGER NOT NULL REFERENCES events(id),
+    section_code VARCHAR(20) NOT NULL DEFAULT '',
+    total_tickets BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (event_id, section_code)
+);
+
+CREATE TABLE IF NOT EXISTS ticket_usage_counters (
+    round_id INTEGER NOT NULL REFERENCES voting_rounds(id),
+    section_code VARCHAR(20) NOT NULL DEFAULT '',
+    shard SMALLINT NOT NULL DEFAULT 0,
+    used_tickets BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (round_id, section_code, shard)
+);
+
+ALTER TABLE ticket_counters ENABLE ROW LEVEL SECURITY;
+ALTER TABLE ticket_usage_counters ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Ticket counters are viewable by everyone"
+ON ticket_counters FOR SELECT
+USING (TRUE);
+
+CREATE POLICY "Ticket counters are viewable by everyone"
+ON ticket_usage_counters FOR SELECT
+USING (TRUE);
+
+-- Inserted (+1) and deleted (-1) tickets are folded into both counters with
+-- one grouped upsert each, in key order so concurrent statements cannot
+-- deadlock. Claims leave the (event, section) total unchanged and only
+-- move one ticket between rounds.
+CREATE OR REPLACE FUNCTION ticket_counters_insert_function()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    WITH totals AS (
+        INSERT INTO ticket_counters AS c (event_id, section_code, total_tickets)
+        SELECT event_id, COALESCE(section_code, ''), COUNT(*)
+        FROM new_rows
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (event_id, section_code)
+        DO UPDATE SET total_tickets = c.total_tickets + EXCLUDED.total_tickets
+    )
+    INSERT INTO ticket_usage_counters AS u (round_id, section_code, shard, used_tickets)
+    SELECT used_round_id, COALESCE(section_code, ''), id % 8, COUNT(*)
+    FROM new_rows
+    WHERE used_round_id IS NOT NULL
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+    ON CONFLICT (round_id, section_code, shard)
+    DO UPDATE SET used_tickets = u.used_tickets + EXCLUDED.used_tickets;
+
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION ticket_counters_update_function()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    WITH changes AS (
+        SELECT id, event_id, COALESCE(section_code, '') AS section_code, used_round_id, 1 AS n
+        FROM new_rows
+        UNION ALL
+        SELECT id, event_id, COALESCE(section_code, ''), used_round_id, -1
+        FROM old_rows
+    ),
+    totals AS (
+        INSERT INTO ticket_counters AS c (event_id, section_code, total_tickets)
+        SELECT event_id, section_code, SUM(n)
+        FROM changes
+        GROUP BY 1, 2
+        HAVING SUM(n) <> 0
+        ORDER BY 1, 2
+        ON CONFLICT (event_id, section_code)
+        DO UPDATE SET total_tickets = c.total_tickets + EXCLUDED.total_tickets
+    )
+    INSERT INTO ticket_usage_counters AS u (round_id, section_code, shard, used_tickets)
+    SELECT used_round_id, section_code, id % 8, SUM(n)
+    FROM changes
+    WHERE used_round_id IS NOT NULL
+    GROUP BY 1, 2, 3
+    HAVING SUM(n) <> 0
+    ORDER BY 1, 2, 3
+    ON CONFLICT (round_id, section_code, shard)
+    DO UPDATE SET used_tickets = u.used_tickets + EXCLUDED.used_tickets;
+
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION ticket_counters_delete_function()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    WITH totals AS (
+        UPDATE ticket_counters c SET total_tickets = c.total_tickets - g.n
+        FROM (
+            SELECT event_id, COALESCE(section_code, '') AS section_code, COUNT(*) AS n
+            FROM old_rows
+            GROUP BY 1, 2
+        ) g
+        WHERE (c.event_id, c.section_code) = (g.event_id, g.section_code)
+    )
+    UPDATE ticket_usage_counters u SET used_tickets = u.used_tickets - g.n
+    FROM (
+        SELECT used_round_id AS round_id, COALESCE(section_code, '') AS section_code,
+               id % 8 AS shard, COUNT(*) AS n
+        FROM old_rows
+        WHERE used_round_id IS NOT NULL
+        GROUP BY 1, 2, 3
+    ) g
+    WHERE (u.round_id, u.section_code, u.shard) = (g.round_id, g.section_code, g.shard);
+
+    -- Rows left at zero are harmless to sums; rebuild_ticket_counters() drops them
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION ticket_counters_truncate_function()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    TRUNCATE ticket_counters, ticket_usage_counters;
+    RETURN NULL;
+END;
+$$;
+
+-- Counters that disagree with tickets, read in one snapshot so concurrent
+-- claims cannot show up as false mismatches. Empty when all is well.
+CREATE OR REPLACE FUNCTION check_ticket_counters()
+RETURNS TABLE(
+    counter TEXT,
+    scope_id INTEGER,
+    section_code VARCHAR,
+    expected BIGINT,
+    actual BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH expected_totals AS (
+        SELECT event_id, COALESCE(t.section_code, '') AS section_code, COUNT(*) AS n
+        FROM tickets t GROUP BY 1, 2
+    ),
+    expected_used AS (
+        SELECT used_round_id AS round_id, COALESCE(t.section_code, '') AS section_code, COUNT(*) AS n
+        FROM tickets t WHERE used_round_id IS NOT NULL GROUP BY 1, 2
+    ),
+    actual_used AS (
+        SELECT round_id, u.section_code, SUM(used_tickets)::BIGINT AS n
+        FROM ticket_usage_counters u GROUP BY 1, 2
+    )
+    SELECT 'total', COALESCE(e.event_id, c.event_id), COALESCE(e.section_code, c.section_code),
+           COALESCE(e.n, 0), COALESCE(c.total_tickets, 0)
+    FROM expected_totals e
+    FULL JOIN ticket_counters c ON (c.event_id, c.section_code) = (e.event_id, e.section_code)
+    WHERE COALESCE(e.n, 0) <> COALESCE(c.total_tickets, 0)
+    UNION ALL
+    SELECT 'used', COALESCE(e.round_id, a.round_id), COALESCE(e.section_code, a.section_code),
+           COALESCE(e.n, 0), COALESCE(a.n, 0)
+    FROM expected_used e
+    FULL JOIN actual_used a ON (a.round_id, a.section_code) = (e.round_id, e.section_code)
+    WHERE COALESCE(e.n, 0) <> COALESCE(a.n, 0);
+$$;
+
+-- Recompute both counters from tickets, e.g. after a bulk load that
+-- bypassed triggers (session_replication_role = replica). Blocks ticket
+-- writes while it runs; returns the number of (event, section) rows.
+CREATE OR REPLACE FUNCTION rebuild_ticket_counters()
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    sections BIGINT;
+BEGIN
+    LOCK TABLE tickets IN SHARE MODE;
+    LOCK TABLE ticket_counters, ticket_usage_counters IN EXCLUSIVE MODE;
+    TRUNCATE ticket_counters, ticket_usage_counters;
+
+    INSERT INTO ticket_counters (event_id, section_code, total_tickets)
+    SELECT event_id, COALESCE(section_code, ''), COUNT(*)
+    FROM tickets
+    GROUP BY 1, 2;
+    GET DIAGNOSTICS sections = ROW_COUNT;
+
+    INSERT INTO ticket_usage_counters (round_id, section_code, shard, used_tickets)
+    SELECT used_round_id, COALESCE(section_code, ''), id % 8, COUNT(*)
+    FROM tickets
+    WHERE used_round_id IS NOT NULL
+    GROUP BY 1, 2, 3;
+
+    RETURN sections;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS tickets_counters_insert ON tickets;
+CREATE TRIGGER tickets_counters_insert
+    AFTER INSERT ON tickets REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION ticket_counters_insert_function();
+
+DROP TRIGGER IF EXISTS tickets_counters_update ON tickets;
+CREATE TRIGGER tickets_counters_update
+    AFTER UPDATE ON tickets REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION ticket_counters_update_function();
+
+DROP TRIGGER IF EXISTS tickets_counters_delete ON tickets;
+CREATE TRIGGER tickets_counters_delete
+    AFTER DELETE ON tickets REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION ticket_counters_delete_function();
+
+DROP TRIGGER IF EXISTS tickets_counters_truncate ON tickets;
+CREATE TRIGGER tickets_counters_truncate
+    AFTER TRUNCATE ON tickets
+    FOR EACH STATEMENT EXECUTE FUNCTION ticket_counters_truncate_function();
+
+-- ---------------------------------------------------------------------
+-- Views
+-- ---------------------------------------------------------------------
+
+-- Per seat section of the event's active round; section_code is NULL for
+-- tickets without a seat code
+CREATE OR REPLACE VIEW ticket_section_stats AS
+SELECT
+    c.event_id,
+    NULLIF(c.section_code, '') AS section_code,
+    c.total_tickets,
+    COALESCE(u.used_tickets, 0)::BIGINT AS used_tickets,
+    (c.total_tickets - COALESCE(u.used_tickets, 0))::BIGINT AS unused_tickets
+FROM ticket_counters c
+LEFT JOIN voting_rounds r ON r.event_id = c.event_id AND r.status = 'active'
+LEFT JOIN LATERAL (
+    SELECT SUM(uc.used_tickets) AS used_tickets
+    FROM ticket_usage_counters uc
+    WHERE uc.round_id = r.id AND uc.section_code = c.section_code
+) u ON TRUE
+WHERE c.total_tickets <> 0;
+
+-- Same columns as before, so get_voting_stats() and the app are unchanged
+CREATE OR REPLACE VIEW ticket_stats AS
+SELECT
+    s.event_id,
+    SUM(s.total_tickets)::BIGINT as total_tickets,
+    SUM(s.used_tickets)::BIGINT as used_tickets,
+    SUM(s.unused_tickets)::BIGINT as unused_tickets,
+    ROUND(
+        CASE
+            WHEN SUM(s.total_tickets) > 0
+            THEN (SUM(s.used_tickets)::DECIMAL / SUM(s.total_tickets) * 100)
+            ELSE 0
+        END, 2
+    ) as usage_percentage
+FROM ticket_section_stats s
+GROUP BY s.event_id;
+
+-- Backfill from the tickets already issued
+SELECT rebuild_ticket_counters();
@@ -0,0 +1,69 @@
+-- Migration 015: Background admin jobs
+-- Requires migration 009.
+--
+-- Generating, clearing and resetting run as jobs (app/jobs.py) instead of
+-- inside the admin request. The endpoint inserts a queued row and returns
+-- its id; a runner thread in a web process (or scripts/run_jobs.py) claims
+-- it, works in batches, records progress here and stops between batches
+-- when cancel_requested is set. Any web worker can answer a progress poll
+-- because the state lives in the database.
+
+CREATE TABLE IF NOT EXISTS admin_jobs (
+    id SERIAL PRIMARY KEY,
+    event_id INTEGER NOT NULL REFERENCES events(id),
+    kind VARCHAR(30) NOT NULL,
+    params JSONB NOT NULL DEFAULT '{}',
+    status VARCHAR(20) NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'succeeded', 'failed', 'cancelled')),
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    progress BIGINT NOT NULL DEFAULT 0,
+    total BIGINT,
+    message TEXT,
+    result JSONB,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    heartbeat_at TIMESTAMPTZ
+);
+
+-- One unfinished job per event: they all rewrite the event's tickets or round
+CREATE UNIQUE INDEX IF NOT EXISTS idx_admin_jobs_event_active
+    ON admin_jobs(event_id) WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS idx_admin_jobs_queued ON admin_jobs(id) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_admin_jobs_event_created ON admin_jobs(event_id, created_at DESC);
+
+-- Admin-only: no public policy
+ALTER TABLE admin_jobs ENABLE ROW LEVEL SECURITY;
+
+-- Next queued job, marked running, unless max_running jobs already run
+-- (across all runners). Running jobs whose runner stopped sending
+-- progress for stale_after are failed first so they free their slot.
+CREATE OR REPLACE FUNCTION claim_admin_job(max_running INTEGER DEFAULT 1, stale_after INTERVAL DEFAULT '5 minutes')
+RETURNS SETOF admin_jobs
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- Runners claim one at a time so the running count below is exact
+    PERFORM pg_advisory_xact_lock(hashtext('admin_jobs'));
+
+    UPDATE admin_jobs
+    SET status = 'failed', message = 'Runner stopped responding', finished_at = NOW()
+    WHERE status = 'running' AND heartbeat_at < NOW() - stale_after;
+
+    IF (SELECT COUNT(*) FROM admin_jobs WHERE status = 'running') >= max_running THEN
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    UPDATE admin_jobs
+    SET status = 'running', started_at = NOW(), heartbeat_at = NOW()
+    WHERE id = (
+        SELECT id FROM admin_jobs
+        WHERE status = 'queued'
+        ORDER BY id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *;
+END;
+$$;
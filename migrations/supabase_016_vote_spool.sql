@@ -0,0 +1,72 @@
+-- Migration 016: Replaying votes from the local vote spool
+-- Requires migration 012.
+--
+-- When the database cannot be reached, web workers append votes to a
+-- local SQLite spool (app/spool.py) and a replayer feeds them back here in
+-- batches once it is reachable again. Each spooled vote is identified by
+-- the spool's UUID and its sequence number; vote_spool_replays records the
+-- outcome of every one in the same transaction as the vote itself, so a
+-- batch that is retried (the replayer died after the commit) returns the
+-- recorded outcomes instead of voting twice or reporting the ticket as
+-- already used by itself.
+
+CREATE TABLE IF NOT EXISTS vote_spool_replays (
+    spool_id UUID NOT NULL,
+    seq BIGINT NOT NULL,
+    success BOOLEAN NOT NULL,
+    message TEXT,
+    vote_id INTEGER,
+    spooled_at TIMESTAMPTZ,
+    replayed_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (spool_id, seq)
+);
+
+-- Admin-only: no public policy
+ALTER TABLE vote_spool_replays ENABLE ROW LEVEL SECURITY;
+
+-- Apply spooled votes strictly in spool order: when two spooled votes use
+-- the same ticket the earlier one wins and the later one gets 'Ticket
+-- already used', exactly as if they had arrived live.
+CREATE OR REPLACE FUNCTION replay_spooled_votes(
+    p_spool_id UUID,
+    seqs BIGINT[],
+    ticket_codes VARCHAR[],
+    contestant_ids INTEGER[],
+    ip_addresses INET[],
+    user_agents TEXT[],
+    event_ids INTEGER[],
+    spooled_ats TIMESTAMPTZ[]
+)
+RETURNS TABLE(
+    seq BIGINT,
+    success BOOLEAN,
+    message TEXT,
+    vote_id INTEGER
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    i INTEGER;
+    done RECORD;
+    outcome RECORD;
+BEGIN
+    FOR i IN 1 .. COALESCE(array_length(seqs, 1), 0) LOOP
+        SELECT r.success, r.message, r.vote_id INTO done
+        FROM vote_spool_replays r
+        WHERE r.spool_id = p_spool_id AND r.seq = seqs[i];
+
+        IF FOUND THEN
+            RETURN QUERY SELECT seqs[i], done.success, done.message, done.vote_id;
+            CONTINUE;
+        END IF;
+
+        SELECT * INTO outcome
+        FROM submit_vote(ticket_codes[i], contestant_ids[i], ip_addresses[i], user_agents[i], event_ids[i]);
+
+        INSERT INTO vote_spool_replays (spool_id, seq, success, message, vote_id, spooled_at)
+        VALUES (p_spool_id, seqs[i], outcome.success, outcome.message, outcome.vote_id, spooled_ats[i]);
+
+        RETURN QUERY SELECT seqs[i], outcome.success, outcome.message, outcome.vote_id;
+    END LOOP;
+END;
+$$;
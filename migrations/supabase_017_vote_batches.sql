@@ -0,0 +1,91 @@
+-- Migration 017: Batch vote entry (kiosks, keyed-in paper ballots)
+-- Requires migration 012.
+--
+-- POST /api/admin/votes/batch and scripts/submit_vote_batch.py COPY the
+-- ballots into a temporary vote_batch table and apply them all with
+-- apply_vote_batch(), one set-based statement, instead of one submit_vote()
+-- call and transaction per ballot. The outcome of every line is what
+-- submit_vote() would have answered had the ballots arrived one by one in
+-- line order:
+--
+--   * 'Invalid ticket code'  no such ticket in the event
+--   * 'Ticket already used'  used in the active round, by an earlier line
+--                            of the batch, or by a vote that won the race
+--   * 'Invalid contestant'   unknown or inactive contestant of the event
+--
+-- The caller creates the staging table in the same transaction:
+--
+--   CREATE TEMP TABLE vote_batch (
+--       line INTEGER PRIMARY KEY,
+--       ticket_code VARCHAR(50) NOT NULL,
+--       contestant_id INTEGER NOT NULL
+--   ) ON COMMIT DROP;
+
+CREATE OR REPLACE FUNCTION apply_vote_batch(
+    p_event_id INTEGER,
+    ip_address_param INET DEFAULT NULL,
+    user_agent_id_param INTEGER DEFAULT NULL
+)
+RETURNS TABLE(
+    line INTEGER,
+    success BOOLEAN,
+    message TEXT,
+    vote_id INTEGER
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    active_round INTEGER := current_round_id(p_event_id);
+BEGIN
+    RETURN QUERY
+    WITH staged AS (
+        SELECT
+            b.line,
+            b.contestant_id,
+            t.id AS ticket_id,
+            t.used_round_id IS NOT DISTINCT FROM active_round AS already_used,
+            c.id IS NOT NULL AS contestant_ok,
+            -- Only lines that pass the contestant check would claim the
+            -- ticket, so the first of those wins it
+            row_number() OVER (PARTITION BY t.id, c.id IS NOT NULL ORDER BY b.line) AS nth
+        FROM vote_batch b
+        LEFT JOIN tickets t ON t.event_id = p_event_id AND t.ticket_code = b.ticket_code
+        LEFT JOIN contestants c ON c.id = b.contestant_id AND c.event_id = p_event_id AND c.is_active = TRUE
+    ),
+    candidates AS (
+        SELECT s.line, s.ticket_id, s.contestant_id
+        FROM staged s
+        WHERE s.ticket_id IS NOT NULL AND NOT s.already_used AND s.contestant_ok AND s.nth = 1
+    ),
+    claimed AS (
+        -- Same claim as submit_vote(): a ticket claimed concurrently is
+        -- re-checked after the lock and skipped
+        UPDATE tickets t
+        SET is_used = TRUE, used_at = NOW(), used_round_id = active_round
+        FROM candidates c
+        WHERE t.id = c.ticket_id AND t.used_round_id IS DISTINCT FROM active_round
+        RETURNING t.id
+    ),
+    inserted AS (
+        INSERT INTO votes (contestant_id, ticket_id, ip_address, user_agent_id, round_id, event_id)
+        SELECT c.contestant_id, c.ticket_id, ip_address_param, user_agent_id_param, active_round, p_event_id
+        FROM candidates c
+        JOIN claimed ON claimed.id = c.ticket_id
+        RETURNING votes.id, votes.ticket_id
+    )
+    SELECT
+        s.line,
+        i.id IS NOT NULL,
+        CASE
+            WHEN s.ticket_id IS NULL THEN 'Invalid ticket code'
+            WHEN s.already_used THEN 'Ticket already used'
+            WHEN NOT s.contestant_ok THEN 'Invalid contestant'
+            WHEN i.id IS NULL THEN 'Ticket already used'
+            ELSE 'Vote submitted successfully'
+        END,
+        i.id
+    FROM staged s
+    LEFT JOIN inserted i ON i.ticket_id = s.ticket_id AND s.contestant_ok AND s.nth = 1
+    ORDER BY s.line;
+END;
+$$;
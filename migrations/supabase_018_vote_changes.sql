@@ -0,0 +1,131 @@
+-- Migration 018: Ordered change feed of votes
+-- Requires migration 010. Needs PostgreSQL 13+ (xid8).
+--
+-- GET /api/votes/changes serves vote_changes to downstream consumers
+-- (broadcast graphics, the data warehouse) after a cursor. Statement-level
+-- triggers on votes append one row per inserted vote (+1) and one row per
+-- (event, round, contestant) for each deleting statement (-n), so a purge
+-- of a finished round does not flood the feed.
+--
+-- Ordering by id alone would lose changes: ids come from a sequence before
+-- commit, so a transaction holding a lower id can commit after a higher
+-- one has already been served. Rows therefore carry the id of the writing
+-- transaction (txid) and the feed is ordered by (txid, id), serving only
+-- rows whose txid is below the xmin of the reading snapshot; every
+-- transaction below xmin has finished, and anything it wrote is visible,
+-- while every transaction still running has txid >= xmin and will sort
+-- after the cursor.
+
+CREATE TABLE IF NOT EXISTS vote_changes (
+    id BIGSERIAL PRIMARY KEY,
+    txid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+    op VARCHAR(10) NOT NULL CHECK (op IN ('insert', 'delete', 'truncate')),
+    event_id INTEGER NOT NULL,
+    round_id INTEGER,
+    contestant_id INTEGER,
+    vote_id INTEGER,
+    delta INTEGER NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_vote_changes_feed ON vote_changes(event_id, txid, id);
+
+-- Served through the API only
+ALTER TABLE vote_changes ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION vote_changes_insert_function()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO vote_changes (op, event_id, round_id, contestant_id, vote_id, delta, created_at)
+    SELECT 'insert', n.event_id, n.round_id, n.contestant_id, n.id, 1, n.created_at
+    FROM new_rows n
+    ORDER BY n.id;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION vote_changes_delete_function()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO vote_changes (op, event_id, round_id, contestant_id, delta)
+    SELECT 'delete', o.event_id, o.round_id, o.contestant_id, -COUNT(*)
+    FROM old_rows o
+    GROUP BY 2, 3, 4
+    ORDER BY 2, 3, 4;
+    RETURN NULL;
+END;
+$$;
+
+-- Consumers drop everything they derived for the event
+CREATE OR REPLACE FUNCTION vote_changes_truncate_function()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO vote_changes (op, event_id, delta)
+    SELECT 'truncate', e.id, 0 FROM events e ORDER BY e.id;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS votes_changes_insert ON votes;
+CREATE TRIGGER votes_changes_insert
+    AFTER INSERT ON votes REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION vote_changes_insert_function();
+
+DROP TRIGGER IF EXISTS votes_changes_delete ON votes;
+CREATE TRIGGER votes_changes_delete
+    AFTER DELETE ON votes REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION vote_changes_delete_function();
+
+DROP TRIGGER IF EXISTS votes_changes_truncate ON votes;
+CREATE TRIGGER votes_changes_truncate
+    AFTER TRUNCATE ON votes
+    FOR EACH STATEMENT EXECUTE FUNCTION vote_changes_truncate_function();
+
+-- Delete changes older than keep_for, in batches; returns rows deleted.
+-- The highest (txid, id) deleted is kept in app_settings as
+-- vote_changes_pruned_to: a consumer whose cursor is below it may have
+-- missed changes and is told to resync from /api/results.
+CREATE OR REPLACE FUNCTION prune_vote_changes(keep_for INTERVAL, batch_size INTEGER DEFAULT 10000)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    deleted BIGINT := 0;
+    n BIGINT;
+    last_txid XID8;
+    last_id BIGINT;
+BEGIN
+    LOOP
+        WITH gone AS (
+            DELETE FROM vote_changes
+            WHERE id IN (SELECT id FROM vote_changes WHERE created_at < NOW() - keep_for LIMIT batch_size)
+            RETURNING txid, id
+        ),
+        counted AS (
+            SELECT COUNT(*) AS n FROM gone
+        )
+        SELECT c.n, g.txid, g.id INTO n, last_txid, last_id
+        FROM counted c
+        LEFT JOIN LATERAL (SELECT txid, id FROM gone ORDER BY txid DESC, id DESC LIMIT 1) g ON TRUE;
+
+        IF n > 0 THEN
+            INSERT INTO app_settings (key, value, updated_at)
+            VALUES ('vote_changes_pruned_to', last_txid || '.' || last_id, NOW())
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = NOW()
+            WHERE split_part(app_settings.value, '.', 1)::XID8 < last_txid
+               OR (split_part(app_settings.value, '.', 1)::XID8 = last_txid
+                   AND split_part(app_settings.value, '.', 2)::BIGINT < last_id);
+        END IF;
+
+        deleted := deleted + n;
+        EXIT WHEN n < batch_size;
+    END LOOP;
+    RETURN deleted;
+END;
+$$;
@@ -0,0 +1,37 @@
+-- Migration 019: Frozen final results
+-- Requires migration 009.
+--
+-- After the show, POST /api/admin/results/freeze computes the event's
+-- results once and stores them as a numbered artifact, the exact JSON
+-- body /api/results then serves. events.frozen_results_version points at
+-- the artifact in use; web workers load it once into memory (app/freeze.py)
+-- and stop querying voting_results for the event. Unfreezing sets it back
+-- to NULL; old artifacts are kept as the record of what was published.
+--
+-- Opening voting again always unfreezes, so frozen results can never hide
+-- new votes.
+
+CREATE TABLE IF NOT EXISTS results_artifacts (
+    event_id INTEGER NOT NULL REFERENCES events(id) ON DELETE CASCADE,
+    version INTEGER NOT NULL,
+    round_id INTEGER,
+    body TEXT NOT NULL,
+    sha256 CHAR(64) NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (event_id, version)
+);
+
+-- Served through the API only
+ALTER TABLE results_artifacts ENABLE ROW LEVEL SECURITY;
+
+ALTER TABLE events ADD COLUMN IF NOT EXISTS frozen_results_version INTEGER NULL;
+
+CREATE OR REPLACE FUNCTION set_voting_open(is_open BOOLEAN, p_event_id INTEGER DEFAULT 1)
+RETURNS VOID AS $$
+BEGIN
+  UPDATE events
+  SET voting_open = is_open,
+      frozen_results_version = CASE WHEN is_open THEN NULL ELSE frozen_results_version END,
+      updated_at = NOW()
+  WHERE id = p_event_id;
+END $$ LANGUAGE plpgsql;
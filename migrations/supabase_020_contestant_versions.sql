@@ -0,0 +1,76 @@
+-- Migration 020: Contestant catalogue versions
+-- Requires migration 009.
+--
+-- Web workers keep each event's active contestants in memory
+-- (app/catalog.py) and only check contestant_versions.version every
+-- EVENT_CACHE_TTL seconds; the catalogue is reloaded when it moved.
+-- Statement-level triggers bump the version of every event a statement on
+-- contestants touched, so bulk loads (scripts/add_contestants.py) bump it
+-- once. The counter lives in its own table: bumping it must not rewrite
+-- events rows, whose updated_at tells when voting was closed.
+
+CREATE TABLE IF NOT EXISTS contestant_versions (
+    event_id INTEGER PRIMARY KEY REFERENCES events(id) ON DELETE CASCADE,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Served through the API only
+ALTER TABLE contestant_versions ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION bump_contestant_versions(event_ids INTEGER[])
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    INSERT INTO contestant_versions (event_id, version, updated_at)
+    SELECT DISTINCT e, 1, NOW() FROM unnest(event_ids) AS e
+    WHERE e IS NOT NULL
+    ORDER BY e
+    ON CONFLICT (event_id) DO UPDATE
+    SET version = contestant_versions.version + 1, updated_at = NOW();
+$$;
+
+-- Transition tables only exist for the operation that fired, so each
+-- branch references just its own
+CREATE OR REPLACE FUNCTION contestant_versions_function()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_contestant_versions(ARRAY(SELECT event_id FROM new_rows));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM bump_contestant_versions(ARRAY(SELECT event_id FROM new_rows
+                                               UNION SELECT event_id FROM old_rows));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM bump_contestant_versions(ARRAY(SELECT event_id FROM old_rows));
+    ELSE
+        PERFORM bump_contestant_versions(ARRAY(SELECT id FROM events));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS contestants_version_insert ON contestants;
+CREATE TRIGGER contestants_version_insert
+    AFTER INSERT ON contestants REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION contestant_versions_function();
+
+DROP TRIGGER IF EXISTS contestants_version_update ON contestants;
+CREATE TRIGGER contestants_version_update
+    AFTER UPDATE ON contestants REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION contestant_versions_function();
+
+DROP TRIGGER IF EXISTS contestants_version_delete ON contestants;
+CREATE TRIGGER contestants_version_delete
+    AFTER DELETE ON contestants REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION contestant_versions_function();
+
+DROP TRIGGER IF EXISTS contestants_version_truncate ON contestants;
+CREATE TRIGGER contestants_version_truncate
+    AFTER TRUNCATE ON contestants
+    FOR EACH STATEMENT EXECUTE FUNCTION contestant_versions_function();
+
+INSERT INTO contestant_versions (event_id)
+SELECT id FROM events
+ON CONFLICT (event_id) DO NOTHING;
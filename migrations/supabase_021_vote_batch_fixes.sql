@@ -0,0 +1,115 @@
+-- Migration 021: Batch vote entry fixes
+-- Requires migration 017.
+--
+-- Every ballot of a batch is inserted with the IP of the desk that sent
+-- it, so the per-IP rate limit of migration 003 (10 votes per hour) failed
+-- the 11th ballot and rolled back the whole batch. apply_vote_batch() now
+-- sets the transaction-local voting.batch_entry flag around its insert and
+-- check_rate_limit() lets those rows through; the flag is cleared again
+-- before the function returns.
+--
+-- Lines are also judged in submit_vote()'s order again: the ticket first,
+-- so a line reusing a ticket an earlier line claimed is 'Ticket already
+-- used' even when its contestant is invalid, and only then the contestant.
+-- A ticket counts as used only in the active round (used_round_id =
+-- active round, as in submit_vote), not when both are NULL.
+
+CREATE OR REPLACE FUNCTION check_rate_limit()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    vote_count INTEGER;
+BEGIN
+    -- Batch entry (apply_vote_batch) is an admin action, not one voter
+    IF current_setting('voting.batch_entry', TRUE) = 'on' THEN
+        RETURN NEW;
+    END IF;
+
+    -- Check votes from same IP in last hour
+    SELECT COUNT(*) INTO vote_count
+    FROM votes
+    WHERE ip_address = NEW.ip_address
+    AND created_at > NOW() - INTERVAL '1 hour';
+
+    IF vote_count >= 10 THEN
+        RAISE EXCEPTION 'Rate limit exceeded: too many votes from this IP address';
+    END IF;
+
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION apply_vote_batch(
+    p_event_id INTEGER,
+    ip_address_param INET DEFAULT NULL,
+    user_agent_id_param INTEGER DEFAULT NULL
+)
+RETURNS TABLE(
+    line INTEGER,
+    success BOOLEAN,
+    message TEXT,
+    vote_id INTEGER
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    active_round INTEGER := current_round_id(p_event_id);
+BEGIN
+    PERFORM set_config('voting.batch_entry', 'on', TRUE);
+
+    RETURN QUERY
+    WITH staged AS (
+        SELECT
+            b.line,
+            b.contestant_id,
+            t.id AS ticket_id,
+            COALESCE(t.used_round_id = active_round, FALSE) AS already_used,
+            c.id IS NOT NULL AS contestant_ok,
+            -- Only lines that pass the contestant check claim the ticket,
+            -- so the first of those wins it and every later line finds it used
+            MIN(b.line) FILTER (WHERE c.id IS NOT NULL) OVER (PARTITION BY t.id) AS claiming_line
+        FROM vote_batch b
+        LEFT JOIN tickets t ON t.event_id = p_event_id AND t.ticket_code = b.ticket_code
+        LEFT JOIN contestants c ON c.id = b.contestant_id AND c.event_id = p_event_id AND c.is_active = TRUE
+    ),
+    candidates AS (
+        SELECT s.line, s.ticket_id, s.contestant_id
+        FROM staged s
+        WHERE s.ticket_id IS NOT NULL AND NOT s.already_used AND s.line = s.claiming_line
+    ),
+    claimed AS (
+        -- Same claim as submit_vote(): a ticket claimed concurrently is
+        -- re-checked after the lock and skipped
+        UPDATE tickets t
+        SET is_used = TRUE, used_at = NOW(), used_round_id = active_round
+        FROM candidates c
+        WHERE t.id = c.ticket_id AND t.used_round_id IS DISTINCT FROM active_round
+        RETURNING t.id
+    ),
+    inserted AS (
+        INSERT INTO votes (contestant_id, ticket_id, ip_address, user_agent_id, round_id, event_id)
+        SELECT c.contestant_id, c.ticket_id, ip_address_param, user_agent_id_param, active_round, p_event_id
+        FROM candidates c
+        JOIN claimed ON claimed.id = c.ticket_id
+        RETURNING votes.id, votes.ticket_id
+    )
+    SELECT
+        s.line,
+        i.id IS NOT NULL,
+        CASE
+            WHEN s.ticket_id IS NULL THEN 'Invalid ticket code'
+            WHEN s.already_used THEN 'Ticket already used'
+            WHEN s.claiming_line < s.line THEN 'Ticket already used'
+            WHEN NOT s.contestant_ok THEN 'Invalid contestant'
+            WHEN i.id IS NULL THEN 'Ticket already used'
+            ELSE 'Vote submitted successfully'
+        END,
+        i.id
+    FROM staged s
+    LEFT JOIN inserted i ON i.ticket_id = s.ticket_id AND s.line = s.claiming_line
+    ORDER BY s.line;
+
+    PERFORM set_config('voting.batch_entry', 'off', TRUE);
+END;
+$$;
@@ -0,0 +1,128 @@
+-- Migration 022: Seat section on the vote
+-- Requires migration 010.
+--
+-- vote_rollup_delete_function() looked up the section of deleted votes
+-- in tickets. Votes removed by the ON DELETE CASCADE of their ticket
+-- (deleted events, cleared ticket batches) are deleted after the ticket
+-- row is gone, so they were subtracted from the '' section instead of
+-- their own. Votes now carry their section_code, copied from the ticket
+-- when the vote is inserted, and both rollup triggers read it from there.
+
+ALTER TABLE votes ADD COLUMN IF NOT EXISTS section_code VARCHAR(20);
+
+CREATE OR REPLACE FUNCTION vote_section_function()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.section_code IS NULL THEN
+        SELECT t.section_code INTO NEW.section_code FROM tickets t WHERE t.id = NEW.ticket_id;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION vote_rollup_trigger_function()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- Sorted so concurrent statements lock rollup rows in the same order
+    INSERT INTO vote_rollup_1m AS r (event_id, round_id, bucket, contestant_id, section_code, votes)
+    SELECT n.event_id, n.round_id, date_trunc('minute', n.created_at), n.contestant_id,
+           COALESCE(n.section_code, ''), COUNT(*)
+    FROM new_rows n
+    GROUP BY 1, 2, 3, 4, 5
+    ORDER BY 1, 2, 3, 4, 5
+    ON CONFLICT (event_id, round_id, bucket, contestant_id, section_code)
+    DO UPDATE SET votes = r.votes + EXCLUDED.votes;
+
+    INSERT INTO vote_rollup_10m AS r (event_id, round_id, bucket, contestant_id, section_code, votes)
+    SELECT n.event_id, n.round_id, bucket_10m(n.created_at), n.contestant_id,
+           COALESCE(n.section_code, ''), COUNT(*)
+    FROM new_rows n
+    GROUP BY 1, 2, 3, 4, 5
+    ORDER BY 1, 2, 3, 4, 5
+    ON CONFLICT (event_id, round_id, bucket, contestant_id, section_code)
+    DO UPDATE SET votes = r.votes + EXCLUDED.votes;
+
+    RETURN NULL;
+END;
+$$;
+
+-- Votes inserted with triggers off (bulk loads) have no section_code yet;
+-- their ticket, when it still exists, supplies it as before. Deleted votes
+-- are folded in as negative counts with the same sorted upsert as inserts,
+-- so deletes and inserts lock rollup rows in the same order.
+CREATE OR REPLACE FUNCTION vote_rollup_delete_function()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    WITH gone AS (
+        SELECT o.event_id, o.round_id, o.created_at, o.contestant_id,
+               COALESCE(o.section_code, t.section_code, '') AS section_code
+        FROM old_rows o
+        LEFT JOIN tickets t ON t.id = o.ticket_id AND o.section_code IS NULL
+    ),
+    dec_1m AS (
+        INSERT INTO vote_rollup_1m AS r (event_id, round_id, bucket, contestant_id, section_code, votes)
+        SELECT event_id, round_id, date_trunc('minute', created_at), contestant_id, section_code, -COUNT(*)
+        FROM gone
+        GROUP BY 1, 2, 3, 4, 5
+        ORDER BY 1, 2, 3, 4, 5
+        ON CONFLICT (event_id, round_id, bucket, contestant_id, section_code)
+        DO UPDATE SET votes = r.votes + EXCLUDED.votes
+    )
+    INSERT INTO vote_rollup_10m AS r (event_id, round_id, bucket, contestant_id, section_code, votes)
+    SELECT event_id, round_id, bucket_10m(created_at), contestant_id, section_code, -COUNT(*)
+    FROM gone
+    GROUP BY 1, 2, 3, 4, 5
+    ORDER BY 1, 2, 3, 4, 5
+    ON CONFLICT (event_id, round_id, bucket, contestant_id, section_code)
+    DO UPDATE SET votes = r.votes + EXCLUDED.votes;
+
+    -- Buckets left at zero are harmless to sums; rebuild_vote_rollups() drops them
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION rebuild_vote_rollups()
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    buckets BIGINT;
+BEGIN
+    LOCK TABLE vote_rollup_1m, vote_rollup_10m IN EXCLUSIVE MODE;
+    TRUNCATE vote_rollup_1m, vote_rollup_10m;
+
+    INSERT INTO vote_rollup_1m (event_id, round_id, bucket, contestant_id, section_code, votes)
+    SELECT v.event_id, v.round_id, date_trunc('minute', v.created_at), v.contestant_id,
+           COALESCE(v.section_code, t.section_code, ''), COUNT(*)
+    FROM votes v
+    LEFT JOIN tickets t ON t.id = v.ticket_id AND v.section_code IS NULL
+    GROUP BY 1, 2, 3, 4, 5;
+    GET DIAGNOSTICS buckets = ROW_COUNT;
+
+    INSERT INTO vote_rollup_10m (event_id, round_id, bucket, contestant_id, section_code, votes)
+    SELECT event_id, round_id, bucket_10m(bucket), contestant_id, section_code, SUM(votes)
+    FROM vote_rollup_1m
+    GROUP BY 1, 2, 3, 4, 5;
+
+    RETURN buckets;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS votes_section ON votes;
+CREATE TRIGGER votes_section
+    BEFORE INSERT ON votes
+    FOR EACH ROW EXECUTE FUNCTION vote_section_function();
+
+-- Backfill the votes already cast, without an audit entry for each
+ALTER TABLE votes DISABLE TRIGGER audit_votes_update;
+UPDATE votes v
+SET section_code = t.section_code
+FROM tickets t
+WHERE t.id = v.ticket_id AND t.section_code IS NOT NULL AND v.section_code IS NULL;
+ALTER TABLE votes ENABLE TRIGGER audit_votes_update;
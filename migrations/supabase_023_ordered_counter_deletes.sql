@@ -0,0 +1,38 @@
+-- Migration 023: Ordered ticket counter deletes
+-- Requires migration 014.
+--
+-- ticket_counters_delete_function() subtracted deleted tickets with
+-- UPDATE ... FROM (grouped counts), which locks counter rows in whatever
+-- order the join produces. Two deletes touching the same sections (or a
+-- delete and a claim) could take them in opposite orders and deadlock.
+-- It now folds the deletions in as negative counts with the same sorted
+-- upsert the insert and update triggers use, so every writer locks
+-- counter rows in key order.
+
+CREATE OR REPLACE FUNCTION ticket_counters_delete_function()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    WITH totals AS (
+        INSERT INTO ticket_counters AS c (event_id, section_code, total_tickets)
+        SELECT event_id, COALESCE(section_code, ''), -COUNT(*)
+        FROM old_rows
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (event_id, section_code)
+        DO UPDATE SET total_tickets = c.total_tickets + EXCLUDED.total_tickets
+    )
+    INSERT INTO ticket_usage_counters AS u (round_id, section_code, shard, used_tickets)
+    SELECT used_round_id, COALESCE(section_code, ''), id % 8, -COUNT(*)
+    FROM old_rows
+    WHERE used_round_id IS NOT NULL
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+    ON CONFLICT (round_id, section_code, shard)
+    DO UPDATE SET used_tickets = u.used_tickets + EXCLUDED.used_tickets;
+
+    -- Rows left at zero are harmless to sums; rebuild_ticket_counters() drops them
+    RETURN NULL;
+END;
+$$;
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Apply one or more migration files to the database
+
+Each file is sent as a single batch in one transaction, so function
+bodies containing semicolons ($$ ... $$) are kept intact.
+
+Usage:
+    python scripts/apply_migration.py migrations/supabase_006_statement_audit.sql
+"""
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import db_adapter
+
+def apply_migration(file_path):
+    """Apply a single migration file"""
+    print(f"📄 Applying {os.path.basename(file_path)}...")
+    with open(file_path, 'r', encoding='utf-8') as f:
+        sql = f.read()
+
+    try:
+        db_adapter.execute_query(sql)
+        print(f"✅ {os.path.basename(file_path)} applied")
+        return True
+    except Exception as e:
+        print(f"❌ Error applying {os.path.basename(file_path)}: {e}")
+        return False
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python scripts/apply_migration.py <migration.sql> [...]")
+        return 2
+
+    for file_path in sys.argv[1:]:
+        if not apply_migration(file_path):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
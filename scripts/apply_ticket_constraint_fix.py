@@ -40,7 +40,7 @@ def apply_constraint_fix():
         try:
             # Try to insert a test ticket
             db_adapter.execute_query(
-                "INSERT INTO tickets (ticket_code, is_used) VALUES ('TEST.1', FALSE) ON CONFLICT (ticket_code) DO NOTHING"
+                "INSERT INTO tickets (ticket_code, is_used) VALUES ('TEST.1', FALSE) ON CONFLICT (event_id, ticket_code) DO NOTHING"
             )
             print("   ✅ Constraint test passed")
             
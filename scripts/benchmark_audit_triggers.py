@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-vote cost of the audit triggers
+
+Runs N submit_vote() calls under each audit variant and reports time and
+WAL bytes per vote:
+
+  row        legacy row-level audit_trigger_function (migration 003)
+  statement  statement-level triggers, synchronous (migration 006)
+  async      statement-level triggers writing to the unlogged staging table
+
+Everything happens inside one transaction per variant that is rolled
+back, so the database is left untouched. Requires migration 006 and a
+local/staging Postgres.
+
+Usage:
+    python scripts/benchmark_audit_triggers.py --votes 2000
+"""
+
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config
+
+AUDITED_TABLES = ('contestants', 'tickets', 'votes')
+
+ROW_LEVEL_SETUP = [
+    f"DROP TRIGGER IF EXISTS audit_{t}_{op} ON {t}" for t in AUDITED_TABLES for op in ('insert', 'update', 'delete')
+] + [
+    f"CREATE TRIGGER audit_{t}_trigger AFTER INSERT OR UPDATE OR DELETE ON {t} "
+    f"FOR EACH ROW EXECUTE FUNCTION audit_trigger_function()" for t in AUDITED_TABLES
+]
+
+VARIANTS = {
+    'row': ROW_LEVEL_SETUP,
+    'statement': ["SELECT set_audit_mode('sync')"],
+    'async': ["SELECT set_audit_mode('async')"],
+}
+
+
+def run_variant(conn, name, setup, votes):
+    cur = conn.cursor()
+    try:
+        for statement in setup:
+            cur.execute(statement)
+
+        cur.execute("SELECT id FROM contestants WHERE is_active = TRUE ORDER BY id LIMIT 1")
+        contestant_id = cur.fetchone()[0]
+        cur.execute("""
+            INSERT INTO tickets (ticket_code, is_used)
+            SELECT 'BENCH' || g, FALSE FROM generate_series(1, %s) g
+        """, (votes,))
+
+        cur.execute("SELECT pg_current_wal_insert_lsn()")
+        wal_start = cur.fetchone()[0]
+        started = time.perf_counter()
+        for i in range(1, votes + 1):
+            # Distinct addresses so the rate-limit trigger never fires
+            cur.execute("SELECT success FROM submit_vote(%s, %s, %s, %s)",
+                        (f"BENCH{i}", contestant_id, f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+                         'audit-benchmark'))
+            if not cur.fetchone()[0]:
+                raise RuntimeError(f"submit_vote failed for BENCH{i}")
+        elapsed = time.perf_counter() - started
+        cur.execute("SELECT pg_wal_lsn_diff(pg_current_wal_insert_lsn(), %s)", (wal_start,))
+        wal_bytes = int(cur.fetchone()[0])
+        return elapsed / votes * 1e6, wal_bytes / votes
+    finally:
+        cur.close()
+        conn.rollback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare per-vote audit trigger cost')
+    parser.add_argument('--database-url', default=Config.DATABASE_URL)
+    parser.add_argument('--votes', type=int, default=1000)
+    parser.add_argument('--variants', nargs='*', default=list(VARIANTS), choices=list(VARIANTS))
+    args = parser.parse_args()
+
+    import psycopg2
+
+    conn = psycopg2.connect(args.database_url)
+    results = {}
+    try:
+        for name in args.variants:
+            results[name] = run_variant(conn, name, VARIANTS[name], args.votes)
+    except Exception as e:
+        print(f"❌ Benchmark failed: {e}")
+        return 1
+    finally:
+        conn.close()
+
+    print(f"🗳️  Audit trigger cost per vote ({args.votes} votes, rolled back)")
+    print("=" * 56)
+    print(f"{'variant':12s} {'µs/vote':>12s} {'WAL bytes/vote':>16s}")
+    for name, (us, wal) in results.items():
+        print(f"{name:12s} {us:12.1f} {wal:16.0f}")
+    print("=" * 56)
+    if 'row' in results:
+        base_us, base_wal = results['row']
+        for name, (us, wal) in results.items():
+            if name != 'row':
+                print(f"{name}: {us / base_us:.2f}x time, {wal / base_wal:.2f}x WAL vs row-level")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
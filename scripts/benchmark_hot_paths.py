@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the Python hot paths
+
+Runs in-process against FakeDatabaseAdapter, so it needs no Postgres and
+finishes in seconds. Results are compared with a stored baseline and the
+script exits non-zero when any hot path is slower than the allowed
+threshold.
+
+Usage:
+    python scripts/benchmark_hot_paths.py                   # compare with baseline
+    python scripts/benchmark_hot_paths.py --save-baseline   # record a new baseline
+    python scripts/benchmark_hot_paths.py --threshold 0.5 --only submit_vote
+"""
+
+import sys
+import os
+import json
+import argparse
+import platform
+import timeit
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, jsonify
+from fake_db_adapter import FakeDatabaseAdapter, install
+
+from app.models import Contestant, Ticket, get_voting_results
+from app.services import VotingService
+from app.utils import get_client_ip
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+DEFAULT_THRESHOLD = 0.25
+
+
+def build_benchmarks(fake):
+    """Return {name: (callable, setup)}; setup runs before each timed repeat"""
+    flask_app = Flask(__name__)
+    contestant_row = fake.execute_query(
+        'SELECT * FROM contestants WHERE id = %s AND event_id = %s AND is_active = true', (1, 1), fetch_one=True)
+    results, total_votes = get_voting_results()
+    payload = {'results': results, 'total_votes': total_votes, 'voting_open': True,
+               'current_time': '2025-01-01T19:00:00+07:00'}
+
+    def contestant_construction():
+        Contestant(**dict(contestant_row))
+
+    def voting_results_formatting():
+        get_voting_results()
+
+    def ticket_get_by_code():
+        Ticket.get_by_code('  A3.R2.7  ')
+
+    def jsonify_results():
+        with flask_app.app_context():
+            jsonify(payload)
+
+    proxied = flask_app.test_request_context(
+        '/api/vote', headers={'X-Forwarded-For': '203.0.113.7, 10.0.0.2, 10.0.0.3'}).request
+    direct = flask_app.test_request_context(
+        '/api/vote', environ_base={'REMOTE_ADDR': '198.51.100.4'}).request
+
+    def client_ip_forwarded():
+        get_client_ip(proxied)
+
+    def client_ip_direct():
+        get_client_ip(direct)
+
+    ticket_codes = list(fake.tickets_by_code)
+    cursor = {'i': 0}
+
+    def submit_vote():
+        # Cycle through tickets so both success and "already used" paths are hit
+        code = ticket_codes[cursor['i'] % len(ticket_codes)]
+        cursor['i'] += 1
+        VotingService.submit_vote(code, 1 + cursor['i'] % 10, '203.0.113.7', 'Mozilla/5.0 (bench)')
+
+    def reset_fixture():
+        fake.reset(ticket_count=len(ticket_codes), seed_votes=False)
+        cursor['i'] = 0
+
+    noop = lambda: None
+    return {
+        'contestant_construction': (contestant_construction, noop),
+        'voting_results_formatting': (voting_results_formatting, noop),
+        'ticket_get_by_code': (ticket_get_by_code, noop),
+        'jsonify_results': (jsonify_results, noop),
+        'client_ip_forwarded': (client_ip_forwarded, noop),
+        'client_ip_direct': (client_ip_direct, noop),
+        'submit_vote': (submit_vote, reset_fixture),
+    }
+
+
+def run_benchmark(func, setup, number, repeat):
+    """Best-of-repeat time per call in nanoseconds"""
+    timings = []
+    for _ in range(repeat):
+        setup()
+        timings.append(timeit.timeit(func, number=number) / number * 1e9)
+    return min(timings)
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark the voting hot paths')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='Write results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Allowed slowdown as a fraction of baseline (default 0.25)')
+    parser.add_argument('--number', type=int, default=2000, help='Calls per repeat')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed repeats (best is kept)')
+    parser.add_argument('--only', nargs='*', help='Run only the named benchmarks')
+    parser.add_argument('--output', help='Also write this run\'s results to a JSON file')
+    args = parser.parse_args()
+
+    fake = FakeDatabaseAdapter()
+    uninstall = install(fake)
+    try:
+        benchmarks = build_benchmarks(fake)
+        if args.only:
+            unknown = set(args.only) - set(benchmarks)
+            if unknown:
+                print(f"❌ Unknown benchmark(s): {', '.join(sorted(unknown))}")
+                return 2
+            benchmarks = {k: v for k, v in benchmarks.items() if k in args.only}
+
+        results = {}
+        for name, (func, setup) in benchmarks.items():
+            results[name] = run_benchmark(func, setup, args.number, args.repeat)
+    finally:
+        uninstall()
+
+    run = {
+        'created_at': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'ns_per_call': results,
+    }
+
+    baseline = load_baseline(args.baseline)
+    regressions = []
+
+    print("⏱️  Hot path micro-benchmarks (ns per call, best of %d)" % args.repeat)
+    print("=" * 68)
+    for name, ns in results.items():
+        line = f"{name:28s} {ns:12.0f}"
+        base = (baseline or {}).get('ns_per_call', {}).get(name)
+        if base:
+            change = (ns - base) / base
+            line += f"   baseline {base:10.0f}  {change:+7.1%}"
+            if change > args.threshold:
+                line += "  ❌ REGRESSION"
+                regressions.append(name)
+        print(line)
+    print("=" * 68)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(run, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(run, f, indent=2)
+        print(f"💾 Baseline written to {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print(f"ℹ️  No baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+
+    if regressions:
+        print(f"❌ {len(regressions)} hot path(s) regressed by more than {args.threshold:.0%}: "
+              f"{', '.join(regressions)}")
+        return 1
+
+    print(f"✅ All hot paths within {args.threshold:.0%} of baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark the write amplification of ticket claims
+
+Builds a scratch copy of tickets for each layout, claims every ticket
+once with the same UPDATE as submit_vote() and reports time, WAL bytes
+and the share of HOT updates per claim:
+
+  before  indexes and fillfactor up to migration 012
+          (idx_tickets_code, idx_tickets_used, fillfactor 100)
+  after   migration 013 (no index on claimed columns, fillfactor 70)
+
+Each layout runs in its own transaction that is rolled back, so the
+database is left untouched. Old row versions cannot be pruned inside
+that transaction, so the HOT share is a lower bound for a live show.
+Requires a local/staging Postgres.
+
+Usage:
+    python scripts/benchmark_ticket_updates.py --tickets 20000
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config
+
+COMMON_INDEXES = [
+    "ALTER TABLE bench_tickets ADD PRIMARY KEY (id)",
+    "CREATE UNIQUE INDEX ON bench_tickets(event_id, ticket_code)",
+]
+
+VARIANTS = {
+    'before': {
+        'fillfactor': 100,
+        'indexes': COMMON_INDEXES + [
+            "CREATE INDEX ON bench_tickets(ticket_code)",
+            "CREATE INDEX ON bench_tickets(is_used)",
+        ],
+    },
+    'after': {
+        'fillfactor': 70,
+        'indexes': COMMON_INDEXES,
+    },
+}
+
+CLAIM_QUERY = ("UPDATE bench_tickets SET is_used = TRUE, used_at = NOW(), used_round_id = 1 "
+               "WHERE id = %s AND used_round_id IS DISTINCT FROM 1")
+
+
+def run_variant(conn, name, variant, tickets):
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            CREATE TABLE bench_tickets (LIKE tickets INCLUDING DEFAULTS INCLUDING GENERATED)
+            WITH (fillfactor = {int(variant['fillfactor'])})
+        """)
+        cur.execute("""
+            INSERT INTO bench_tickets (id, event_id, ticket_code, is_used, created_at)
+            SELECT g, 1, 'S' || g / 100 || '.' || g % 100, FALSE, NOW()
+            FROM generate_series(1, %s) g
+        """, (tickets,))
+        for statement in variant['indexes']:
+            cur.execute(statement)
+        cur.execute("SELECT pg_relation_size('bench_tickets'), pg_indexes_size('bench_tickets')")
+        heap_start, index_start = cur.fetchone()
+
+        ids = list(range(1, tickets + 1))
+        random.Random(42).shuffle(ids)
+
+        cur.execute("SELECT pg_current_wal_insert_lsn()")
+        wal_start = cur.fetchone()[0]
+        started = time.perf_counter()
+        for ticket_id in ids:
+            cur.execute(CLAIM_QUERY, (ticket_id,))
+        elapsed = time.perf_counter() - started
+        cur.execute("SELECT pg_wal_lsn_diff(pg_current_wal_insert_lsn(), %s)", (wal_start,))
+        wal_bytes = int(cur.fetchone()[0])
+
+        # Counters for the current transaction only
+        cur.execute("""
+            SELECT n_tup_upd, n_tup_hot_upd FROM pg_stat_xact_user_tables
+            WHERE relid = 'bench_tickets'::regclass
+        """)
+        updates, hot_updates = cur.fetchone()
+        cur.execute("SELECT pg_relation_size('bench_tickets'), pg_indexes_size('bench_tickets')")
+        heap_end, index_end = cur.fetchone()
+        return {
+            'us': elapsed / tickets * 1e6,
+            'wal': wal_bytes / tickets,
+            'hot': hot_updates / updates * 100 if updates else 0.0,
+            'heap_growth': heap_end - heap_start,
+            'index_growth': index_end - index_start,
+        }
+    finally:
+        cur.close()
+        conn.rollback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare ticket claim cost before/after migration 013')
+    parser.add_argument('--database-url', default=Config.DATABASE_URL)
+    parser.add_argument('--tickets', type=int, default=10000)
+    parser.add_argument('--variants', nargs='*', default=list(VARIANTS), choices=list(VARIANTS))
+    args = parser.parse_args()
+
+    import psycopg2
+
+    conn = psycopg2.connect(args.database_url)
+    results = {}
+    try:
+        for name in args.variants:
+            results[name] = run_variant(conn, name, VARIANTS[name], args.tickets)
+    except Exception as e:
+        print(f"❌ Benchmark failed: {e}")
+        return 1
+    finally:
+        conn.close()
+
+    print(f"🎟️  Ticket claim cost ({args.tickets} tickets, rolled back)")
+    print("=" * 72)
+    print(f"{'variant':10s} {'µs/claim':>10s} {'WAL B/claim':>12s} {'HOT %':>8s} "
+          f"{'heap +KB':>10s} {'index +KB':>10s}")
+    for name, r in results.items():
+        print(f"{name:10s} {r['us']:10.1f} {r['wal']:12.0f} {r['hot']:8.1f} "
+              f"{r['heap_growth'] / 1024:10.0f} {r['index_growth'] / 1024:10.0f}")
+    print("=" * 72)
+    if 'before' in results and 'after' in results:
+        before, after = results['before'], results['after']
+        print(f"after: {after['us'] / before['us']:.2f}x time, "
+              f"{after['wal'] / before['wal']:.2f}x WAL per claim vs before")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
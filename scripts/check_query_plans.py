@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression checks for the hot SQL statements
+
+Runs EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) for every statement in
+HOT_STATEMENTS against a seeded local Postgres (see
+generate_synthetic_dataset.py), normalises each plan to its shape and
+buffer counts, and compares them with a stored baseline. Regressions
+flagged:
+
+  * a plan shape change (node types, relations, indexes, join types)
+  * a new sequential scan on a relation that was index-scanned before
+  * shared buffers touched growing past --buffer-factor
+  * a row estimate off by more than --estimate-factor where it was not before
+
+Statements that write are explained inside a transaction that is always
+rolled back.
+
+Usage:
+    python scripts/check_query_plans.py --save-baseline
+    python scripts/check_query_plans.py            # exit 1 on regression
+"""
+
+import sys
+import os
+import json
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_plan_baseline.json')
+
+# name -> statement, parameter lookup (a query returning one row of params), writes?
+HOT_STATEMENTS = [
+    {
+        'name': 'voting_results',
+        'sql': 'SELECT * FROM voting_results WHERE event_id = %s',
+        'params_sql': 'SELECT MIN(id) FROM events',
+    },
+    {
+        'name': 'ticket_stats',
+        'sql': 'SELECT * FROM ticket_stats WHERE event_id = %s',
+        'params_sql': 'SELECT MIN(id) FROM events',
+    },
+    {
+        'name': 'ticket_section_stats',
+        'sql': 'SELECT section_code, total_tickets, used_tickets, unused_tickets FROM ticket_section_stats '
+               'WHERE event_id = %s AND section_code IS NOT NULL ORDER BY section_code',
+        'params_sql': 'SELECT MIN(id) FROM events',
+    },
+    {
+        'name': 'ticket_get_by_code',
+        'sql': 'SELECT t.id, t.event_id, t.ticket_code, t.section_code, t.created_at, t.used_round_id, '
+               'COALESCE(t.used_round_id = r.id, FALSE) AS is_used, '
+               'CASE WHEN t.used_round_id = r.id THEN t.used_at END AS used_at '
+               'FROM tickets t '
+               "LEFT JOIN voting_rounds r ON r.event_id = t.event_id AND r.status = 'active' "
+               'WHERE t.event_id = %s AND t.ticket_code = %s',
+        'params_sql': 'SELECT event_id, ticket_code FROM tickets ORDER BY id DESC LIMIT 1',
+    },
+    {
+        'name': 'contestants_active',
+        'sql': 'SELECT * FROM contestants WHERE event_id = %s AND is_active = true ORDER BY name',
+        'params_sql': 'SELECT MIN(id) FROM events',
+    },
+    {
+        'name': 'contestant_by_id',
+        'sql': 'SELECT * FROM contestants WHERE id = %s AND event_id = %s AND is_active = true',
+        'params_sql': 'SELECT id, event_id FROM contestants WHERE is_active = TRUE ORDER BY id LIMIT 1',
+    },
+    {
+        'name': 'contestant_version',
+        'sql': 'SELECT version FROM contestant_versions WHERE event_id = %s',
+        'params_sql': 'SELECT MIN(id) FROM events',
+    },
+    {
+        'name': 'get_voting_open',
+        'sql': 'SELECT voting_open FROM events WHERE id = %s',
+        'params_sql': 'SELECT MIN(id) FROM events',
+    },
+    # The statements submit_vote() runs, in order
+    {
+        'name': 'submit_vote.claim_ticket',
+        'sql': 'UPDATE tickets SET is_used = TRUE, used_at = NOW(), used_round_id = current_round_id(event_id) '
+               'WHERE id = %s AND used_round_id IS DISTINCT FROM current_round_id(event_id)',
+        'params_sql': 'SELECT id FROM tickets WHERE used_round_id IS DISTINCT FROM current_round_id(event_id) '
+                      'ORDER BY id LIMIT 1',
+        'writes': True,
+    },
+    {
+        'name': 'submit_vote.insert_vote',
+        'sql': 'INSERT INTO votes (contestant_id, ticket_id, ip_address, user_agent_id, round_id, event_id) '
+               'VALUES (%s, %s, %s, intern_user_agent(%s), current_round_id(%s), %s) RETURNING id',
+        'params_sql': "SELECT c.id, t.id, '203.0.113.7'::INET, 'plan-check', t.event_id, t.event_id "
+                      "FROM tickets t JOIN contestants c ON c.event_id = t.event_id AND c.is_active "
+                      "WHERE t.used_round_id IS DISTINCT FROM current_round_id(t.event_id) "
+                      "ORDER BY t.id, c.id LIMIT 1",
+        'writes': True,
+    },
+    {
+        'name': 'submit_vote.function',
+        'sql': 'SELECT * FROM submit_vote(%s, %s, %s, %s, %s)',
+        'params_sql': "SELECT t.ticket_code, c.id, '203.0.113.7'::INET, 'plan-check', t.event_id "
+                      "FROM tickets t JOIN contestants c ON c.event_id = t.event_id AND c.is_active "
+                      "WHERE t.used_round_id IS DISTINCT FROM current_round_id(t.event_id) "
+                      "ORDER BY t.id, c.id LIMIT 1",
+        'writes': True,
+    },
+    {
+        'name': 'timeline_1m',
+        'sql': 'SELECT FLOOR(EXTRACT(EPOCH FROM bucket) * 1000 / %s)::BIGINT * %s AS t, '
+               'contestant_id AS key, SUM(votes)::BIGINT AS votes FROM vote_rollup_1m '
+               'WHERE event_id = %s AND round_id = current_round_id(%s) '
+               'AND bucket >= %s AND bucket < %s GROUP BY 1, 2 ORDER BY 2, 1',
+        'params_sql': "SELECT 60000, 60000, e.id, e.id, MAX(r.bucket) - INTERVAL '3 hours', MAX(r.bucket) "
+                      "FROM events e JOIN vote_rollup_1m r ON r.event_id = e.id GROUP BY e.id ORDER BY e.id LIMIT 1",
+    },
+    {
+        'name': 'intern_user_agent',
+        'sql': 'SELECT intern_user_agent(%s) AS id',
+        'params_sql': 'SELECT user_agent FROM user_agents ORDER BY id LIMIT 1',
+    },
+    {
+        'name': 'votes_recent_window',
+        'sql': "SELECT COUNT(*) FROM votes WHERE created_at >= NOW() - INTERVAL '10 minutes'",
+    },
+    {
+        'name': 'rate_limit_window',
+        'sql': "SELECT COUNT(*) FROM votes WHERE ip_address = %s AND created_at > NOW() - INTERVAL '1 hour'",
+        'params_sql': 'SELECT ip_address FROM votes ORDER BY id DESC LIMIT 1',
+    },
+]
+
+# Plan keys that describe shape; everything else (costs, timings, widths) is noise
+SHAPE_KEYS = ('Node Type', 'Relation Name', 'Index Name', 'Join Type', 'Parent Relationship',
+              'Scan Direction', 'Strategy', 'Partial Mode')
+SCAN_NODES = ('Seq Scan', 'Index Scan', 'Index Only Scan', 'Bitmap Heap Scan', 'Bitmap Index Scan')
+
+
+def normalize_plan(node):
+    """Reduce an EXPLAIN JSON node to its shape, recursively"""
+    shape = {key: node[key] for key in SHAPE_KEYS if key in node}
+    children = node.get('Plans') or []
+    if children:
+        shape['Plans'] = [normalize_plan(child) for child in children]
+    return shape
+
+
+def walk(node):
+    yield node
+    for child in node.get('Plans') or []:
+        yield from walk(child)
+
+
+def summarize(explain_json):
+    """Shape, buffer totals, scans and row-estimate misses for one EXPLAIN result"""
+    root = explain_json[0]['Plan']
+    scans = {}
+    worst_estimate = 1.0
+    for node in walk(root):
+        if node.get('Node Type') in SCAN_NODES and node.get('Relation Name'):
+            scans.setdefault(node['Relation Name'], set()).add(node['Node Type'])
+        actual = node.get('Actual Rows', 0) * max(node.get('Actual Loops', 1), 1)
+        planned = node.get('Plan Rows', 0) * max(node.get('Actual Loops', 1), 1)
+        if actual or planned:
+            ratio = max(actual, 1) / max(planned, 1)
+            worst_estimate = max(worst_estimate, ratio, 1 / ratio)
+    return {
+        'shape': normalize_plan(root),
+        'shared_hit': root.get('Shared Hit Blocks', 0),
+        'shared_read': root.get('Shared Read Blocks', 0),
+        'scans': {rel: sorted(kinds) for rel, kinds in sorted(scans.items())},
+        'worst_estimate_ratio': round(worst_estimate, 2),
+        'execution_ms': round(explain_json[0].get('Execution Time', 0.0), 3),
+    }
+
+
+def explain(conn, statement):
+    cur = conn.cursor()
+    try:
+        params = None
+        if statement.get('params_sql'):
+            cur.execute(statement['params_sql'])
+            params = cur.fetchone()
+            if params is None or any(p is None for p in params):
+                return None
+        cur.execute('EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + statement['sql'], params)
+        plan = cur.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return summarize(plan)
+    finally:
+        cur.close()
+        # Reads are rolled back too; it keeps every run starting from the same state
+        conn.rollback()
+
+
+def compare(name, current, baseline, args):
+    """Return a list of human-readable regressions for one statement"""
+    problems = []
+    if current['shape'] != baseline['shape']:
+        problems.append('plan shape changed')
+    for relation, kinds in current['scans'].items():
+        if 'Seq Scan' in kinds and 'Seq Scan' not in baseline['scans'].get(relation, []):
+            problems.append(f"new sequential scan on {relation}")
+    base_buffers = baseline['shared_hit'] + baseline['shared_read']
+    cur_buffers = current['shared_hit'] + current['shared_read']
+    if base_buffers and cur_buffers > base_buffers * args.buffer_factor:
+        problems.append(f"buffers {base_buffers} -> {cur_buffers}")
+    if (current['worst_estimate_ratio'] > args.estimate_factor
+            and baseline['worst_estimate_ratio'] <= args.estimate_factor):
+        problems.append(f"row estimate off by {current['worst_estimate_ratio']}x")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check hot SQL statements for plan regressions')
+    parser.add_argument('--database-url', default=Config.DATABASE_URL)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--buffer-factor', type=float, default=2.0,
+                        help='Flag when shared buffers grow by more than this factor')
+    parser.add_argument('--estimate-factor', type=float, default=10.0,
+                        help='Flag row estimates off by more than this factor')
+    parser.add_argument('--only', nargs='*', help='Check only the named statements')
+    args = parser.parse_args()
+
+    import psycopg2
+
+    statements = [s for s in HOT_STATEMENTS if not args.only or s['name'] in args.only]
+    conn = psycopg2.connect(args.database_url)
+    try:
+        current = {}
+        for statement in statements:
+            summary = explain(conn, statement)
+            if summary is None:
+                print(f"⚠️  {statement['name']}: no data to bind parameters, skipped")
+                continue
+            current[statement['name']] = summary
+    finally:
+        conn.close()
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+        print(f"💾 Saved {len(current)} plan(s) to {args.baseline}")
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    regressions = 0
+    print("🔍 Hot statement plans")
+    print("=" * 72)
+    for name, summary in current.items():
+        buffers = summary['shared_hit'] + summary['shared_read']
+        line = f"{name:32s} {summary['execution_ms']:9.3f} ms  {buffers:8d} buf"
+        if name not in baseline:
+            print(f"{line}  (no baseline)")
+            continue
+        problems = compare(name, summary, baseline[name], args)
+        if problems:
+            regressions += 1
+            print(f"{line}  ❌ {'; '.join(problems)}")
+        else:
+            print(f"{line}  ✅")
+    print("=" * 72)
+
+    if regressions:
+        print(f"❌ {regressions} statement(s) regressed against {args.baseline}")
+        return 1
+    print("✅ No plan regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Check the ticket counters (migration 014) against the tickets table
+
+Recomputes total tickets per (event, section) and used tickets per
+(round, section) from tickets and lists every counter that disagrees.
+With --fix the counters are rebuilt from tickets (ticket writes wait
+while that runs).
+
+Usage:
+    python scripts/check_ticket_counters.py
+    python scripts/check_ticket_counters.py --fix
+"""
+
+import sys
+import os
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import db_adapter
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verify ticket counters against tickets')
+    parser.add_argument('--fix', action='store_true', help='Rebuild the counters if they disagree')
+    args = parser.parse_args()
+
+    try:
+        mismatches = db_adapter.execute_query(
+            'SELECT * FROM check_ticket_counters() ORDER BY counter, scope_id, section_code',
+            fetch_all=True) or []
+    except Exception as e:
+        print(f"❌ Error checking ticket counters: {e}")
+        return 1
+
+    if not mismatches:
+        print("✅ Ticket counters match tickets")
+        return 0
+
+    print(f"⚠️  {len(mismatches)} ticket counter(s) disagree with tickets")
+    print(f"{'counter':8s} {'event/round':>12s} {'section':10s} {'expected':>10s} {'actual':>10s}")
+    for row in mismatches:
+        print(f"{row['counter']:8s} {row['scope_id']:>12} {row['section_code'] or '-':10s} "
+              f"{row['expected']:>10} {row['actual']:>10}")
+
+    if not args.fix:
+        print("Run with --fix to rebuild them")
+        return 1
+
+    try:
+        row = db_adapter.execute_query('SELECT rebuild_ticket_counters() AS sections', fetch_one=True)
+    except Exception as e:
+        print(f"❌ Error rebuilding ticket counters: {e}")
+        return 1
+    print(f"🔧 Rebuilt ticket counters ({row['sections']} event/section rows)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
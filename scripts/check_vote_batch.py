@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Check apply_vote_batch() (migrations 017 and 021) against the database
+
+Inside one transaction that is always rolled back, creates --ballots
+fresh tickets and applies them as a batch from a single IP, as the
+admin batch endpoint does. Every ballot has to be accepted: the per-IP
+rate limit (10 votes per hour) must not apply to batch entry. Nothing is
+left behind.
+
+Usage:
+    python scripts/check_vote_batch.py
+    python scripts/check_vote_batch.py --event-id 2 --ballots 50
+"""
+
+import sys
+import os
+import io
+import csv
+import uuid
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2.extras
+from app.config import Config
+from app.database import db_adapter
+from app.services import VOTE_BATCH_TABLE
+
+DESK_IP = '203.0.113.250'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply a throwaway vote batch and roll it back')
+    parser.add_argument('--event-id', type=int, default=Config.DEFAULT_EVENT_ID)
+    parser.add_argument('--ballots', type=int, default=25, help='Ballots in the batch (more than 10)')
+    args = parser.parse_args()
+
+    prefix = f"BC{uuid.uuid4().hex[:8].upper()}"
+    codes = [f"{prefix}{n:04d}" for n in range(args.ballots)]
+    try:
+        with db_adapter.get_connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            try:
+                cursor.execute('SELECT id FROM contestants WHERE event_id = %s AND is_active = TRUE ORDER BY id LIMIT 1',
+                               (args.event_id,))
+                contestant = cursor.fetchone()
+                if contestant is None:
+                    print(f"❌ Event {args.event_id} has no active contestant")
+                    return 1
+                cursor.execute(
+                    "INSERT INTO tickets (event_id, ticket_code, is_used, created_at) "
+                    "SELECT %s, unnest(%s::VARCHAR[]), FALSE, NOW()",
+                    (args.event_id, codes))
+
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for line, code in enumerate(codes, 1):
+                    writer.writerow((line, code, contestant['id']))
+                buffer.seek(0)
+                cursor.execute(VOTE_BATCH_TABLE)
+                cursor.copy_expert('COPY vote_batch (line, ticket_code, contestant_id) FROM STDIN WITH (FORMAT csv)',
+                                   buffer)
+                cursor.execute('SELECT * FROM apply_vote_batch(%s, %s, NULL)', (args.event_id, DESK_IP))
+                rows = cursor.fetchall()
+                cursor.execute("SELECT current_setting('voting.batch_entry', TRUE) AS flag")
+                flag = cursor.fetchone()['flag']
+            finally:
+                cursor.close()
+                conn.rollback()
+    except Exception as e:
+        print(f"❌ Error applying the batch: {e}")
+        return 1
+
+    rejected = [r for r in rows if not r['success']]
+    for row in rejected[:10]:
+        print(f"   line {row['line']}: {row['message']}")
+    if rejected or len(rows) != len(codes):
+        print(f"❌ {len(rejected)} of {len(codes)} ballots from one IP were rejected")
+        return 1
+    if flag == 'on':
+        print("❌ apply_vote_batch() left the rate limit switched off for the transaction")
+        return 1
+    print(f"✅ {len(codes)} ballots from one IP accepted (rolled back)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
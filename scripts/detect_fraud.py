@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Vote-fraud detector (app/fraud.py), run next to the web workers
+
+Follows new votes by created_at, feeds them to FraudDetector and upserts
+flagged clusters into vote_flags (migration 011), where admins see them
+at GET /api/admin/fraud/clusters. Each poll re-reads the last --lag
+seconds so votes that commit slightly out of order are not missed;
+already-seen votes are skipped.
+
+--rescore loads a finished time range instead and recomputes the window
+features for every vote with NumPy, to check thresholds against a past
+event (add --save to store the clusters the streaming rules find in it).
+
+Usage:
+    python scripts/detect_fraud.py
+    python scripts/detect_fraud.py --once --lookback 3600
+    python scripts/detect_fraud.py --rescore --since 2025-01-01T12:00:00Z --until 2025-01-01T15:00:00Z
+"""
+
+import sys
+import os
+import time
+import argparse
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import db_adapter
+from app.fraud import (FraudDetector, VOTES_SINCE_QUERY, VOTES_BETWEEN_QUERY, DEFAULT_RULES,
+                       rescore, save_clusters)
+
+
+def parse_time(value):
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def follow(args):
+    detector = FraudDetector()
+    cursor = datetime.now(timezone.utc) - timedelta(seconds=args.lookback)
+    print(f"👀 Following votes from {cursor.isoformat()}")
+    while True:
+        rows = db_adapter.execute_query(VOTES_SINCE_QUERY, (cursor, args.batch_size), fetch_all=True)
+        clusters = detector.process(rows)
+        if clusters:
+            save_clusters(clusters)
+            for c in clusters:
+                print(f"🚩 {c['kind']:14s} {c['cluster_key']:40s} {c['vote_count']:5d} votes  score {c['score']}")
+        if rows:
+            newest = rows[-1]['created_at']
+            if len(rows) == args.batch_size:
+                # Catching up: move on without overlap so a full page is never re-read forever
+                cursor = newest
+                continue
+            cursor = max(cursor, newest - timedelta(seconds=args.lag))
+        if args.once:
+            return 0
+        time.sleep(args.interval)
+
+
+def rescore_range(args):
+    since, until = parse_time(args.since), parse_time(args.until)
+    votes = list(db_adapter.iter_query(VOTES_BETWEEN_QUERY, (since, until)))
+    print(f"📊 Rescoring {len(votes):,} votes between {since.isoformat()} and {until.isoformat()}")
+
+    features = rescore(votes)
+    for kind, rule in DEFAULT_RULES.items():
+        hits = features[kind] >= rule['threshold']
+        print(f"   {kind:14s} max {int(features[kind].max()) if len(votes) else 0:5d} in "
+              f"{rule['window']:.0f}s  flagged {int(hits.sum()):,} votes")
+    print(f"   {'any rule':14s} flagged {int(features['flagged'].sum()):,} votes")
+
+    top = Counter(v['ip_address'] for v, hit in zip(votes, features['flagged']) if hit)
+    for ip, count in top.most_common(10):
+        print(f"   🚩 {ip}: {count}")
+
+    if args.save:
+        clusters = {}
+        detector = FraudDetector()
+        for start in range(0, len(votes), args.batch_size):
+            for c in detector.process(votes[start:start + args.batch_size]):
+                clusters[(c['event_id'], c['kind'], c['cluster_key'], c['first_vote_at'])] = c
+        save_clusters(list(clusters.values()))
+        print(f"💾 Saved {len(clusters)} cluster(s) to vote_flags")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Flag bursts of suspicious votes')
+    parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls')
+    parser.add_argument('--lag', type=float, default=5.0, help='Seconds re-read on every poll')
+    parser.add_argument('--lookback', type=float, default=120.0, help='Seconds of history read at start')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--once', action='store_true', help='Poll once and exit')
+    parser.add_argument('--rescore', action='store_true', help='Rescore --since/--until with NumPy')
+    parser.add_argument('--since')
+    parser.add_argument('--until')
+    parser.add_argument('--save', action='store_true', help='With --rescore, store clusters found')
+    args = parser.parse_args()
+
+    try:
+        if args.rescore:
+            if not args.since or not args.until:
+                print("❌ --rescore needs --since and --until")
+                return 1
+            return rescore_range(args)
+        return follow(args)
+    except KeyboardInterrupt:
+        return 0
+    except Exception as e:
+        print(f"❌ Fraud detector failed: {e}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
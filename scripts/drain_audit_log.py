@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Drain the async audit staging table into audit_log
+
+Only needed when audit_mode is 'async' (see migration 006). Runs once by
+default, or keeps draining every --interval seconds.
+
+Usage:
+    python scripts/drain_audit_log.py
+    python scripts/drain_audit_log.py --interval 2 --batch-size 10000
+"""
+
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import db_adapter
+
+def drain_once(batch_size):
+    """Drain until the staging table is empty; returns rows moved"""
+    total = 0
+    while True:
+        row = db_adapter.execute_query(
+            "SELECT drain_audit_staging(%s) AS moved", (batch_size,), fetch_one=True)
+        moved = row['moved'] if row else 0
+        total += moved
+        if moved < batch_size:
+            return total
+
+def main():
+    parser = argparse.ArgumentParser(description='Drain audit_log_staging into audit_log')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--interval', type=float, default=None,
+                        help='Keep running, draining every N seconds')
+    args = parser.parse_args()
+
+    try:
+        while True:
+            moved = drain_once(args.batch_size)
+            if moved or args.interval is None:
+                print(f"📦 Moved {moved} audit record(s)")
+            if args.interval is None:
+                return 0
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\n🛑 Drainer stopped")
+        return 0
+    except Exception as e:
+        print(f"❌ Error draining audit staging: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Stream votes, tickets or audit_log to a CSV/NDJSON file
+
+Uses the same keyset-paginated export as /api/admin/export/<table>, so it
+runs in constant memory. With --resume the export continues after the
+last id already present in the output file (gzip files are appended as
+a new gzip member, which every gzip reader concatenates transparently).
+
+Usage:
+    python scripts/export_data.py votes --format csv --gzip -o votes.csv.gz
+    python scripts/export_data.py audit_log --format ndjson -o audit.ndjson --resume
+"""
+
+import sys
+import os
+import csv
+import gzip
+import json
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.exports import EXPORT_TABLES, EXPORT_FORMATS, iter_export
+
+
+def last_exported_id(path, fmt, compressed):
+    """Read the id of the last complete row in an existing export file"""
+    opener = gzip.open if compressed else open
+    last_line = None
+    try:
+        with opener(path, 'rt', encoding='utf-8', newline='') as f:
+            for line in f:
+                if line.endswith('\n'):
+                    last_line = line
+    except (EOFError, OSError):
+        # Truncated gzip member from an interrupted run; keep what was readable
+        pass
+    if not last_line:
+        return 0
+    if fmt == 'ndjson':
+        return int(json.loads(last_line)['id'])
+    row = next(csv.reader([last_line]))
+    return int(row[0]) if row and row[0].isdigit() else 0
+
+
+def drop_partial_line(path):
+    """Truncate an uncompressed export after its last complete line"""
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        pos = size
+        while pos > 0:
+            step = min(65536, pos)
+            pos -= step
+            f.seek(pos)
+            newline = f.read(step).rfind(b'\n')
+            if newline >= 0:
+                end = pos + newline + 1
+                break
+        else:
+            end = 0
+        if end < size:
+            f.truncate(end)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream an export of votes, tickets or audit_log')
+    parser.add_argument('table', choices=sorted(EXPORT_TABLES))
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+    parser.add_argument('--gzip', action='store_true', help='Compress output on the fly')
+    parser.add_argument('-o', '--output', help='Output file (default: stdout)')
+    parser.add_argument('--after-id', type=int, default=0, help='Start after this id')
+    parser.add_argument('--since', help='Only rows with created_at >= this timestamp')
+    parser.add_argument('--event-id', type=int, default=None, help='Only this event (default: all events)')
+    parser.add_argument('--chunk-size', type=int, default=None, help='Rows per keyset page')
+    parser.add_argument('--resume', action='store_true', help='Continue after the last id in --output')
+    args = parser.parse_args()
+
+    after_id = args.after_id
+    mode = 'wb'
+    if args.resume:
+        if not args.output:
+            print("❌ --resume requires --output", file=sys.stderr)
+            return 2
+        if os.path.exists(args.output):
+            if not args.gzip:
+                drop_partial_line(args.output)
+            after_id = last_exported_id(args.output, args.format, args.gzip)
+            mode = 'ab'
+            print(f"↪️  Resuming {args.table} after id {after_id}", file=sys.stderr)
+
+    chunks = iter_export(args.table, args.format, after_id=after_id, since=args.since,
+                         chunk_size=args.chunk_size, compress=args.gzip, event_id=args.event_id)
+    written = 0
+    try:
+        out = open(args.output, mode) if args.output else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if args.output:
+                out.close()
+    except Exception as e:
+        print(f"❌ Export failed after {written} bytes: {e}", file=sys.stderr)
+        if args.output:
+            print("💡 Re-run with --resume to continue", file=sys.stderr)
+        return 1
+
+    print(f"✅ Exported {args.table} ({written:,} bytes)", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Deterministic in-memory stand-in for DatabaseAdapter
+
+Used by the micro-benchmarks so the Python hot paths can be measured
+without a Postgres server. Only the statements issued by app/ are
+understood; anything else raises so a benchmark never silently measures
+a no-op.
+"""
+
+import sys
+import os
+import re
+from functools import lru_cache
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import psycopg2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FINALISTS = [
+    ('Anne and Quang', 'Dynamic duo with exceptional talent'),
+    ('HORIZON', 'Innovative musical group pushing boundaries'),
+    ('Truong Ho Quan Minh', 'Solo artist with unique style'),
+    ('BlackB', 'Contemporary music collective'),
+    ('Ban Nhac Anh Em', 'Brotherhood band with harmonious sound'),
+    ('Nguyen Tan Phuc', 'Versatile performer with wide range'),
+    ('Anne Vu', 'Solo artist with powerful vocals'),
+    ('Nguyen Ngoc Minh Anh', 'Emerging talent with fresh perspective'),
+    ('Son Truong Nguyen', 'Experienced performer with stage presence'),
+    ('Tran Nguyen Tony', 'Dynamic performer with international appeal'),
+]
+
+_FIXED_NOW = datetime(2025, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+_WHITESPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=256)
+def _normalize(query):
+    return _WHITESPACE.sub(' ', query).strip()
+
+
+class FakeDatabaseAdapter:
+    """In-memory DatabaseAdapter with the same call surface as app.database"""
+
+    def __init__(self, ticket_count=400, seed_votes=True):
+        self.db_type = 'fake'
+        self.event_id = 1
+        self.db_url = 'fake://'
+        self.voting_open = True
+        self.round_id = 1
+        self.calls = 0
+        # Set to simulate an unreachable database (every statement raises)
+        self.down = False
+        self._resolved = {}
+        self.reset(ticket_count, seed_votes)
+
+    def reset(self, ticket_count=400, seed_votes=True):
+        """Rebuild the fixture so every benchmark run sees identical data"""
+        self.contestants = {}
+        for i, (name, description) in enumerate(FINALISTS, 1):
+            self.contestants[i] = {
+                'id': i,
+                'event_id': self.event_id,
+                'name': name,
+                'description': description,
+                'image_url': '/images/default-avatar.svg',
+                'is_active': True,
+                'created_at': _FIXED_NOW,
+            }
+
+        self.tickets = {}
+        self.tickets_by_code = {}
+        # Mirrors ticket_counters / ticket_usage_counters (migration 014)
+        self.section_totals = {}
+        self.section_used = {}
+        for i in range(1, ticket_count + 1):
+            section = f"A{(i - 1) // 50 + 1}.R{(i - 1) // 10 % 5 + 1}"
+            code = f"{section}.{(i - 1) % 10 + 1}"
+            row = {
+                'id': i,
+                'event_id': self.event_id,
+                'ticket_code': code,
+                'is_used': False,
+                'created_at': _FIXED_NOW,
+                'used_at': None,
+                'used_round_id': None,
+                'seat_id': None,
+                'seat_code': code,
+                'section_code': section,
+            }
+            self.tickets[i] = row
+            self.tickets_by_code[code] = row
+            self.section_totals[section] = self.section_totals.get(section, 0) + 1
+
+        self.user_agents = {}
+        self.votes = {}
+        self.vote_counts = dict.fromkeys(self.contestants, 0)
+        if seed_votes:
+            # Skewed but deterministic spread over the finalists
+            for ticket_id in range(1, ticket_count // 2 + 1):
+                contestant_id = (ticket_id * ticket_id) % len(FINALISTS) + 1
+                self._insert_vote(self.tickets[ticket_id], contestant_id, '10.0.0.1',
+                                  self._intern_user_agent('bench'))
+
+    @contextmanager
+    def get_connection(self):
+        raise RuntimeError('FakeDatabaseAdapter does not hand out raw connections')
+        yield  # pragma: no cover
+
+    def _intern_user_agent(self, user_agent):
+        if not user_agent:
+            return None
+        return self.user_agents.setdefault(user_agent[:512], len(self.user_agents) + 1)
+
+    def _insert_vote(self, ticket, contestant_id, ip_address, user_agent_id):
+        vote_id = len(self.votes) + 1
+        self.votes[vote_id] = {
+            'id': vote_id,
+            'event_id': self.event_id,
+            'contestant_id': contestant_id,
+            'ticket_id': ticket['id'],
+            'ip_address': ip_address,
+            'user_agent_id': user_agent_id,
+            'created_at': _FIXED_NOW,
+            'round_id': self.round_id,
+        }
+        self.vote_counts[contestant_id] += 1
+        self.section_used[ticket['section_code']] = self.section_used.get(ticket['section_code'], 0) + 1
+        ticket['is_used'] = True
+        ticket['used_at'] = _FIXED_NOW
+        ticket['used_round_id'] = self.round_id
+        return vote_id
+
+    def _voting_results(self):
+        counts = self.vote_counts
+        total = len(self.votes)
+        rows = []
+        for cid, c in self.contestants.items():
+            if not c['is_active']:
+                continue
+            rows.append({
+                'event_id': self.event_id,
+                'id': cid,
+                'name': c['name'],
+                'description': c['description'],
+                'image_url': c['image_url'],
+                'vote_count': counts[cid],
+                'percentage': round(counts[cid] * 100 / total, 2) if total else 0,
+            })
+        rows.sort(key=lambda r: r['vote_count'], reverse=True)
+        return rows
+
+    def _ticket_stats(self):
+        used = sum(self.section_used.values())
+        total = sum(self.section_totals.values())
+        return {'event_id': self.event_id, 'total_tickets': total, 'used_tickets': used,
+                'unused_tickets': total - used,
+                'usage_percentage': round(used * 100 / total, 2) if total else 0}
+
+    def _section_stats(self):
+        return [{'section_code': section, 'total_tickets': total,
+                 'used_tickets': self.section_used.get(section, 0),
+                 'unused_tickets': total - self.section_used.get(section, 0)}
+                for section, total in sorted(self.section_totals.items())]
+
+    def _dashboard(self):
+        results = sorted(({k: v for k, v in r.items() if k != 'event_id'} for r in self._voting_results()),
+                         key=lambda r: (-r['vote_count'], r['name']))
+        return {
+            'event_id': self.event_id,
+            'voting_open': self.voting_open,
+            'round_id': self.round_id,
+            'round_started_at': _FIXED_NOW,
+            'snapshot_at': _FIXED_NOW,
+            'results': results,
+            'tickets': self._ticket_stats(),
+            'sections': self._section_stats(),
+        }
+
+    def _submit_vote(self, ticket_code, contestant_id, ip_address, user_agent, event_id=1, user_agent_id=None):
+        ticket = self.tickets_by_code.get(ticket_code) if event_id == self.event_id else None
+        if ticket is None:
+            return [{'success': False, 'message': 'Invalid ticket code', 'contestant_name': None, 'vote_id': None}]
+        if ticket['is_used']:
+            return [{'success': False, 'message': 'Ticket already used', 'contestant_name': None, 'vote_id': None}]
+        contestant = self.contestants.get(contestant_id)
+        if contestant is None or not contestant['is_active']:
+            return [{'success': False, 'message': 'Invalid contestant', 'contestant_name': None, 'vote_id': None}]
+        vote_id = self._insert_vote(ticket, contestant_id, ip_address,
+                                    user_agent_id or self._intern_user_agent(user_agent))
+        return [{'success': True, 'message': 'Vote submitted successfully',
+                 'contestant_name': contestant['name'], 'vote_id': vote_id}]
+
+    def _handlers(self):
+        """Statement -> rows(params); prefixes match the statements whose text is built at runtime"""
+        event = self.event_id
+        exact = {
+            'SELECT * FROM contestants WHERE event_id = %s AND is_active = true ORDER BY name':
+                lambda p: sorted((dict(c) for c in self.contestants.values()
+                                  if c['is_active'] and c['event_id'] == p[0]), key=lambda c: c['name']),
+            'SELECT * FROM contestants WHERE id = %s AND event_id = %s AND is_active = true':
+                self._contestant_by_id,
+            'SELECT * FROM voting_results WHERE event_id = %s':
+                lambda p: self._voting_results() if p[0] == event else [],
+            'SELECT * FROM ticket_stats WHERE event_id = %s':
+                lambda p: [self._ticket_stats()] if p[0] == event else [],
+            ('SELECT section_code, total_tickets, used_tickets, unused_tickets FROM ticket_section_stats '
+             'WHERE event_id = %s AND section_code IS NOT NULL ORDER BY section_code'):
+                lambda p: self._section_stats() if p[0] == event else [],
+            'SELECT frozen_results_version FROM events WHERE id = %s':
+                lambda p: [{'frozen_results_version': None}] if p[0] == event else [],
+            'SELECT version FROM contestant_versions WHERE event_id = %s':
+                lambda p: [{'version': 1}] if p[0] == event else [],
+            'SELECT get_voting_open(%s) AS open':
+                lambda p: [{'open': self.voting_open and p[0] == event}],
+            'SELECT id FROM events WHERE id = %s':
+                lambda p: [{'id': event}] if p[0] == event else [],
+            'SELECT id FROM events WHERE slug = %s':
+                lambda p: [{'id': event}] if p[0] == 'default' else [],
+            'SELECT intern_user_agent(%s) AS id':
+                lambda p: [{'id': self._intern_user_agent(p[0])}],
+            'SELECT 1':
+                lambda p: [{'?column?': 1}],
+        }
+        prefixes = [
+            (('SELECT t.id, t.event_id, t.ticket_code, t.section_code, t.created_at, t.used_round_id,',
+              'WHERE t.event_id = %s AND t.ticket_code = %s'), self._ticket_by_code),
+            (('SELECT e.id AS event_id, e.voting_open, r.id AS round_id,', ''),
+             lambda p: [self._dashboard()] if p[0] == event else []),
+            (('SELECT * FROM submit_vote(', ''), lambda p: self._submit_vote(*p)),
+        ]
+        return exact, prefixes
+
+    def _contestant_by_id(self, params):
+        c = self.contestants.get(params[0])
+        return [dict(c)] if c and c['is_active'] and c['event_id'] == params[1] else []
+
+    def _ticket_by_code(self, params):
+        t = self.tickets_by_code.get(params[1]) if params[0] == self.event_id else None
+        return [dict(t)] if t else []
+
+    def _handler(self, sql):
+        handler = self._resolved.get(sql)
+        if handler is None:
+            exact, prefixes = self._handlers()
+            handler = exact.get(sql)
+            for (start, end), candidate in prefixes:
+                if handler is None and sql.startswith(start) and sql.endswith(end):
+                    handler = candidate
+            if handler is None:
+                raise NotImplementedError(f"FakeDatabaseAdapter cannot answer: {sql}")
+            self._resolved[sql] = handler
+        return handler
+
+    def execute_query(self, query, params=None, fetch_one=False, fetch_all=False, coalesce=False):
+        """Answer the statements used by app/ from in-memory state (coalesce is ignored)"""
+        self.calls += 1
+        if self.down:
+            raise psycopg2.OperationalError('could not connect to server (simulated outage)')
+        # Resolved once per statement, so the cost per call does not grow with the statements known
+        rows = self._handler(_normalize(query))(tuple(params or ()))
+
+        if fetch_one:
+            return rows[0] if rows else None
+        if fetch_all:
+            return rows
+        return len(rows)
+
+    def iter_query(self, query, params=None, itersize=2000, as_dict=True):
+        for row in self.execute_query(query, params, fetch_all=True):
+            yield row if as_dict else tuple(row.values())
+
+    def execute_function(self, func_name, params=None):
+        param_placeholders = ', '.join(['%s'] * len(params)) if params else ''
+        query = f"SELECT * FROM {func_name}({param_placeholders})"
+        return self.execute_query(query, params, fetch_all=True)
+
+
+def install(fake):
+    """Point every loaded app module at the fake adapter; returns an undo callable"""
+    import app.models
+    import app.services
+    import app.routes
+
+    patched = []
+    for name, module in list(sys.modules.items()):
+        if (name == 'app' or name.startswith('app.')) and hasattr(module, 'db_adapter'):
+            patched.append((module, module.db_adapter))
+            module.db_adapter = fake
+
+    def uninstall():
+        for module, original in patched:
+            module.db_adapter = original
+
+    return uninstall
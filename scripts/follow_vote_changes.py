@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Follow the vote change feed (GET /api/votes/changes) from another system
+
+VoteChangesClient long-polls the feed and hands out pages of changes;
+only the standard library is needed, so broadcast graphics or warehouse
+loaders can copy this file as is. Keep the cursor together with whatever
+the changes were applied to (--cursor-file here) to resume without gaps
+or repeats. Run as a script it keeps running tallies and prints each
+page's deltas.
+
+Usage:
+    python scripts/follow_vote_changes.py --url http://localhost:5000
+    python scripts/follow_vote_changes.py --url https://vote.example.com --event finals \\
+        --token "$CHANGES_API_TOKEN" --cursor-file changes.cursor
+"""
+
+import sys
+import os
+import json
+import argparse
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+
+class CursorExpired(Exception):
+    """The feed pruned changes after our cursor; rebuild state from /api/results"""
+
+
+class VoteChangesClient:
+    def __init__(self, base_url, event=None, token=None, cursor=None, wait=25, limit=None, interval=5):
+        self.base_url = base_url.rstrip('/')
+        self.event = event
+        self.token = token
+        self.cursor = cursor
+        self.wait = wait
+        self.limit = limit
+        self.interval = interval
+
+    def fetch(self):
+        """One page after the current cursor (empty after `wait` seconds without changes)"""
+        params = {'wait': self.wait}
+        if self.cursor:
+            params['since'] = self.cursor
+        if self.event:
+            params['event'] = self.event
+        if self.limit:
+            params['limit'] = self.limit
+        request = urllib.request.Request(f"{self.base_url}/api/votes/changes?{urllib.parse.urlencode(params)}")
+        if self.token:
+            request.add_header('Authorization', f'Bearer {self.token}')
+        try:
+            with urllib.request.urlopen(request, timeout=self.wait + 30) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            if e.code == 410:
+                raise CursorExpired(self.cursor)
+            raise
+
+    def pages(self):
+        """Pages forever; the cursor advances once the caller asks for the next page
+
+        When the server does not long-poll (max_wait 0) an empty page comes
+        back at once, so the next request waits `interval` seconds.
+        """
+        while True:
+            page = self.fetch()
+            yield page
+            self.cursor = page['cursor']
+            if not page['changes'] and page.get('max_wait', 0) < self.wait:
+                time.sleep(self.interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Follow the vote change feed')
+    parser.add_argument('--url', default='http://localhost:5000', help='Base URL of the voting app')
+    parser.add_argument('--event', default=None, help='Event id or slug (default event if omitted)')
+    parser.add_argument('--token', default=os.getenv('CHANGES_API_TOKEN'))
+    parser.add_argument('--interval', type=float, default=5,
+                        help='Seconds between requests when the server does not long-poll')
+    parser.add_argument('--cursor-file', default=None, help='Read the cursor from and save it to this file')
+    parser.add_argument('--from-start', action='store_true',
+                        help='Without a saved cursor, replay the whole feed instead of starting now')
+    args = parser.parse_args()
+
+    cursor = None
+    if args.cursor_file and os.path.exists(args.cursor_file):
+        with open(args.cursor_file) as f:
+            cursor = f.read().strip() or None
+    if cursor is None and not args.from_start:
+        cursor = 'latest'
+    client = VoteChangesClient(args.url, event=args.event, token=args.token, cursor=cursor,
+                               interval=args.interval)
+
+    tallies = {}
+    try:
+        for page in client.pages():
+            if page['reset']:
+                print("♻️  Votes were reset; dropping tallies")
+                tallies = {}
+            for round_id, deltas in page['tallies'].items():
+                for contestant_id, delta in deltas.items():
+                    key = (round_id, contestant_id)
+                    tallies[key] = tallies.get(key, 0) + delta
+                    print(f"round {round_id} contestant {contestant_id}: {delta:+,} -> {tallies[key]:,}")
+            if args.cursor_file:
+                with open(args.cursor_file, 'w') as f:
+                    f.write(page['cursor'])
+    except KeyboardInterrupt:
+        return 0
+    except CursorExpired:
+        print("❌ Cursor expired (changes were pruned); resync from /api/results and start with 'latest'")
+        return 1
+    except Exception as e:
+        print(f"❌ Error following changes: {e}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
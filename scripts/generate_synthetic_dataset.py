@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic large dataset for capacity testing
+
+Produces tickets with section/row/seat structure, votes with a skewed
+popularity distribution and bursty timestamps, realistic IP and
+user-agent spreads, and the audit_log rows the audit triggers would
+have written. Everything is bulk-loaded with COPY and is reproducible by seed.
+
+Only point this at a local/staging Postgres: triggers are bypassed with
+session_replication_role = replica so the load is not throttled by the
+rate-limit trigger or doubled by the audit trigger. That needs a
+superuser, which Supabase projects do not provide; the script stops
+before loading anything when the role may not set it. Vote rollups and
+ticket counters are rebuilt after the load.
+
+Usage:
+    python scripts/generate_synthetic_dataset.py --tickets 1000000 --seed 7
+    python scripts/generate_synthetic_dataset.py --tickets 50000 --turnout 0.6 --truncate
+"""
+
+import sys
+import os
+import csv
+import json
+import random
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config
+
+USER_AGENTS = [
+    ('Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Mobile/15E148 Safari/604.1', 30),
+    ('Mozilla/5.0 (iPhone; CPU iPhone OS 16_7 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.6 Mobile/15E148 Safari/604.1', 12),
+    ('Mozilla/5.0 (Linux; Android 14; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Mobile Safari/537.36', 14),
+    ('Mozilla/5.0 (Linux; Android 13; SM-A546E) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Mobile Safari/537.36', 10),
+    ('Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Mobile Safari/537.36', 5),
+    ('Mozilla/5.0 (Linux; Android 12; Redmi Note 11) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Mobile Safari/537.36', 8),
+    ('Mozilla/5.0 (Linux; Android 13; CPH2487) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Mobile Safari/537.36', 6),
+    ('Mozilla/5.0 (Linux; Android 14; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) SamsungBrowser/25.0 Chrome/121.0.0.0 Mobile Safari/537.36', 5),
+    ('Mozilla/5.0 (Linux; Android 13; V2202) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36 Zalo/23.12', 4),
+    ('Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) FBAN/FBIOS;FBAV/460.0 Mobile/15E148', 3),
+    ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36', 2),
+    ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36', 1),
+]
+
+
+class DatasetGenerator:
+    """Deterministic generator for tickets, votes and audit_log rows"""
+
+    def __init__(self, args, contestant_ids, ticket_id_offset, vote_id_offset, round_id, user_agent_ids):
+        self.args = args
+        self.round_id = round_id
+        self.event_id = args.event_id
+        self.rng = random.Random(args.seed)
+        self.contestant_ids = contestant_ids
+        self.ticket_id_offset = ticket_id_offset
+        self.vote_id_offset = vote_id_offset
+        self.event_start = datetime.fromisoformat(args.event_start).replace(tzinfo=timezone.utc)
+        self.event_seconds = args.event_minutes * 60
+
+        # Zipf-like popularity: weight 1/rank^skew, ranks shuffled by seed
+        ranks = list(range(1, len(contestant_ids) + 1))
+        self.rng.shuffle(ranks)
+        self.contestant_weights = [1.0 / (r ** args.skew) for r in ranks]
+
+        # Vote bursts cluster around a handful of "moments" (performances, host call-outs)
+        self.burst_centers = sorted(self.rng.uniform(0.05, 0.95) * self.event_seconds
+                                    for _ in range(args.bursts))
+
+        # Venue Wi-Fi concentrates many phones behind a few NAT addresses
+        self.venue_ips = [f"100.64.{self.rng.randint(0, 255)}.{self.rng.randint(1, 254)}"
+                          for _ in range(args.venue_ips)]
+        self.ua_strings = [ua for ua, _ in USER_AGENTS]
+        self.ua_weights = [w for _, w in USER_AGENTS]
+        self.user_agent_ids = user_agent_ids
+
+    def seat_code(self, index):
+        """Section and seat code for the index-th seat, e.g. ('B07.R12', 'B07.R12.9')"""
+        args = self.args
+        per_section = args.rows_per_section * args.seats_per_row
+        per_block = args.sections_per_block * per_section
+        block, rem = divmod(index, per_block)
+        section, rem = divmod(rem, per_section)
+        row, seat = divmod(rem, args.seats_per_row)
+        letter = chr(ord('A') + block % 26)
+        prefix = f"{letter}{section + 1:02d}" if block < 26 else f"{letter}{block // 26}{section + 1:02d}"
+        return f"{prefix}.R{row + 1}", f"{prefix}.R{row + 1}.{seat + 1}"
+
+    def vote_time(self):
+        if self.burst_centers and self.rng.random() < self.args.burst_share:
+            center = self.rng.choice(self.burst_centers)
+            offset = self.rng.expovariate(1.0 / self.args.burst_width)
+        else:
+            center, offset = 0, self.rng.uniform(0, self.event_seconds)
+        seconds = min(max(center + offset, 0), self.event_seconds)
+        return self.event_start + timedelta(seconds=seconds)
+
+    def client_ip(self):
+        if self.venue_ips and self.rng.random() < self.args.venue_share:
+            return self.rng.choice(self.venue_ips)
+        # Mobile carrier pools
+        return f"{self.rng.choice((14, 27, 42, 113, 116, 171))}.{self.rng.randint(0, 255)}." \
+               f"{self.rng.randint(0, 255)}.{self.rng.randint(1, 254)}"
+
+    def rows(self):
+        """Yield ('tickets'|'votes'|'audit_log', tuple) rows for the whole dataset"""
+        args = self.args
+        created_at = (self.event_start - timedelta(days=1)).isoformat()
+
+        # Pick voters, then hand them time-sorted timestamps so vote ids follow
+        # created_at the way a live event does
+        voters = [i for i in range(args.tickets) if self.rng.random() < args.turnout]
+        times = sorted(self.vote_time() for _ in voters)
+        self.rng.shuffle(voters)
+        used_at = [None] * args.tickets
+        for index, when in zip(voters, times):
+            used_at[index] = when.isoformat()
+
+        for index in range(args.tickets):
+            ticket_id = self.ticket_id_offset + index + 1
+            _, code = self.seat_code(index)
+            used = used_at[index] is not None
+            yield 'tickets', (ticket_id, self.event_id, code, used, created_at, used_at[index],
+                              self.round_id if used else None)
+            if args.audit_ticket_inserts:
+                new_ticket = {'id': ticket_id, 'event_id': self.event_id, 'ticket_code': code, 'is_used': False,
+                              'created_at': created_at}
+                yield 'audit_log', ('INSERT', 'tickets', ticket_id, None, json.dumps(new_ticket),
+                                    None, None, created_at)
+
+        for vote_id, index in enumerate(voters, self.vote_id_offset + 1):
+            ticket_id = self.ticket_id_offset + index + 1
+            when = used_at[index]
+            contestant_id = self.rng.choices(self.contestant_ids, weights=self.contestant_weights)[0]
+            ip = self.client_ip()
+            ua = self.rng.choices(self.ua_strings, weights=self.ua_weights)[0]
+            ua_id = self.user_agent_ids[ua]
+            vote = {'id': vote_id, 'contestant_id': contestant_id, 'ticket_id': ticket_id,
+                    'ip_address': ip, 'user_agent_id': ua_id, 'created_at': when, 'round_id': self.round_id,
+                    'event_id': self.event_id}
+            yield 'votes', (vote_id, contestant_id, ticket_id, ip, ua_id, when, self.round_id, self.event_id)
+
+            # Same encoding audit_statement_function writes: the vote row without
+            # NULLs, and only the changed ticket columns for the UPDATE
+            old_ticket = {'is_used': False, 'used_at': None, 'used_round_id': None}
+            new_ticket = {'is_used': True, 'used_at': when, 'used_round_id': self.round_id}
+            yield 'audit_log', ('INSERT', 'votes', vote_id, None, json.dumps(vote), None, None, when)
+            yield 'audit_log', ('UPDATE', 'tickets', ticket_id, json.dumps(old_ticket),
+                                json.dumps(new_ticket), None, None, when)
+
+
+COPY_COLUMNS = {
+    'tickets': 'tickets (id, event_id, ticket_code, is_used, created_at, used_at, used_round_id)',
+    'votes': 'votes (id, contestant_id, ticket_id, ip_address, user_agent_id, created_at, round_id, event_id)',
+    'audit_log': 'audit_log (event_type, table_name, record_id, old_values, new_values, '
+                 'ip_address, user_agent, created_at)',
+}
+
+
+def spool_rows(generator, spool_dir):
+    """Split the single generator pass into one CSV spool file per table"""
+    files = {table: open(os.path.join(spool_dir, f"{table}.csv"), 'w', newline='', encoding='utf-8')
+             for table in COPY_COLUMNS}
+    writers = {table: csv.writer(f, lineterminator='\n') for table, f in files.items()}
+    counts = dict.fromkeys(COPY_COLUMNS, 0)
+    try:
+        for table, row in generator.rows():
+            writers[table].writerow(row)
+            counts[table] += 1
+    finally:
+        for f in files.values():
+            f.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-load a synthetic dataset for capacity testing')
+    parser.add_argument('--database-url', default=Config.DATABASE_URL)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--event-id', type=int, default=Config.DEFAULT_EVENT_ID,
+                        help='Event the tickets and votes belong to')
+    parser.add_argument('--tickets', type=int, default=100000)
+    parser.add_argument('--turnout', type=float, default=0.85, help='Fraction of tickets that vote')
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent for contestant popularity')
+    parser.add_argument('--sections-per-block', type=int, default=20)
+    parser.add_argument('--rows-per-section', type=int, default=25)
+    parser.add_argument('--seats-per-row', type=int, default=20)
+    parser.add_argument('--event-start', default='2025-01-01T12:00:00')
+    parser.add_argument('--event-minutes', type=int, default=180)
+    parser.add_argument('--bursts', type=int, default=10, help='Number of voting bursts')
+    parser.add_argument('--burst-share', type=float, default=0.7, help='Fraction of votes inside bursts')
+    parser.add_argument('--burst-width', type=float, default=45.0, help='Mean burst tail in seconds')
+    parser.add_argument('--venue-ips', type=int, default=8, help='Shared venue Wi-Fi NAT addresses')
+    parser.add_argument('--venue-share', type=float, default=0.55, help='Fraction of votes via venue Wi-Fi')
+    parser.add_argument('--audit-ticket-inserts', action='store_true',
+                        help='Also write audit rows for ticket creation')
+    parser.add_argument('--truncate', action='store_true', help='TRUNCATE votes, tickets and audit_log first')
+    parser.add_argument('--spool-dir', default=None, help='Keep the generated CSV files here')
+    args = parser.parse_args()
+
+    import psycopg2
+    import tempfile
+
+    started = time.time()
+    conn = psycopg2.connect(args.database_url)
+    try:
+        cur = conn.cursor()
+        try:
+            cur.execute("SET session_replication_role = replica")
+        except psycopg2.errors.InsufficientPrivilege:
+            print("❌ Setting session_replication_role needs a superuser (not available on Supabase); "
+                  "run this against a local or staging Postgres")
+            return 1
+        if args.truncate:
+            cur.execute("TRUNCATE votes, tickets, audit_log RESTART IDENTITY")
+            print("🧹 Truncated votes, tickets and audit_log")
+
+        cur.execute("SELECT id FROM contestants WHERE event_id = %s AND is_active = TRUE ORDER BY id",
+                    (args.event_id,))
+        contestant_ids = [r[0] for r in cur.fetchall()]
+        if not contestant_ids:
+            print(f"❌ No active contestants in event {args.event_id}; run scripts/add_contestants.py first")
+            return 1
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM tickets")
+        ticket_offset = cur.fetchone()[0]
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM votes")
+        vote_offset = cur.fetchone()[0]
+
+        cur.execute("SELECT current_round_id(%s)", (args.event_id,))
+        round_id = cur.fetchone()[0]
+
+        # Votes reference interned user agents (migration 012)
+        user_agent_ids = {}
+        for ua, _ in USER_AGENTS:
+            cur.execute("SELECT intern_user_agent(%s)", (ua,))
+            user_agent_ids[ua] = cur.fetchone()[0]
+
+        generator = DatasetGenerator(args, contestant_ids, ticket_offset, vote_offset, round_id, user_agent_ids)
+
+        # Partitioned tables (migration 007) need partitions for the event window
+        cur.execute("SELECT to_regprocedure('ensure_time_partitions(text, timestamptz, timestamptz)') IS NOT NULL")
+        if cur.fetchone()[0]:
+            window_start = generator.event_start - timedelta(days=1)
+            window_end = generator.event_start + timedelta(seconds=generator.event_seconds + 1)
+            for table in ('votes', 'audit_log'):
+                cur.execute("SELECT * FROM ensure_time_partitions(%s, %s, %s)", (table, window_start, window_end))
+
+        spool_dir = args.spool_dir or tempfile.mkdtemp(prefix='voting-synth-')
+        os.makedirs(spool_dir, exist_ok=True)
+
+        print(f"🎲 Generating {args.tickets:,} tickets (seed {args.seed}) into {spool_dir}...")
+        counts = spool_rows(generator, spool_dir)
+
+        for table, columns in COPY_COLUMNS.items():
+            t0 = time.time()
+            with open(os.path.join(spool_dir, f"{table}.csv"), 'r', encoding='utf-8') as f:
+                cur.copy_expert(f"COPY {columns} FROM STDIN WITH (FORMAT csv)", f)
+            print(f"📥 {table:10s} {counts[table]:>12,} rows in {time.time() - t0:6.1f}s")
+
+        cur.execute("SELECT setval(pg_get_serial_sequence('tickets', 'id'), GREATEST((SELECT MAX(id) FROM tickets), 1))")
+        cur.execute("SELECT setval(pg_get_serial_sequence('votes', 'id'), GREATEST((SELECT MAX(id) FROM votes), 1))")
+
+        # COPY ran with triggers off, so the vote rollups (migration 010) and
+        # ticket counters (migration 014) are rebuilt
+        cur.execute("SELECT to_regprocedure('rebuild_vote_rollups()') IS NOT NULL")
+        if cur.fetchone()[0]:
+            cur.execute("SELECT rebuild_vote_rollups()")
+            print(f"📈 Rebuilt vote rollups ({cur.fetchone()[0]:,} minute buckets)")
+        cur.execute("SELECT to_regprocedure('rebuild_ticket_counters()') IS NOT NULL")
+        if cur.fetchone()[0]:
+            cur.execute("SELECT rebuild_ticket_counters()")
+            print(f"🎟️  Rebuilt ticket counters ({cur.fetchone()[0]:,} event/section rows)")
+        conn.commit()
+
+        conn.autocommit = True
+        cur.execute("ANALYZE tickets")
+        cur.execute("ANALYZE votes")
+        cur.execute("ANALYZE audit_log")
+        cur.close()
+
+        if not args.spool_dir:
+            for table in COPY_COLUMNS:
+                os.remove(os.path.join(spool_dir, f"{table}.csv"))
+            os.rmdir(spool_dir)
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Error loading synthetic dataset: {e}")
+        return 1
+    finally:
+        conn.close()
+
+    print(f"✅ Loaded synthetic dataset in {time.time() - started:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -41,8 +41,8 @@ def sync_predefined_tickets():
     for i, ticket_code in enumerate(predefined_tickets):
         try:
             result = db_adapter.execute_query(
-                "INSERT INTO tickets (ticket_code, is_used, created_at) VALUES (%s, FALSE, NOW()) ON CONFLICT (ticket_code) DO NOTHING RETURNING ticket_code",
-                (ticket_code,),
+                "INSERT INTO tickets (event_id, ticket_code, is_used, created_at) VALUES (%s, %s, FALSE, NOW()) ON CONFLICT (event_id, ticket_code) DO NOTHING RETURNING ticket_code",
+                (Config.DEFAULT_EVENT_ID, ticket_code),
                 fetch_one=True
             )
             
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Create upcoming partitions and drop expired ones (migration 007)
+
+Applies partition_policies via run_partition_maintenance(). Schedule it
+daily from cron when pg_cron is not available on the database. Also prunes
+the vote change feed (migration 018) to VOTE_CHANGES_RETENTION.
+
+Usage:
+    python scripts/maintain_partitions.py
+    python scripts/maintain_partitions.py --set-retention audit_log "90 days"
+"""
+
+import sys
+import os
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config
+from app.database import db_adapter
+
+def main():
+    parser = argparse.ArgumentParser(description='Run partition maintenance')
+    parser.add_argument('--set-retention', nargs=2, metavar=('TABLE', 'INTERVAL'),
+                        help="Change a table's retention (use 'none' to keep forever)")
+    args = parser.parse_args()
+
+    try:
+        if args.set_retention:
+            table, retention = args.set_retention
+            db_adapter.execute_query(
+                "UPDATE partition_policies SET retention = %s::INTERVAL, updated_at = NOW() WHERE table_name = %s",
+                (None if retention.lower() == 'none' else retention, table))
+            print(f"🗓️  Retention for {table} set to {retention}")
+
+        actions = db_adapter.execute_query("SELECT * FROM run_partition_maintenance()", fetch_all=True)
+        if not actions:
+            print("✅ Partitions already up to date")
+        for action in actions:
+            icon = '➕' if action['action'] == 'created' else '🗑️ '
+            print(f"{icon} {action['table_name']}: {action['action']} {action['partition_name']}")
+
+        pruned = db_adapter.execute_query("SELECT prune_vote_changes(%s::INTERVAL) AS deleted",
+                                          (Config.VOTE_CHANGES_RETENTION,), fetch_one=True)
+        if pruned['deleted']:
+            print(f"🗑️  vote_changes: pruned {pruned['deleted']:,} changes older than {Config.VOTE_CHANGES_RETENTION}")
+        return 0
+    except Exception as e:
+        print(f"❌ Partition maintenance failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Delete the votes of finished voting rounds in small batches (migration 008)
+
+Resetting voting only starts a new round; the old round's votes are
+removed here, off the request path, without a long-running DELETE.
+
+Usage:
+    python scripts/purge_rounds.py
+    python scripts/purge_rounds.py --batch-size 2000 --pause 0.2
+"""
+
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import VotingService
+
+def main():
+    parser = argparse.ArgumentParser(description='Purge votes of finished rounds')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--pause', type=float, default=0.1,
+                        help='Seconds to sleep between batches to limit load')
+    args = parser.parse_args()
+
+    total = 0
+    try:
+        while True:
+            deleted = VotingService.purge_old_rounds(args.batch_size, max_batches=1)
+            total += deleted
+            if deleted < args.batch_size:
+                break
+            time.sleep(args.pause)
+    except Exception as e:
+        print(f"❌ Error purging rounds after {total} votes: {e}")
+        return 1
+
+    print(f"✅ Purged {total} votes from finished rounds")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Recount a voting round from the raw data and sign the result
+
+Rebuilds the per-contestant tallies of a round twice, from votes and by
+replaying the vote INSERT/DELETE rows of audit_log, and cross-checks them
+against everything that publishes or maintains a count: the voting_results
+view, the vote rollups (migration 010) and the ticket usage counters
+(migration 014). It also looks for orphans: tickets marked used in the
+round without a vote, votes whose ticket is not marked used, and tickets
+with more than one vote.
+
+The work is split into id-range chunks of votes, tickets and audit_log
+run by a process pool. Every worker reads through the snapshot exported by
+the coordinating transaction, so all chunks and cross-checks see the same
+committed state even while votes are still coming in (--no-snapshot for
+connection poolers that do not support it). The result is deterministic:
+the vote digest is an order-independent sum of per-vote hashes, so it does
+not depend on chunking or worker count.
+
+The summary is written as JSON and signed with HMAC-SHA256 using
+RECOUNT_SIGNING_KEY; --verify checks a summary's signature.
+
+Usage:
+    python scripts/recount_votes.py
+    python scripts/recount_votes.py --event-id 2 --round-id 7 --workers 8
+    python scripts/recount_votes.py --output recount.json
+    python scripts/recount_votes.py --verify recount.json
+"""
+
+import sys
+import os
+import json
+import hmac
+import hashlib
+import argparse
+import multiprocessing
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import psycopg2
+import psycopg2.extras
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config
+
+SAMPLE_SIZE = 20
+
+# Per contestant: votes and the sum of a 60-bit hash of every vote
+VOTES_CHUNK_QUERY = """
+    SELECT contestant_id, COUNT(*) AS votes,
+           SUM(('x' || substr(md5(id || ':' || ticket_id || ':' || contestant_id), 1, 15))::bit(60)::bigint) AS digest
+    FROM votes
+    WHERE id >= %(lo)s AND id < %(hi)s AND created_at >= %(since)s AND round_id = %(round_id)s
+    GROUP BY contestant_id
+"""
+
+# Tickets of the range that disagree with the round's votes. A ticket counts
+# as used by this round when used_round_id is this or a later round (a later
+# round of the event may have claimed it again).
+TICKETS_CHUNK_QUERY = """
+    WITH t AS (
+        SELECT id, used_round_id = %(round_id)s AS used, used_round_id >= %(round_id)s AS used_since
+        FROM tickets
+        WHERE id >= %(lo)s AND id < %(hi)s AND event_id = %(event_id)s
+    ), v AS (
+        SELECT ticket_id, COUNT(*) AS votes
+        FROM votes
+        WHERE ticket_id >= %(lo)s AND ticket_id < %(hi)s AND created_at >= %(since)s AND round_id = %(round_id)s
+        GROUP BY ticket_id
+    )
+    SELECT COALESCE(t.id, v.ticket_id) AS ticket_id,
+           COALESCE(t.used, FALSE) AS used,
+           COALESCE(t.used_since, FALSE) AS used_since,
+           COALESCE(v.votes, 0) AS votes
+    FROM t FULL JOIN v ON v.ticket_id = t.id
+    WHERE (COALESCE(t.used, FALSE) AND v.votes IS NULL)
+       OR (v.votes IS NOT NULL AND NOT COALESCE(t.used_since, FALSE))
+       OR v.votes > 1
+"""
+
+# Net votes per contestant from the audit trail (migration 006 encoding:
+# INSERT has new_values, DELETE has old_values); UPDATEs of votes are
+# counted separately since they only carry the changed columns
+AUDIT_CHUNK_QUERY = """
+    SELECT (COALESCE(new_values, old_values) ->> 'contestant_id')::INTEGER AS contestant_id,
+           SUM(CASE event_type WHEN 'INSERT' THEN 1 WHEN 'DELETE' THEN -1 ELSE 0 END) AS votes,
+           COUNT(*) FILTER (WHERE event_type = 'UPDATE') AS updates
+    FROM {table}
+    WHERE {id_column} >= %(lo)s AND {id_column} < %(hi)s AND created_at >= %(since)s
+      AND table_name = 'votes'
+      AND (event_type = 'UPDATE' OR (COALESCE(new_values, old_values) ->> 'round_id')::INTEGER = %(round_id)s)
+    GROUP BY 1
+"""
+
+TASK_QUERIES = {
+    'votes': VOTES_CHUNK_QUERY,
+    'tickets': TICKETS_CHUNK_QUERY,
+    'audit': AUDIT_CHUNK_QUERY.format(table='audit_log', id_column='id'),
+    # Rows of async audit mode not yet drained into audit_log
+    'audit_staging': AUDIT_CHUNK_QUERY.format(table='audit_log_staging', id_column='staging_id'),
+}
+
+RANGE_QUERIES = {
+    'votes': 'SELECT MIN(id) AS lo, MAX(id) AS hi FROM votes WHERE created_at >= %(since)s',
+    'tickets': 'SELECT MIN(id) AS lo, MAX(id) AS hi FROM tickets',
+    'audit': 'SELECT MIN(id) AS lo, MAX(id) AS hi FROM audit_log WHERE created_at >= %(since)s',
+    'audit_staging': 'SELECT MIN(staging_id) AS lo, MAX(staging_id) AS hi FROM audit_log_staging',
+}
+
+
+def canonical_json(doc):
+    return json.dumps(doc, sort_keys=True, separators=(',', ':'), default=str)
+
+
+def sign(doc, key):
+    """HMAC-SHA256 over the canonical JSON of everything but the signature"""
+    body = {k: v for k, v in doc.items() if k != 'signature'}
+    return hmac.new(key.encode(), canonical_json(body).encode(), hashlib.sha256).hexdigest()
+
+
+def signing_key():
+    if Config.RECOUNT_SIGNING_KEY:
+        return Config.RECOUNT_SIGNING_KEY
+    print("⚠️  RECOUNT_SIGNING_KEY is not set; signing with SECRET_KEY")
+    return Config.SECRET_KEY
+
+
+def chunk_tasks(kind, lo, hi, chunk_size):
+    """(kind, lo, hi) tasks covering ids lo..hi inclusive"""
+    if lo is None:
+        return []
+    return [(kind, start, min(start + chunk_size, hi + 1)) for start in range(lo, hi + 1, chunk_size)]
+
+
+# ---------------------------------------------------------------------
+# Workers
+# ---------------------------------------------------------------------
+
+_worker = {}
+
+
+def init_worker(db_url, snapshot, params):
+    conn = psycopg2.connect(db_url, connect_timeout=Config.DB_CONNECT_TIMEOUT)
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+    _worker.update(conn=conn, snapshot=snapshot, params=params)
+
+
+def run_task(task):
+    kind, lo, hi = task
+    conn = _worker['conn']
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+            if _worker['snapshot']:
+                # Must be the first statement of the transaction
+                cursor.execute('SET TRANSACTION SNAPSHOT %s', (_worker['snapshot'],))
+            cursor.execute(TASK_QUERIES[kind], dict(_worker['params'], lo=lo, hi=hi))
+            return task, [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.rollback()
+
+
+# ---------------------------------------------------------------------
+# Coordinator
+# ---------------------------------------------------------------------
+
+def load_round(cursor, event_id, round_id):
+    if round_id is None:
+        cursor.execute("SELECT * FROM voting_rounds WHERE event_id = %s AND status = 'active'", (event_id,))
+    else:
+        cursor.execute('SELECT * FROM voting_rounds WHERE event_id = %s AND id = %s', (event_id, round_id))
+    return cursor.fetchone()
+
+
+def cross_check_sources(cursor, event_id, voting_round):
+    """Counts published or maintained elsewhere, by contestant"""
+    sources = {}
+    if voting_round['status'] == 'active':
+        cursor.execute('SELECT id, vote_count FROM voting_results WHERE event_id = %s', (event_id,))
+        sources['live_results'] = {row['id']: int(row['vote_count']) for row in cursor.fetchall()}
+    for table in ('vote_rollup_1m', 'vote_rollup_10m'):
+        cursor.execute(f'SELECT contestant_id, SUM(votes) AS votes FROM {table} '
+                       'WHERE event_id = %s AND round_id = %s GROUP BY contestant_id',
+                       (event_id, voting_round['id']))
+        sources[table] = {row['contestant_id']: int(row['votes']) for row in cursor.fetchall()}
+    cursor.execute('SELECT COALESCE(SUM(used_tickets), 0) AS used FROM ticket_usage_counters WHERE round_id = %s',
+                   (voting_round['id'],))
+    used_counter = int(cursor.fetchone()['used'])
+    return sources, used_counter
+
+
+def recount(args):
+    conn = psycopg2.connect(Config.DATABASE_URL, connect_timeout=Config.DB_CONNECT_TIMEOUT)
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        snapshot = None
+        if not args.no_snapshot:
+            cursor.execute('SELECT pg_export_snapshot() AS snapshot')
+            snapshot = cursor.fetchone()['snapshot']
+
+        voting_round = load_round(cursor, args.event_id, args.round_id)
+        if voting_round is None:
+            raise ValueError(f"No such round for event {args.event_id}")
+        # Lower created_at bound, so only partitions of the round are read;
+        # votes moved into an event's first round can predate started_at
+        cursor.execute('SELECT created_at FROM votes WHERE event_id = %s AND round_id = %s '
+                       'ORDER BY created_at LIMIT 1', (args.event_id, voting_round['id']))
+        first_vote = cursor.fetchone()
+        since = min(voting_round['started_at'], first_vote['created_at']) if first_vote else voting_round['started_at']
+        params = {'event_id': args.event_id, 'round_id': voting_round['id'], 'since': since}
+
+        tasks = []
+        for kind, query in RANGE_QUERIES.items():
+            cursor.execute(query, params)
+            bounds = cursor.fetchone()
+            tasks += chunk_tasks(kind, bounds['lo'], bounds['hi'], args.chunk_size)
+
+        cursor.execute('SELECT id, name FROM contestants WHERE event_id = %s', (args.event_id,))
+        names = {row['id']: row['name'] for row in cursor.fetchall()}
+        sources, used_counter = cross_check_sources(cursor, args.event_id, voting_round)
+
+        print(f"🔢 Recounting round {voting_round['id']} of event {args.event_id}: "
+              f"{len(tasks)} chunks on {args.workers} workers"
+              f"{'' if snapshot else ' (no shared snapshot)'}")
+
+        votes = defaultdict(int)
+        audit_votes = defaultdict(int)
+        digest = 0
+        audit_updates = 0
+        orphans = {'used_ticket_without_vote': [], 'vote_ticket_not_used': [], 'ticket_with_several_votes': []}
+
+        # The exporting transaction stays open until every worker is done
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(args.workers, initializer=init_worker,
+                      initargs=(Config.DATABASE_URL, snapshot, params)) as pool:
+            for done, ((kind, lo, hi), rows) in enumerate(pool.imap_unordered(run_task, tasks), 1):
+                for row in rows:
+                    if kind == 'votes':
+                        votes[row['contestant_id']] += row['votes']
+                        digest += int(row['digest'])
+                    elif kind == 'tickets':
+                        if row['used'] and row['votes'] == 0:
+                            orphans['used_ticket_without_vote'].append(row['ticket_id'])
+                        if row['votes'] and not row['used_since']:
+                            orphans['vote_ticket_not_used'].append(row['ticket_id'])
+                        if row['votes'] > 1:
+                            orphans['ticket_with_several_votes'].append(row['ticket_id'])
+                    else:
+                        if row['contestant_id'] is not None:
+                            audit_votes[row['contestant_id']] += row['votes']
+                        audit_updates += row['updates']
+                if done % 50 == 0 or done == len(tasks):
+                    print(f"   {done}/{len(tasks)} chunks")
+    finally:
+        conn.close()
+
+    contestant_ids = sorted(set(names) | set(votes) | {c for c, n in audit_votes.items() if n})
+    contestants = []
+    for contestant_id in contestant_ids:
+        entry = {'contestant_id': contestant_id, 'name': names.get(contestant_id),
+                 'votes': votes.get(contestant_id, 0), 'audit_votes': audit_votes.get(contestant_id, 0)}
+        for source, counts in sources.items():
+            entry[source] = counts.get(contestant_id)
+        contestants.append(entry)
+
+    total_votes = sum(votes.values())
+    checks = {'audit_log': all(c['votes'] == c['audit_votes'] for c in contestants) and audit_updates == 0}
+    for source in sources:
+        # Contestants missing from a source must have no votes
+        checks[source] = all(c['votes'] == (c[source] or 0) for c in contestants)
+    checks['ticket_counters'] = used_counter == total_votes
+    checks['orphans'] = not any(orphans.values())
+
+    return {
+        'event_id': args.event_id,
+        'round_id': voting_round['id'],
+        'round_status': voting_round['status'],
+        'round_started_at': voting_round['started_at'].isoformat(),
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'consistent_snapshot': snapshot is not None,
+        'total_votes': total_votes,
+        'vote_digest': f"{digest % 2 ** 64:016x}",
+        'contestants': contestants,
+        'used_tickets_counter': used_counter,
+        'audit_vote_updates': audit_updates,
+        'orphans': {kind: {'count': len(ids), 'sample': sorted(ids)[:SAMPLE_SIZE]} for kind, ids in orphans.items()},
+        'checks': checks,
+        'verified': all(checks.values()),
+    }
+
+
+def print_summary(summary):
+    sources = [s for s in ('live_results', 'vote_rollup_1m', 'vote_rollup_10m') if s in summary['checks']]
+    print(f"\n{'contestant':30s} {'votes':>10s} {'audit':>10s}" + ''.join(f" {s:>16s}" for s in sources))
+    for c in sorted(summary['contestants'], key=lambda c: (-c['votes'], c['contestant_id'])):
+        name = f"{c['contestant_id']} {c['name'] or '?'}"[:30]
+        print(f"{name:30s} {c['votes']:>10,} {c['audit_votes']:>10,}"
+              + ''.join(f" {'-' if c[s] is None else format(c[s], ','):>16s}" for s in sources))
+    print(f"\nTotal votes: {summary['total_votes']:,} (ticket counters: {summary['used_tickets_counter']:,})")
+    print(f"Vote digest: {summary['vote_digest']}")
+    for kind, found in summary['orphans'].items():
+        if found['count']:
+            print(f"⚠️  {kind}: {found['count']:,} (e.g. ticket ids {found['sample'][:5]})")
+    if summary['audit_vote_updates']:
+        print(f"⚠️  audit_log has {summary['audit_vote_updates']:,} vote UPDATE(s)")
+    for check, ok in summary['checks'].items():
+        print(f"{'✅' if ok else '❌'} {check}")
+
+
+def verify(path):
+    with open(path) as f:
+        doc = json.load(f)
+    expected = sign(doc, signing_key())
+    if not hmac.compare_digest(expected, doc.get('signature', {}).get('value', '')):
+        print(f"❌ Signature does not match: {path} was altered or signed with another key")
+        return 1
+    print(f"✅ Signature valid: round {doc['round_id']} of event {doc['event_id']}, "
+          f"{doc['total_votes']:,} votes, {'verified' if doc['verified'] else 'NOT verified'}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recount a voting round and sign the summary')
+    parser.add_argument('--event-id', type=int, default=Config.DEFAULT_EVENT_ID)
+    parser.add_argument('--round-id', type=int, default=None, help='Default: the active round')
+    parser.add_argument('--workers', type=int, default=min(8, os.cpu_count() or 1))
+    parser.add_argument('--chunk-size', type=int, default=250000, help='Ids per chunk')
+    parser.add_argument('--no-snapshot', action='store_true',
+                        help='Do not share one snapshot (for poolers without pg_export_snapshot)')
+    parser.add_argument('--output', default=None, help='Default: recount_event<E>_round<R>.json')
+    parser.add_argument('--verify', metavar='FILE', help='Check the signature of a summary and exit')
+    args = parser.parse_args()
+
+    if args.verify:
+        try:
+            return verify(args.verify)
+        except Exception as e:
+            print(f"❌ Error verifying {args.verify}: {e}")
+            return 1
+
+    try:
+        started = datetime.now(timezone.utc)
+        summary = recount(args)
+        summary['signature'] = {'algorithm': 'HMAC-SHA256', 'value': sign(summary, signing_key())}
+    except Exception as e:
+        print(f"❌ Recount failed: {e}")
+        return 1
+
+    print_summary(summary)
+    output = args.output or f"recount_event{summary['event_id']}_round{summary['round_id']}.json"
+    with open(output, 'w') as f:
+        json.dump(summary, f, indent=2, default=str)
+    elapsed = (datetime.now(timezone.utc) - started).total_seconds()
+    print(f"📄 Signed summary written to {output} ({elapsed:.0f}s)")
+    return 0 if summary['verified'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Replay the local vote spool (app/spool.py) into the database
+
+The web processes replay it on their own once the database is back;
+run this to drain it by hand (e.g. after the web service was stopped)
+or to see how far behind it is. Only one process replays at a time.
+
+Usage:
+    python scripts/replay_vote_spool.py --status
+    python scripts/replay_vote_spool.py
+    python scripts/replay_vote_spool.py --batch-size 200
+"""
+
+import sys
+import os
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.spool import vote_spool
+
+
+def print_status():
+    stats = vote_spool.stats()
+    print(f"📦 Vote spool {vote_spool.path} ({stats['spool_id']})")
+    print(f"   Pending:  {stats['depth']:,}")
+    print(f"   Applied:  {stats['applied']:,}")
+    print(f"   Rejected: {stats['rejected']:,}")
+    print(f"   Replay lag: {stats['replay_lag_seconds']}s (last replay {stats['last_replayed_at'] or 'never'})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay spooled votes into the database')
+    parser.add_argument('--status', action='store_true', help='Show spool depth and lag only')
+    parser.add_argument('--batch-size', type=int, default=None)
+    args = parser.parse_args()
+
+    if not vote_spool.enabled:
+        print("❌ VOTE_SPOOL_PATH is empty; the vote spool is disabled")
+        return 1
+
+    try:
+        if args.status:
+            print_status()
+            return 0
+        outcome = vote_spool.replay(args.batch_size)
+        if outcome is None:
+            print("⏳ Another process is replaying the spool right now")
+            return 1
+        applied, rejected = outcome
+        print(f"✅ Replayed {applied + rejected:,} votes: {applied:,} applied, {rejected:,} rejected")
+        print_status()
+        return 0
+    except Exception as e:
+        print(f"❌ Replay failed: {e}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
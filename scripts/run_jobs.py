@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Run queued admin jobs (ticket generation, clearing, voting resets)
+
+With JOB_RUNNER=external the web processes only enqueue jobs and this
+process runs them, so heavy work never shares a process with the vote
+path. Without --once it polls every JOB_POLL_INTERVAL seconds.
+
+Usage:
+    python scripts/run_jobs.py
+    python scripts/run_jobs.py --once
+"""
+
+import sys
+import os
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.jobs import runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run queued admin jobs')
+    parser.add_argument('--once', action='store_true', help='Run the jobs queued now and exit')
+    args = parser.parse_args()
+
+    try:
+        if args.once:
+            ran = runner.run_pending()
+            print(f"✅ Ran {ran} job(s)")
+            return 0
+        print("👷 Waiting for admin jobs")
+        runner.run_forever()
+    except KeyboardInterrupt:
+        return 0
+    except Exception as e:
+        print(f"❌ Job runner failed: {e}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Enter a file of ballots (kiosk exports, keyed-in paper ballots)
+
+The CSV has one ticket_code,contestant_id per row (a header row is
+optional). Ballots are applied in chunks of --batch-size through the same
+set-based apply_vote_batch() as POST /api/admin/votes/batch, with the
+submit_vote rules: for a ticket that appears twice the first row wins.
+
+Usage:
+    python scripts/submit_vote_batch.py ballots.csv
+    python scripts/submit_vote_batch.py ballots.csv --event-id 2 --allow-closed
+    python scripts/submit_vote_batch.py ballots.csv --report outcomes.csv
+"""
+
+import sys
+import os
+import csv
+import argparse
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config
+from app.models import Event
+from app.services import VotingService, ballots_from_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply a CSV of ballots in batches')
+    parser.add_argument('file', help='CSV of ticket_code,contestant_id')
+    parser.add_argument('--event-id', type=int, default=Config.DEFAULT_EVENT_ID)
+    parser.add_argument('--batch-size', type=int, default=Config.VOTE_BATCH_MAX_BALLOTS)
+    parser.add_argument('--allow-closed', action='store_true',
+                        help='Apply the ballots even though voting is closed')
+    parser.add_argument('--report', help='Write every outcome to this CSV')
+    args = parser.parse_args()
+
+    try:
+        with open(args.file, newline='', encoding='utf-8-sig') as f:
+            ballots = ballots_from_csv(f)
+        if not ballots:
+            print("❌ No ballots in file")
+            return 1
+        if not args.allow_closed and not Event.is_voting_open(args.event_id):
+            print("❌ Voting is closed for this event (use --allow-closed for late paper ballots)")
+            return 1
+
+        print(f"🗳️  Applying {len(ballots):,} ballots to event {args.event_id}")
+        results = []
+        for start in range(0, len(ballots), args.batch_size):
+            result = VotingService.submit_vote_batch(
+                ballots[start:start + args.batch_size], ip_address=None,
+                user_agent='submit_vote_batch.py', event_id=args.event_id)
+            if not result['success']:
+                print(f"❌ Batch starting at line {start + 1} failed: {result['error']}")
+                print(f"   Lines 1-{start} were applied; rerun with the rest of the file")
+                return 1
+            # Lines are per chunk; number them through the whole file
+            results.extend((start + line, code, message, vote_id)
+                           for line, code, message, vote_id in result['results'])
+            print(f"   {len(results):,}/{len(ballots):,}")
+
+        accepted = sum(1 for r in results if r[3] is not None)
+        print(f"✅ {accepted:,} accepted, {len(results) - accepted:,} rejected")
+        for message, count in Counter(r[2] for r in results if r[3] is None).most_common():
+            print(f"   {message}: {count:,}")
+
+        if args.report:
+            with open(args.report, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['line', 'ticket_code', 'outcome', 'vote_id'])
+                for line, code, message, vote_id in results:
+                    writer.writerow([line, code, 'ok' if vote_id is not None else message,
+                                     '' if vote_id is None else vote_id])
+            print(f"📄 Outcomes written to {args.report}")
+        return 0
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -38,8 +38,8 @@ def sync_tickets():
         for ticket_code in tickets:
             try:
                 cursor.execute(
-                    "INSERT INTO tickets (ticket_code, is_used, created_at) VALUES (%s, FALSE, NOW()) ON CONFLICT (ticket_code) DO NOTHING RETURNING ticket_code",
-                    (ticket_code,)
+                    "INSERT INTO tickets (event_id, ticket_code, is_used, created_at) VALUES (%s, %s, FALSE, NOW()) ON CONFLICT (event_id, ticket_code) DO NOTHING RETURNING ticket_code",
+                    (Config.DEFAULT_EVENT_ID, ticket_code)
                 )
                 result = cursor.fetchone()
                 if result: